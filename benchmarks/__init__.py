@@ -0,0 +1,4 @@
+"""Performance benchmarks for digi.Me
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_message_harvest``.
+"""
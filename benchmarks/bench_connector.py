@@ -0,0 +1,138 @@
+"""Benchmark WhatsAppConnector against the offline fake WhatsApp Web
+
+For 1, 10 and 100 contacts this reports:
+
+- scrape throughput: incoming messages read per second by get_unread_messages
+- send latency: wall time of send_message
+- full-cycle latency: time from a message arriving to its reply reaching the
+  server, running the same scan -> read -> send cycle as the bot
+
+Needs Chrome and chromedriver on the PATH; no network or phone session.
+
+Usage:
+    python -m benchmarks.bench_connector [--contacts 1 10 100] [--messages 5]
+"""
+
+import argparse
+import statistics
+import time
+from typing import List
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from benchmarks.browser import headless_chrome
+from benchmarks.fake_whatsapp import FakeWhatsAppServer
+from src.whatsapp.connector import WhatsAppConnector
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def wait_for_replies(server: FakeWhatsAppServer, expected: int, timeout: float = 60) -> List[dict]:
+    """Collect recorded outgoing messages until ``expected`` have arrived"""
+    sent = []
+    deadline = time.time() + timeout
+    while len(sent) < expected and time.time() < deadline:
+        sent.extend(server.state.drain_sent())
+        time.sleep(0.01)
+    return sent
+
+
+def run(contact_count: int, messages_per_contact: int) -> dict:
+    """Benchmark one contact count
+    
+    Args:
+        contact_count: Number of fake contacts
+        messages_per_contact: Incoming messages injected per contact for the scrape test
+    
+    Returns:
+        Dictionary of measurements
+    """
+    contacts = [f"+1555{i:07d}" for i in range(contact_count)]
+    server = FakeWhatsAppServer(contacts).start()
+    connector = WhatsAppConnector(headless=True)
+    connector.driver = headless_chrome()
+    connector.wait = WebDriverWait(connector.driver, 30)
+    
+    try:
+        connector.driver.get(server.url)
+        connector.wait.until(
+            EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]'))
+        )
+        
+        # Scrape throughput
+        for contact in contacts:
+            for i in range(messages_per_contact):
+                server.state.inject(contact, f"scrape {i}")
+        time.sleep(0.5)  # let the page render the chat list
+        
+        start = time.perf_counter()
+        scraped = sum(len(connector.get_unread_messages(contact)) for contact in contacts)
+        scrape_seconds = time.perf_counter() - start
+        
+        # Send latency
+        send_samples = []
+        for contact in contacts:
+            start = time.perf_counter()
+            connector.send_message(contact, "ack")
+            send_samples.append(time.perf_counter() - start)
+        wait_for_replies(server, len(contacts))
+        
+        # Full cycle: arrival -> badge scan -> read -> reply recorded by the server
+        arrivals = {contact: server.state.inject(contact, "ping")['created_at'] for contact in contacts}
+        time.sleep(0.5)
+        
+        cycle_start = time.perf_counter()
+        for contact in connector.get_contacts_with_unread(contacts):
+            for msg in connector.get_unread_messages(contact):
+                connector.send_message(contact, f"pong: {msg['message']}")
+        cycle_seconds = time.perf_counter() - cycle_start
+        
+        replies = wait_for_replies(server, len(contacts))
+        cycle_samples = [reply['received_at'] - arrivals[reply['contact']] for reply in replies]
+        
+        return {
+            'contacts': contact_count,
+            'scraped': scraped,
+            'msgs_per_sec': scraped / scrape_seconds if scrape_seconds else 0.0,
+            'send_p50_ms': statistics.median(send_samples) * 1000,
+            'send_p95_ms': percentile(send_samples, 0.95) * 1000,
+            'cycle_s': cycle_seconds,
+            'reply_p50_s': statistics.median(cycle_samples) if cycle_samples else float('nan'),
+            'replies': len(replies),
+            'wait_stats': connector.get_wait_stats(),
+        }
+    
+    finally:
+        connector.disconnect()
+        server.stop()
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--contacts', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--messages', type=int, default=5, help='Incoming messages per contact for the scrape test')
+    args = parser.parse_args()
+    
+    header = f"{'contacts':>8} {'scraped':>8} {'msgs/s':>8} {'send p50':>9} {'send p95':>9} {'cycle s':>8} {'reply p50':>10} {'replies':>8}"
+    print(header)
+    results = []
+    for count in args.contacts:
+        r = run(count, args.messages)
+        results.append(r)
+        print(
+            f"{r['contacts']:>8} {r['scraped']:>8} {r['msgs_per_sec']:>8.1f} {r['send_p50_ms']:>7.0f}ms "
+            f"{r['send_p95_ms']:>7.0f}ms {r['cycle_s']:>8.2f} {r['reply_p50_s']:>9.2f}s {r['replies']:>8}"
+        )
+    
+    print("\nWait phases (last run):")
+    for phase, stats in results[-1]['wait_stats'].items():
+        print(f"  {phase}: avg={stats['avg_ms']}ms p95={stats['p95_ms']}ms max={stats['max_ms']}ms")
+
+
+if __name__ == '__main__':
+    main()
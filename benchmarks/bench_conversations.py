@@ -0,0 +1,110 @@
+"""Benchmark loading the latest messages of every contact
+
+Fills an encrypted database with N messages spread over C contacts and
+times ``ChatDatabase.get_all_conversations`` (one query with a correlated
+top-K subquery per contact) against a ROW_NUMBER() window query and the
+previous approach of one ``get_conversation`` query per contact. The
+dashboard's conversation list runs this every 30 seconds.
+
+Usage:
+    python -m benchmarks.bench_conversations [--messages 100000] [--contacts 10 100 1000] [--limit 50]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import func, select
+from src.storage.database import ChatDatabase, ChatMessage
+
+
+def fill(database: ChatDatabase, messages: int, contacts: int) -> None:
+    """Insert ``messages`` encrypted messages spread randomly over ``contacts`` contacts"""
+    start = datetime(2024, 1, 1)
+    database.add_messages([
+        {
+            'contact': f"+1555{random.randrange(contacts):07d}",
+            'message': f"message {i} with a bit of text",
+            'is_me': i % 2 == 0,
+            'timestamp': start + timedelta(seconds=i),
+        }
+        for i in range(messages)
+    ])
+
+
+def per_contact(database: ChatDatabase, limit: int) -> dict:
+    """The previous implementation: DISTINCT contacts, then one query each"""
+    session = database.Session()
+    try:
+        contacts = [contact for (contact,) in session.query(ChatMessage.contact).distinct().all()]
+    finally:
+        session.close()
+    return {contact: database.get_conversation(contact, limit) for contact in contacts}
+
+
+def windowed(database: ChatDatabase, limit: int) -> dict:
+    """ROW_NUMBER() over a partition per contact (SQLite ranks every row)"""
+    ranked = select(
+        ChatMessage.id,
+        func.row_number().over(
+            partition_by=ChatMessage.contact,
+            order_by=(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+        ).label('position')
+    ).subquery()
+    query = select(ChatMessage.contact, ChatMessage.message)\
+        .join(ranked, ChatMessage.id == ranked.c.id)\
+        .where(ranked.c.position <= limit)\
+        .order_by(ChatMessage.contact, ranked.c.position.desc())
+    
+    with database.engine.connect() as connection:
+        rows = connection.execute(query).all()
+    
+    result = {}
+    for contact, text in zip([row.contact for row in rows], database._decrypt_many([row.message for row in rows])):
+        result.setdefault(contact, []).append(text)
+    return result
+
+
+def time_call(func, repeat: int) -> float:
+    """Median wall time of ``func`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100_000)
+    parser.add_argument('--contacts', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--limit', type=int, default=50, help='Messages per contact')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'contacts':>8} {'query ms':>9} {'row_number ms':>14} {'per-contact ms':>15} {'speedup':>8}")
+        for contacts in args.contacts:
+            database = ChatDatabase(Path(tmp) / f"chat_{contacts}.db", b"bench-key")
+            fill(database, args.messages, contacts)
+            
+            latest = database.get_all_conversations(args.limit)
+            assert latest == per_contact(database, args.limit), "single query and per-contact results disagree"
+            assert windowed(database, args.limit) == {
+                contact: [msg['message'] for msg in messages] for contact, messages in latest.items()
+            }, "single query and ROW_NUMBER results disagree"
+            
+            fast = time_call(lambda: database.get_all_conversations(args.limit), args.repeat)
+            window = time_call(lambda: windowed(database, args.limit), args.repeat)
+            slow = time_call(lambda: per_contact(database, args.limit), args.repeat)
+            print(f"{contacts:>8} {fast:>9.1f} {window:>14.1f} {slow:>15.1f} {slow / fast:>7.1f}x")
+            database.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
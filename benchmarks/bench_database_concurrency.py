@@ -0,0 +1,99 @@
+"""Benchmark bot write latency while the dashboard reads
+
+A writer thread stores messages like the bot does while reader threads
+keep loading the conversation list like dashboard clients. Compares the
+default SQLite setup (bot and dashboard with their own ChatDatabase) with
+the tuned mode (WAL and pragmas, one shared ChatDatabase).
+
+Usage:
+    python -m benchmarks.bench_database_concurrency [--messages 50000] [--contacts 200] [--readers 2] [--seconds 10]
+"""
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from benchmarks.bench_conversations import fill
+from src.storage.database import ChatDatabase
+
+
+def run(path: Path, tuned: bool, shared: bool, readers: int, seconds: float, interval: float) -> dict:
+    """Write at a steady rate while readers load all conversations
+    
+    Returns:
+        Dictionary with write latency percentiles, failed writes and reads done
+    """
+    bot = ChatDatabase(path, b"bench-key", tuned=tuned)
+    dashboard = bot if shared else ChatDatabase(path, b"bench-key", tuned=tuned)
+    stop = threading.Event()
+    reads = [0] * readers
+    
+    def read(slot: int) -> None:
+        while not stop.is_set():
+            dashboard.get_all_conversations(limit_per_contact=50)
+            reads[slot] += 1
+    
+    threads = [threading.Thread(target=read, args=(slot,), daemon=True) for slot in range(readers)]
+    for thread in threads:
+        thread.start()
+    
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            bot.add_message(f"+1555{i % 200:07d}", f"new message {i}")
+            latencies.append((time.perf_counter() - start) * 1000)
+        except Exception:
+            errors += 1
+        i += 1
+        time.sleep(interval)
+    
+    stop.set()
+    for thread in threads:
+        thread.join()
+    bot.engine.dispose()
+    dashboard.engine.dispose()
+    
+    latencies.sort()
+    return {
+        'writes': len(latencies),
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': latencies[int(len(latencies) * 0.95)],
+        'max_ms': latencies[-1],
+        'errors': errors,
+        'reads': sum(reads),
+    }
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=50_000, help='Messages stored before the run')
+    parser.add_argument('--contacts', type=int, default=200)
+    parser.add_argument('--readers', type=int, default=2, help='Concurrent dashboard readers')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--interval', type=float, default=0.02, help='Seconds between writes')
+    args = parser.parse_args()
+    
+    print(f"{'mode':>18} {'writes':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'errors':>7} {'reads':>6}")
+    for label, tuned, shared in (("default, separate", False, False), ("tuned, shared", True, True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "chat.db"
+            seed = ChatDatabase(path, b"bench-key", tuned=tuned)
+            fill(seed, args.messages, args.contacts)
+            seed.engine.dispose()
+            
+            result = run(path, tuned, shared, args.readers, args.seconds, args.interval)
+            print(
+                f"{label:>18} {result['writes']:>7} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                f"{result['max_ms']:>8.1f} {result['errors']:>7} {result['reads']:>6}"
+            )
+
+
+if __name__ == '__main__':
+    main()
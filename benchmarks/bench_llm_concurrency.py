@@ -0,0 +1,96 @@
+"""Benchmark sequential vs. concurrent LLM requests against a stub API
+
+Sends the same batch of messages through ResponseGenerator.generate_response
+one at a time, then through generate_many at several concurrency limits, and
+reports wall time, throughput and the peak number of requests the stub
+server saw at once. No network or API key is needed.
+
+Usage:
+    python -m benchmarks.bench_llm_concurrency [--provider openai] [--requests 32] [--delay 0.2]
+"""
+
+import argparse
+import asyncio
+import time
+from benchmarks.stub_llm_server import StubLLMServer
+from src.ai.chat_style import ChatStyle
+from src.ai.response_generator import ResponseGenerator
+from src.config import Config
+
+
+def make_generator(provider: str, server: StubLLMServer, concurrency: int) -> ResponseGenerator:
+    """ResponseGenerator pointed at the stub server"""
+    overrides = {
+        'AI_PROVIDER': provider,
+        'AI_PROVIDERS': [provider],
+        'OPENAI_API_KEY': "stub",
+        'COHERE_API_KEY': "stub",
+        'OPENAI_BASE_URL': server.openai_base_url,
+        'COHERE_API_URL': server.url,
+        'LLM_MAX_CONCURRENCY': concurrency,
+        # Measure concurrency alone, not the account rate limits
+        'OPENAI_REQUESTS_PER_MINUTE': 0,
+        'OPENAI_TOKENS_PER_MINUTE': 0,
+        'COHERE_REQUESTS_PER_MINUTE': 0,
+        'COHERE_TOKENS_PER_MINUTE': 0,
+    }
+    for name, value in overrides.items():
+        setattr(Config, name, value)
+    return ResponseGenerator(ChatStyle(Config.CHAT_STYLE_PATH))
+
+
+def run_sequential(generator: ResponseGenerator, requests: list) -> float:
+    start = time.perf_counter()
+    for request in requests:
+        generator.generate_response(**request)
+    return time.perf_counter() - start
+
+
+def run_concurrent(generator: ResponseGenerator, requests: list) -> float:
+    async def batch():
+        start = time.perf_counter()
+        await generator.generate_many(requests)
+        seconds = time.perf_counter() - start
+        await generator.aclose()
+        return seconds
+    
+    return asyncio.run(batch())
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--provider', choices=["openai", "cohere"], default="openai")
+    parser.add_argument('--requests', type=int, default=32, help='Messages per batch')
+    parser.add_argument('--delay', type=float, default=0.2, help='Stub server seconds per request')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16])
+    args = parser.parse_args()
+    
+    server = StubLLMServer(delay=args.delay).start()
+    requests = [
+        {'message': f"message {i}", 'context': [{'message': "hey", 'is_me': False}], 'sender_name': f"+1555{i:07d}"}
+        for i in range(args.requests)
+    ]
+    
+    try:
+        print(f"{'mode':>14} {'wall s':>8} {'req/s':>8} {'peak':>6}")
+        
+        generator = make_generator(args.provider, server, 1)
+        server.reset_stats()
+        seconds = run_sequential(generator, requests)
+        generator.close()
+        print(f"{'sequential':>14} {seconds:>8.2f} {len(requests) / seconds:>8.1f} {server.stats()['max_in_flight']:>6}")
+        
+        for concurrency in args.concurrency:
+            generator = make_generator(args.provider, server, concurrency)
+            server.reset_stats()
+            seconds = run_concurrent(generator, requests)
+            label = f"async x{concurrency}"
+            print(f"{label:>14} {seconds:>8.2f} {len(requests) / seconds:>8.1f} {server.stats()['max_in_flight']:>6}")
+    
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
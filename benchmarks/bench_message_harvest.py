@@ -0,0 +1,90 @@
+"""Benchmark single-script message harvesting against the XPath loop
+
+Renders a chat with N message bubbles using the same DOM structure the
+connector targets, loads it in headless Chrome and times
+``WhatsAppConnector._harvest_messages`` (one ``execute_script``) against
+``WhatsAppConnector._harvest_messages_xpath`` (several round trips per bubble).
+
+Usage:
+    python -m benchmarks.bench_message_harvest [--sizes 50 200 500] [--repeat 5]
+"""
+
+import argparse
+import html
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.browser import headless_chrome
+from src.whatsapp.connector import WhatsAppConnector
+
+
+def render_chat_html(count: int) -> str:
+    """Render a static chat page with ``count`` alternating bubbles
+    
+    Args:
+        count: Number of message bubbles
+    
+    Returns:
+        HTML document
+    """
+    rows = []
+    for i in range(count):
+        from_me = i % 3 == 0
+        direction = "message-out" if from_me else "message-in"
+        text = html.escape(f"message {i} with a bit of text 🙂")
+        rows.append(
+            f'<div class="{direction} focusable-list-item" data-id="{str(from_me).lower()}_bench_{i}">'
+            f'<div class="_akbu"><div class="copyable-text">'
+            f'<span class="_ao3e">{text}</span><span class="_ao_h">{i // 60:02d}:{i % 60:02d}</span>'
+            f'</div></div></div>'
+        )
+    
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>'
+        '<div id="main">' + "".join(rows) + '</div></body></html>'
+    )
+
+
+def time_call(func, repeat: int) -> float:
+    """Median wall time of ``func`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    connector = WhatsAppConnector(headless=True)
+    connector.driver = headless_chrome()
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            print(f"{'bubbles':>8} {'script ms':>10} {'xpath ms':>10} {'speedup':>8}")
+            for size in args.sizes:
+                page = Path(tmp) / f"chat_{size}.html"
+                page.write_text(render_chat_html(size), encoding='utf-8')
+                connector.driver.get(page.as_uri())
+                
+                fast = connector._harvest_messages()
+                slow = connector._harvest_messages_xpath()
+                assert fast == slow, "script and XPath harvests disagree"
+                
+                script_ms = time_call(connector._harvest_messages, args.repeat)
+                xpath_ms = time_call(connector._harvest_messages_xpath, args.repeat)
+                print(f"{size:>8} {script_ms:>10.1f} {xpath_ms:>10.1f} {xpath_ms / script_ms:>7.1f}x")
+    
+    finally:
+        connector.disconnect()
+
+
+if __name__ == '__main__':
+    main()
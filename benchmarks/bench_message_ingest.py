@@ -0,0 +1,88 @@
+"""Benchmark storing messages one by one against batched inserts
+
+Writes N encrypted messages to a fresh database three ways: one
+``ChatDatabase.add_message`` call (and commit) per message, which is how
+the persist stage used to store them, ``add_messages`` in batches of
+``--batch`` (what the persist stage does with a burst), and a single
+``add_messages`` call for everything (an import or backfill). Reports
+rows/second.
+
+Usage:
+    python -m benchmarks.bench_message_ingest [--messages 1000 10000 100000] [--batch 100] [--tuned]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+from src.storage.database import ChatDatabase
+
+
+def make_messages(count: int, contacts: int = 50) -> List[Dict]:
+    """Messages alternating between incoming and sent, spread over ``contacts`` contacts"""
+    return [
+        {
+            'contact': f"+1555{i % contacts:07d}",
+            'message': f"message {i} with a bit of text",
+            'is_me': i % 2 == 1,
+            'replied_by_ai': i % 2 == 1,
+        }
+        for i in range(count)
+    ]
+
+
+def one_by_one(database: ChatDatabase, messages: List[Dict]) -> None:
+    """One transaction per message"""
+    for msg in messages:
+        database.add_message(**msg)
+
+
+def batched(database: ChatDatabase, messages: List[Dict], size: int) -> None:
+    """One transaction per ``size`` messages"""
+    for start in range(0, len(messages), size):
+        database.add_messages(messages[start:start + size])
+
+
+def rows_per_second(tmp: str, name: str, count: int, tuned: bool, store) -> float:
+    """Time ``store(database, messages)`` on a fresh database"""
+    database = ChatDatabase(Path(tmp) / f"{name}_{count}.db", b"bench-key", tuned=tuned)
+    messages = make_messages(count)
+    try:
+        start = time.perf_counter()
+        store(database, messages)
+        elapsed = time.perf_counter() - start
+        assert len(database.get_conversation(messages[0]['contact'], count)) == len(messages[::50])
+    finally:
+        database.engine.dispose()
+    return count / elapsed
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--batch', type=int, default=100, help='Messages per add_messages call')
+    parser.add_argument('--per-message-max', type=int, default=10_000,
+                        help='Skip the one-by-one run above this many messages (one commit each is slow)')
+    parser.add_argument('--tuned', action='store_true', help='Use the tuned SQLite mode (WAL)')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'messages':>8} {'one-by-one/s':>13} {f'batch {args.batch}/s':>13} {'one call/s':>11} {'speedup':>8}")
+        for count in args.messages:
+            single = None
+            if count <= args.per_message_max:
+                single = rows_per_second(tmp, "single", count, args.tuned, one_by_one)
+            chunks = rows_per_second(
+                tmp, "batch", count, args.tuned, lambda db, msgs: batched(db, msgs, args.batch)
+            )
+            whole = rows_per_second(tmp, "whole", count, args.tuned, lambda db, msgs: db.add_messages(msgs))
+            
+            single_text = f"{single:>13,.0f}" if single else f"{'skipped':>13}"
+            speedup = f"{whole / single:>7.0f}x" if single else f"{'-':>8}"
+            print(f"{count:>8} {single_text} {chunks:>13,.0f} {whole:>11,.0f} {speedup}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+"""Shared headless Chrome setup for the browser benchmarks"""
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+
+def headless_chrome() -> webdriver.Chrome:
+    """Start a throwaway headless Chrome
+    
+    Returns:
+        WebDriver instance (caller must ``quit()`` it)
+    """
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    return webdriver.Chrome(options=options)
@@ -0,0 +1,462 @@
+"""Offline stand-in for WhatsApp Web
+
+Serves a single page that reproduces the DOM structure WhatsAppConnector
+targets (search box and composer ``data-tab`` editors, ``_ak8l`` chat rows
+with ``_ahzz`` unread badges, ``#main header``, ``_akbu`` / ``copyable-text``
+bubbles with ``_ao3e`` text and ``_ao_h`` time spans, ``message-in`` /
+``message-out`` rows with ``data-id`` and ``data-icon`` ticks).
+
+Incoming messages can be injected on a schedule or on demand and every
+outgoing message is recorded with its arrival time, so the connector can be
+benchmarked and regression-tested without a phone.
+
+Usage:
+    python -m benchmarks.fake_whatsapp --contacts 10 --rate 2
+
+Then point the bot at it with ``WHATSAPP_WEB_URL=http://127.0.0.1:8765``.
+Loading the page with ``?keep=N`` keeps only the newest N bubbles in the DOM,
+like WhatsApp's virtualized message list.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+PAGE_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>WhatsApp</title>
+<style>
+  body { font-family: sans-serif; margin: 0; display: flex; height: 100vh; }
+  #side { width: 30%; border-right: 1px solid #ccc; overflow-y: auto; }
+  #main { flex: 1; display: flex; flex-direction: column; }
+  #messages { flex: 1; overflow-y: auto; }
+  ._ak8l { padding: 6px; border-bottom: 1px solid #eee; cursor: pointer; }
+  ._ahzz { background: #25d366; border-radius: 8px; padding: 0 5px; margin-left: 6px; }
+  .message-out { text-align: right; }
+  div[contenteditable] { border: 1px solid #999; min-height: 1.4em; padding: 4px; white-space: pre-wrap; }
+</style>
+</head>
+<body>
+<div id="side">
+  <div contenteditable="true" data-tab="3" id="search"></div>
+  <div id="pane-side"></div>
+</div>
+<div id="main" style="display: none">
+  <header><span id="chat-title" title=""></span></header>
+  <div id="messages"></div>
+  <footer><div contenteditable="true" data-tab="10" id="composer"></div></footer>
+</div>
+<script>
+const rows = {};
+const rendered = {};
+const pendingRows = [];
+const keep = Number(new URLSearchParams(location.search).get('keep')) || 0;
+let openChat = null;
+
+function renderChats(chats) {
+  const pane = document.getElementById('pane-side');
+  chats.forEach(function (chat) {
+    let row = rows[chat.title];
+    if (!row) {
+      row = document.createElement('div');
+      row.className = '_ak8l';
+      const title = document.createElement('span');
+      title.setAttribute('title', chat.title);
+      title.textContent = chat.title;
+      row.appendChild(title);
+      row.addEventListener('click', function () { openConversation(chat.title); });
+      pane.appendChild(row);
+      rows[chat.title] = row;
+    }
+    let badge = row.querySelector('span._ahzz');
+    if (chat.unread > 0 && chat.title !== openChat) {
+      if (!badge) {
+        badge = document.createElement('span');
+        badge.className = '_ahzz';
+        row.appendChild(badge);
+      }
+      badge.textContent = String(chat.unread);
+    } else if (badge) {
+      badge.remove();
+    }
+  });
+  filterChats();
+}
+
+function filterChats() {
+  // Like WhatsApp's search results: chats that do not match leave the DOM
+  const query = document.getElementById('search').innerText.trim().toLowerCase();
+  const pane = document.getElementById('pane-side');
+  Object.keys(rows).forEach(function (title) {
+    const row = rows[title];
+    if (title.toLowerCase().indexOf(query) >= 0) {
+      if (!row.parentNode) {
+        pane.appendChild(row);
+      }
+    } else if (row.parentNode) {
+      row.remove();
+    }
+  });
+}
+
+function adoptPending(msg) {
+  // Give a pending bubble its server id once the server has stored it
+  for (let i = 0; i < pendingRows.length; i++) {
+    if (pendingRows[i].text === msg.text) {
+      const row = pendingRows.splice(i, 1)[0].row;
+      row.setAttribute('data-id', msg.id);
+      row.querySelector('span._ao_h').textContent = msg.time;
+      row.querySelector('span[data-icon]').setAttribute('data-icon', msg.tick || 'msg-check');
+      rendered[msg.id] = row;
+      return true;
+    }
+  }
+  return false;
+}
+
+function renderMessage(msg) {
+  if (rendered[msg.id]) {
+    const tick = rendered[msg.id].querySelector('span[data-icon]');
+    if (tick && msg.tick) {
+      tick.setAttribute('data-icon', msg.tick);
+    }
+    return;
+  }
+  if (msg.from_me && adoptPending(msg)) {
+    return;
+  }
+  const row = document.createElement('div');
+  row.className = (msg.from_me ? 'message-out' : 'message-in') + ' focusable-list-item';
+  if (msg.id) {
+    row.setAttribute('data-id', msg.id);
+  }
+  const bubble = document.createElement('div');
+  bubble.className = '_akbu';
+  const copyable = document.createElement('div');
+  copyable.className = 'copyable-text';
+  const text = document.createElement('span');
+  text.className = '_ao3e';
+  text.textContent = msg.text;
+  const time = document.createElement('span');
+  time.className = '_ao_h';
+  time.textContent = msg.time;
+  copyable.appendChild(text);
+  copyable.appendChild(time);
+  if (msg.from_me) {
+    const tick = document.createElement('span');
+    tick.setAttribute('data-icon', msg.tick || 'msg-time');
+    copyable.appendChild(tick);
+  }
+  bubble.appendChild(copyable);
+  row.appendChild(bubble);
+  const list = document.getElementById('messages');
+  list.appendChild(row);
+  while (keep && list.children.length > keep) {
+    // Trimmed rows stay in ``rendered`` so polling does not add them back
+    list.removeChild(list.firstChild);
+  }
+  if (msg.id) {
+    rendered[msg.id] = row;
+  }
+  return row;
+}
+
+function openConversation(title) {
+  openChat = title;
+  Object.keys(rendered).forEach(function (id) { delete rendered[id]; });
+  pendingRows.length = 0;
+  document.getElementById('messages').innerHTML = '';
+  document.getElementById('chat-title').setAttribute('title', title);
+  document.getElementById('chat-title').textContent = title;
+  document.getElementById('main').style.display = '';
+  poll();
+}
+
+function sendComposer() {
+  const composer = document.getElementById('composer');
+  const text = composer.innerText.replace(/\\n$/, '');
+  composer.innerHTML = '';
+  if (!openChat || !text.trim()) {
+    return;
+  }
+  const row = renderMessage({id: null, from_me: true, text: text, time: '', tick: 'msg-time'});
+  pendingRows.push({text: text, row: row});
+  fetch('/api/send', {method: 'POST', body: JSON.stringify({contact: openChat, text: text})})
+    .then(function (r) { return r.json(); })
+    .then(function (msg) {
+      if (!rendered[msg.id]) {
+        adoptPending(msg);
+      }
+    });
+}
+
+function poll() {
+  const url = '/api/state' + (openChat ? '?open=' + encodeURIComponent(openChat) : '');
+  return fetch(url).then(function (r) { return r.json(); }).then(function (state) {
+    renderChats(state.chats);
+    if (state.open === openChat) {
+      state.messages.forEach(renderMessage);
+    }
+  });
+}
+
+document.getElementById('search').addEventListener('input', filterChats);
+document.getElementById('search').addEventListener('keydown', function (event) {
+  if (event.key === 'Escape') {
+    event.preventDefault();
+    event.target.innerHTML = '';
+    filterChats();
+  }
+});
+document.getElementById('composer').addEventListener('paste', function (event) {
+  // Like WhatsApp's editor: consume the paste and insert plain text a moment later
+  event.preventDefault();
+  const text = event.clipboardData.getData('text/plain');
+  setTimeout(function () {
+    text.split('\\n').forEach(function (line, i) {
+      if (i > 0) {
+        document.execCommand('insertLineBreak');
+      }
+      if (line) {
+        document.execCommand('insertText', false, line);
+      }
+    });
+  }, 50);
+});
+document.getElementById('composer').addEventListener('keydown', function (event) {
+  if (event.key === 'Enter' && !event.shiftKey) {
+    event.preventDefault();
+    sendComposer();
+  }
+});
+setInterval(poll, 200);
+poll();
+</script>
+</body>
+</html>
+"""
+
+
+class FakeWhatsAppState:
+    """Chats, messages and recorded outgoing traffic of the fake server"""
+    
+    def __init__(self, contacts: List[str]):
+        """Initialize state
+        
+        Args:
+            contacts: Chat titles to show in the chat list
+        """
+        self.lock = threading.Lock()
+        self.contacts = list(contacts)
+        self.messages: Dict[str, List[Dict]] = {contact: [] for contact in contacts}
+        self.unread: Dict[str, int] = {contact: 0 for contact in contacts}
+        self.sent: List[Dict] = []
+        self.next_id = 0
+    
+    def _new_message(self, contact: str, text: str, from_me: bool) -> Dict:
+        self.next_id += 1
+        now = time.time()
+        msg = {
+            'id': f"{str(from_me).lower()}_{contact}_{self.next_id}",
+            'from_me': from_me,
+            'text': text,
+            'time': time.strftime("%H:%M", time.localtime(now)),
+            'tick': 'msg-check' if from_me else None,
+            'created_at': now,
+        }
+        self.messages[contact].append(msg)
+        return msg
+    
+    def inject(self, contact: str, text: str) -> Dict:
+        """Add an incoming message from a contact
+        
+        Args:
+            contact: Chat title
+            text: Message text
+        
+        Returns:
+            The stored message
+        """
+        with self.lock:
+            if contact not in self.messages:
+                self.contacts.append(contact)
+                self.messages[contact] = []
+                self.unread[contact] = 0
+            self.unread[contact] += 1
+            return self._new_message(contact, text, from_me=False)
+    
+    def record_sent(self, contact: str, text: str) -> Dict:
+        """Record an outgoing message typed into the composer
+        
+        Args:
+            contact: Chat title
+            text: Message text
+        
+        Returns:
+            The stored message
+        """
+        with self.lock:
+            msg = self._new_message(contact, text, from_me=True)
+            self.sent.append({'contact': contact, 'text': text, 'received_at': msg['created_at']})
+            return msg
+    
+    def snapshot(self, open_chat: Optional[str]) -> Dict:
+        """Chat list plus the open chat's messages, marking it read
+        
+        Args:
+            open_chat: Title of the conversation shown by the page
+        
+        Returns:
+            JSON-serializable page state
+        """
+        with self.lock:
+            messages = []
+            if open_chat in self.messages:
+                self.unread[open_chat] = 0
+                messages = [
+                    {key: value for key, value in msg.items() if key != 'created_at'}
+                    for msg in self.messages[open_chat]
+                ]
+            return {
+                'chats': [{'title': c, 'unread': self.unread[c]} for c in self.contacts],
+                'open': open_chat,
+                'messages': messages,
+            }
+    
+    def drain_sent(self) -> List[Dict]:
+        """Return and clear the recorded outgoing messages"""
+        with self.lock:
+            sent, self.sent = self.sent, []
+            return sent
+
+
+class FakeWhatsAppServer:
+    """Threaded HTTP server hosting the fake WhatsApp Web page"""
+    
+    def __init__(self, contacts: List[str], host: str = "127.0.0.1", port: int = 0):
+        """Initialize server
+        
+        Args:
+            contacts: Chat titles to show in the chat list
+            host: Bind address
+            port: Bind port (0 picks a free port)
+        """
+        self.state = FakeWhatsAppState(contacts)
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+        self._injector = None
+        self._stop = threading.Event()
+    
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+    
+    def _make_handler(self):
+        state = self.state
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+            
+            def _reply(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def _json(self, data, status: int = 200) -> None:
+                self._reply(status, json.dumps(data).encode(), "application/json")
+            
+            def _body(self) -> Dict:
+                length = int(self.headers.get("Content-Length", 0))
+                return json.loads(self.rfile.read(length) or b"{}")
+            
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/":
+                    self._reply(200, PAGE_HTML.encode(), "text/html; charset=utf-8")
+                elif url.path == "/api/state":
+                    open_chat = parse_qs(url.query).get("open", [None])[0]
+                    self._json(state.snapshot(open_chat))
+                elif url.path == "/api/sent":
+                    self._json(state.drain_sent())
+                else:
+                    self._json({'error': 'not found'}, 404)
+            
+            def do_POST(self):
+                url = urlparse(self.path)
+                data = self._body()
+                if url.path == "/api/send":
+                    self._json(state.record_sent(data['contact'], data['text']))
+                elif url.path == "/api/inject":
+                    self._json(state.inject(data['contact'], data['text']))
+                else:
+                    self._json({'error': 'not found'}, 404)
+        
+        return Handler
+    
+    def start(self) -> "FakeWhatsAppServer":
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def schedule_incoming(self, rate_per_second: float, texts: Optional[List[str]] = None) -> None:
+        """Inject incoming messages from random contacts at a steady rate
+        
+        Args:
+            rate_per_second: Messages per second across all contacts
+            texts: Message texts to pick from
+        """
+        texts = texts or ["hey", "u there?", "what's the plan for tonight?", "lol", "ok thanks!"]
+        
+        def run():
+            while not self._stop.wait(1.0 / rate_per_second):
+                self.state.inject(random.choice(self.state.contacts), random.choice(texts))
+        
+        self._injector = threading.Thread(target=run, daemon=True)
+        self._injector.start()
+    
+    def stop(self) -> None:
+        """Stop serving and injecting"""
+        self._stop.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    """Run the fake server in the foreground"""
+    parser = argparse.ArgumentParser(description="Offline stand-in for WhatsApp Web")
+    parser.add_argument('--contacts', type=int, default=10, help='Number of fake contacts')
+    parser.add_argument('--rate', type=float, default=0, help='Incoming messages per second (0 = none)')
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    
+    contacts = [f"+1555{i:07d}" for i in range(args.contacts)]
+    server = FakeWhatsAppServer(contacts, host=args.host, port=args.port).start()
+    if args.rate > 0:
+        server.schedule_incoming(args.rate)
+    
+    print(f"Fake WhatsApp Web running on {server.url} with {len(contacts)} contacts")
+    print("Press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
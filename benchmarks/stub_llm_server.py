@@ -0,0 +1,218 @@
+"""Local stand-in for the OpenAI and Cohere chat APIs
+
+Answers ``POST /v1/chat/completions`` (OpenAI) and ``POST /v1/chat``
+(Cohere) after a fixed delay, so the LLM client path can be benchmarked and
+tested without network access or API keys. A share of requests can be made
+slow or fail (HTTP 500, or 429 with a Retry-After header) to exercise
+failover, hedging and retries. The server
+counts requests and records the highest number it was handling at once.
+
+Usage:
+    python -m benchmarks.stub_llm_server --delay 0.5 [--error-rate 0.1 --error-status 429 --retry-after 1]
+        [--slow-rate 0.05 --slow-delay 5]
+
+Then point the bot at it with ``OPENAI_BASE_URL=http://127.0.0.1:8766/v1``
+or ``COHERE_API_URL=http://127.0.0.1:8766``.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 refuses connections under concurrent load
+    request_queue_size = 128
+
+
+class StubLLMServer:
+    """Threaded HTTP server imitating the chat endpoints of both providers"""
+    
+    def __init__(
+        self,
+        delay: float = 0.2,
+        reply: str = "sounds good!",
+        host: str = "127.0.0.1",
+        port: int = 0,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_delay: float = 5.0,
+        error_status: int = 500,
+        retry_after: Optional[float] = None
+    ):
+        """Initialize server
+        
+        Args:
+            delay: Seconds each request takes to answer
+            reply: Text returned for every request
+            host: Bind address
+            port: Bind port (0 picks a free port)
+            error_rate: Share of requests answered with ``error_status``
+            slow_rate: Share of requests that take ``slow_delay`` instead
+            slow_delay: Seconds a slow request takes
+            error_status: HTTP status of injected errors (e.g. 429)
+            retry_after: Retry-After seconds sent with injected errors (None to omit)
+        """
+        self.delay = delay
+        self.reply = reply
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.error_status = error_status
+        self.retry_after = retry_after
+        # Requests that fail regardless of error_rate, counted down as they are served
+        self.fail_next = 0
+        self.errors = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.httpd = _Server((host, port), self._make_handler())
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def openai_base_url(self) -> str:
+        return f"{self.url}/v1"
+    
+    def stats(self) -> Dict[str, int]:
+        """Requests served and peak concurrency"""
+        with self._lock:
+            return {'requests': self.requests, 'errors': self.errors, 'max_in_flight': self.max_in_flight}
+    
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+            self.max_in_flight = 0
+    
+    def _begin(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+    
+    def _end(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _json(self, data, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                
+                server._begin()
+                try:
+                    time.sleep(server.slow_delay if random.random() < server.slow_rate else server.delay)
+                finally:
+                    server._end()
+                
+                with server._lock:
+                    fail = server.fail_next > 0 or random.random() < server.error_rate
+                    if fail:
+                        server.fail_next = max(server.fail_next - 1, 0)
+                        server.errors += 1
+                
+                if fail:
+                    headers = {}
+                    if server.retry_after is not None:
+                        headers["Retry-After"] = str(server.retry_after)
+                    self._json({'message': 'injected error'}, server.error_status, headers)
+                elif self.path.rstrip("/") == "/v1/chat/completions":
+                    self._json({
+                        'id': f"chatcmpl-{uuid.uuid4().hex}",
+                        'object': "chat.completion",
+                        'created': int(time.time()),
+                        'model': request.get('model', "stub"),
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': "assistant", 'content': server.reply},
+                            'finish_reason': "stop",
+                        }],
+                        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                    })
+                elif self.path.rstrip("/") == "/v1/chat":
+                    self._json({
+                        'response_id': uuid.uuid4().hex,
+                        'generation_id': uuid.uuid4().hex,
+                        'text': server.reply,
+                    })
+                else:
+                    self._json({'error': 'not found'}, 404)
+        
+        return Handler
+    
+    def start(self) -> "StubLLMServer":
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """Stop serving"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    """Run the stub server in the foreground"""
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI and Cohere chat APIs")
+    parser.add_argument('--delay', type=float, default=0.2, help='Seconds per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing')
+    parser.add_argument('--error-status', type=int, default=500, help='HTTP status of failed requests')
+    parser.add_argument('--retry-after', type=float, default=None, help='Retry-After seconds sent with failures')
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='Share of requests taking --slow-delay')
+    parser.add_argument('--slow-delay', type=float, default=5.0)
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+    
+    server = StubLLMServer(
+        delay=args.delay,
+        host=args.host,
+        port=args.port,
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+        slow_delay=args.slow_delay,
+        error_status=args.error_status,
+        retry_after=args.retry_after
+    ).start()
+    print(f"Stub LLM API running on {server.url} ({args.delay}s per request)")
+    print("Press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -78,10 +78,12 @@ Before running:
         print("\nPress Ctrl+C to stop both services.\n")
         
         import threading
+        from src.dashboard.app import database
         
         def run_bot():
             try:
-                bot = DigiMeBot()
+                # One database (engine, connection pool, caches) for both services
+                bot = DigiMeBot(database=database)
                 bot.start()
             except Exception as e:
                 print(f"Bot error: {e}")
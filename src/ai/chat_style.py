@@ -1,9 +1,18 @@
 """Chat style management for maintaining user's tone and personality"""
 
+import hashlib
 import json
+import re
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime
+from src.ai.example_index import ExampleIndex
+from src.ai.prompt_builder import estimate_tokens
+
+
+# Longest chunk sent as one WhatsApp message when break_long_messages is on
+DEFAULT_CHUNK_LENGTH = 160
 
 
 class ChatStyle:
@@ -17,6 +26,16 @@ class ChatStyle:
         """
         self.style_path = style_path
         self.style_data = self._load_style()
+        
+        # Bumped on every change; compiled prompt parts are kept per version
+        self.version = 0
+        self._compiled: Dict[str, Any] = {}
+        self._compiled_lock = threading.RLock()
+        
+        # Relevance index over example contexts, built on first use and kept
+        # for the style version it was built (or last extended) for
+        self._example_index: Optional[ExampleIndex] = None
+        self._example_index_version = -1
     
     def _load_style(self) -> Dict:
         """Load style from JSON file"""
@@ -26,12 +45,37 @@ class ChatStyle:
         with open(self.style_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     
+    def compiled(self, name: str, build: Callable[[], Any]) -> Any:
+        """Get a value derived from the style, building it once per version
+        
+        Args:
+            name: Name of the derived value (e.g. a provider's prompt prefix)
+            build: Builds the value from the current style
+        
+        Returns:
+            The value for the current version (shared, do not modify)
+        """
+        with self._compiled_lock:
+            if name not in self._compiled:
+                self._compiled[name] = build()
+            return self._compiled[name]
+    
+    def _invalidate(self) -> None:
+        """Start a new version after the style changed"""
+        with self._compiled_lock:
+            self.version += 1
+            self._compiled = {}
+    
     def get_system_prompt(self) -> str:
         """Generate system prompt for AI based on chat style
         
         Returns:
             System prompt string
         """
+        return self.compiled("system_prompt", self._build_system_prompt)
+    
+    def _build_system_prompt(self) -> str:
+        """Render the system prompt from the style data"""
         personality = self.style_data.get("personality", {})
         phrases_use = self.style_data.get("phrases_i_use", [])
         phrases_avoid = self.style_data.get("phrases_i_avoid", [])
@@ -74,6 +118,41 @@ Respond naturally as this person would, maintaining their unique communication s
         """
         return self.style_data.get("example_conversations", [])
     
+    def select_examples(self, message: str, limit: int = 3, token_budget: int = 400) -> List[Dict]:
+        """Pick the example conversations most relevant to a message
+        
+        Args:
+            message: Incoming message
+            limit: Maximum number of examples
+            token_budget: Maximum estimated tokens across the chosen examples
+        
+        Returns:
+            Example conversation dictionaries, most relevant first
+        """
+        if limit <= 0:
+            return []
+        
+        with self._compiled_lock:
+            examples = self.get_example_conversations()
+            if self._example_index is None or self._example_index_version != self.version:
+                self._example_index = ExampleIndex([ex.get("context", "") for ex in examples])
+                self._example_index_version = self.version
+            index = self._example_index
+        
+        selected = []
+        used = 0
+        for position in index.rank(message):
+            example = examples[position]
+            tokens = estimate_tokens(example.get("context", "")) + estimate_tokens(example.get("my_response", ""))
+            if used + tokens > token_budget:
+                continue
+            selected.append(example)
+            used += tokens
+            if len(selected) >= limit:
+                break
+        
+        return selected
+    
     def get_greeting(self) -> str:
         """Get a random greeting from the style
         
@@ -102,6 +181,7 @@ Respond naturally as this person would, maintaining their unique communication s
         """
         # Deep merge updates into style_data
         self._deep_merge(self.style_data, updates)
+        self._invalidate()
         self._save_style()
     
     def add_example_conversation(self, context: str, response: str) -> None:
@@ -111,14 +191,22 @@ Respond naturally as this person would, maintaining their unique communication s
             context: Context or question
             response: User's typical response
         """
-        if "example_conversations" not in self.style_data:
-            self.style_data["example_conversations"] = []
-        
-        self.style_data["example_conversations"].append({
-            "context": context,
-            "my_response": response,
-            "added_at": datetime.now().isoformat()
-        })
+        with self._compiled_lock:
+            if "example_conversations" not in self.style_data:
+                self.style_data["example_conversations"] = []
+            
+            self.style_data["example_conversations"].append({
+                "context": context,
+                "my_response": response,
+                "added_at": datetime.now().isoformat()
+            })
+            # Extend a current index in place rather than rebuilding it for the new version
+            current = self._example_index is not None and self._example_index_version == self.version
+            if current:
+                self._example_index.add(context)
+            self._invalidate()
+            if current:
+                self._example_index_version = self.version
         self._save_style()
     
     def _save_style(self) -> None:
@@ -139,6 +227,26 @@ Respond naturally as this person would, maintaining their unique communication s
             else:
                 base[key] = value
     
+    def fingerprint(self) -> str:
+        """Short hash of the current style, for keying cached replies
+        
+        Returns:
+            Hex digest that changes whenever the style data changes
+        """
+        return self.compiled("fingerprint", self._build_fingerprint)
+    
+    def _build_fingerprint(self) -> str:
+        data = json.dumps(self.style_data, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(data.encode()).hexdigest()[:16]
+    
+    def remembers_conversations(self) -> bool:
+        """Whether older conversation (beyond the recent context) should be remembered
+        
+        Returns:
+            ``context_preferences.remember_previous_conversations`` (default True)
+        """
+        return self.style_data.get("context_preferences", {}).get("remember_previous_conversations", True)
+    
     def get_max_response_length(self) -> int:
         """Get maximum response length from style
         
@@ -146,3 +254,39 @@ Respond naturally as this person would, maintaining their unique communication s
             Maximum response length
         """
         return self.style_data.get("response_rules", {}).get("max_length", 500)
+    
+    def split_reply(self, text: str) -> List[str]:
+        """Split a reply into WhatsApp-sized messages
+        
+        Honors ``response_rules.break_long_messages``: paragraphs always start
+        a new message, and sentences are packed into messages of at most
+        ``response_rules.chunk_length`` characters. Sentences are never cut.
+        
+        Args:
+            text: Reply text
+        
+        Returns:
+            List of messages to send, in order
+        """
+        text = text.strip()
+        rules = self.style_data.get("response_rules", {})
+        max_length = rules.get("chunk_length", DEFAULT_CHUNK_LENGTH)
+        
+        if not rules.get("break_long_messages", False) or len(text) <= max_length:
+            return [text] if text else []
+        
+        chunks = []
+        for paragraph in re.split(r'\n\s*\n', text):
+            current = ""
+            for sentence in re.split(r'(?<=[.!?])[ \t]+', paragraph.strip()):
+                if not sentence:
+                    continue
+                if current and len(current) + 1 + len(sentence) > max_length:
+                    chunks.append(current)
+                    current = sentence
+                else:
+                    current = f"{current} {sentence}" if current else sentence
+            if current:
+                chunks.append(current)
+        
+        return chunks
@@ -0,0 +1,99 @@
+"""Local relevance index over example conversations"""
+
+import re
+import threading
+import zlib
+from typing import List, Optional
+import numpy as np
+
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Function words that say nothing about what a message is about
+STOP_WORDS = frozenset(
+    "a an and are at be but by did do does for from had has have i in is it "
+    "its me my of on or so that the this to was we were what when with you your".split()
+)
+
+
+class ExampleIndex:
+    """TF-IDF over hashed word and bigram features
+    
+    Each example context becomes a row of term counts in a fixed number of
+    hashed dimensions, so adding an example only appends a row and updates
+    the document frequencies. Queries score every row by cosine similarity
+    of the TF-IDF vectors.
+    """
+    
+    def __init__(self, texts: Optional[List[str]] = None, dimensions: int = 2048):
+        """Initialize index
+        
+        Args:
+            texts: Initial example contexts, in order
+            dimensions: Number of hashed feature dimensions
+        """
+        self.dimensions = dimensions
+        self._counts = np.zeros((max(len(texts or []), 16), dimensions), dtype=np.float32)
+        self._doc_freq = np.zeros(dimensions, dtype=np.float32)
+        self._size = 0
+        self._weighted = None
+        self._lock = threading.Lock()
+        
+        for text in texts or []:
+            self.add(text)
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def _vectorize(self, text: str) -> np.ndarray:
+        """Hashed term counts of a text"""
+        words = [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOP_WORDS]
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in features:
+            vector[zlib.crc32(feature.encode()) % self.dimensions] += 1
+        return vector
+    
+    def add(self, text: str) -> None:
+        """Append an example context
+        
+        Args:
+            text: Example context (the message the example answers)
+        """
+        vector = self._vectorize(text)
+        with self._lock:
+            if self._size == len(self._counts):
+                self._counts = np.vstack([self._counts, np.zeros_like(self._counts)])
+            self._counts[self._size] = vector
+            self._doc_freq += vector > 0
+            self._size += 1
+            self._weighted = None
+    
+    def _weighted_rows(self):
+        """Unit-length TF-IDF rows and the IDF vector (caller holds the lock)"""
+        if self._weighted is None:
+            idf = np.log((1 + self._size) / (1 + self._doc_freq)) + 1
+            rows = np.log1p(self._counts[:self._size]) * idf
+            norms = np.linalg.norm(rows, axis=1, keepdims=True)
+            self._weighted = (rows / np.maximum(norms, 1e-9), idf)
+        return self._weighted
+    
+    def rank(self, query: str) -> List[int]:
+        """Order all examples by relevance to a query
+        
+        Args:
+            query: Incoming message
+        
+        Returns:
+            Example positions, most relevant first (newer examples win ties)
+        """
+        with self._lock:
+            if not self._size:
+                return []
+            rows, idf = self._weighted_rows()
+        
+        vector = np.log1p(self._vectorize(query)) * idf
+        scores = rows @ (vector / max(float(np.linalg.norm(vector)), 1e-9))
+        # lexsort sorts by the last key first; reverse both for descending order
+        return [int(i) for i in np.lexsort((-np.arange(len(scores)), -scores))]
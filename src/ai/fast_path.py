@@ -0,0 +1,199 @@
+"""Local replies to trivial messages, without an LLM request"""
+
+import random
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.ai.chat_style import ChatStyle
+from src.ai.reply_cache import normalize_message
+
+
+# Messages recognised per intent (normalized with _normalize before compiling)
+INTENT_TRIGGERS = {
+    "greeting": [
+        "hi", "hey", "hello", "hi there", "hey there", "heya", "hiya", "yo", "sup", "wassup", "whats up",
+        "howdy", "morning", "good morning", "good afternoon", "good evening", "gm",
+    ],
+    "thanks": [
+        "thanks", "thank you", "thank u", "thanks a lot", "thanks so much", "thank you so much",
+        "thx", "ty", "tysm", "cheers", "appreciate it", "much appreciated",
+    ],
+    "acknowledgment": [
+        "ok", "okay", "k", "kk", "cool", "got it", "alright", "sounds good", "nice",
+        "great", "perfect", "noted", "will do", "sure", "awesome",
+    ],
+    "farewell": [
+        "bye", "bye bye", "goodbye", "see you", "see ya", "cya", "later", "see you later",
+        "talk soon", "talk later", "ttyl", "good night", "gn", "take care",
+    ],
+}
+
+# language_patterns key holding the style's own replies per intent
+REPLY_PATTERNS = {
+    "greeting": "greetings",
+    "thanks": "thanks_replies",
+    "acknowledgment": "acknowledgments",
+    "farewell": "farewells",
+}
+
+# Intents whose reply phrases are also things contacts say to us
+TRIGGERS_FROM_STYLE = ("greeting", "acknowledgment", "farewell")
+
+# A line of the message (bursts are joined by newlines) ending in a question mark
+QUESTION = re.compile(r"\?\s*$", re.MULTILINE)
+
+
+def _normalize(text: str) -> str:
+    """Normalize like the reply cache, and squeeze repeated letters ("heyy" -> "hey")"""
+    return re.sub(r"(\w)\1+", r"\1", normalize_message(text))
+
+
+def trie_pattern(phrases: Iterable[str]) -> str:
+    """Regular expression matching any of the phrases, built from their prefix trie
+    
+    Phrases sharing a prefix share one branch ("thank you" and "thanks" become
+    ``thank(?:\\ you|s)``), so matching never backtracks over a common prefix.
+    Longer phrases are preferred.
+    
+    Args:
+        phrases: Phrases to match
+    
+    Returns:
+        Pattern without anchors or groups to capture
+    """
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def render(node: Dict) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # A phrase may end here; the greedy group still tries the longer ones first
+        return f"(?:{body})?" if "" in node else body
+    
+    return render(trie)
+
+
+class FastPathReplier:
+    """Answers greetings, thanks, acknowledgments and farewells from the style's phrases
+    
+    All trigger phrases are compiled into one regular expression with a
+    named group per intent. The confidence of a match is the share of the
+    message's words covered by phrases of the winning intent, so "hey!!" is
+    answered locally while "hey, are you free tonight?" goes to the LLM.
+    Questions always go to the LLM: normalizing drops the "?", and "ok?" or
+    "later?" want an answer, not an acknowledgment. The compiled table is
+    rebuilt when the chat style changes.
+    """
+    
+    def __init__(
+        self,
+        chat_style: ChatStyle,
+        min_confidence: float = 0.8,
+        disabled_contacts: Optional[List[str]] = None
+    ):
+        """Initialize fast path
+        
+        Args:
+            chat_style: Chat style providing the reply phrases
+            min_confidence: Share of the message a match must cover to be answered
+            disabled_contacts: Contacts whose messages always go to the LLM
+        """
+        self.chat_style = chat_style
+        self.min_confidence = min_confidence
+        self.disabled_contacts = set(disabled_contacts or [])
+        
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._answered: Dict[str, int] = {intent: 0 for intent in INTENT_TRIGGERS}
+    
+    def _build(self) -> Tuple[re.Pattern, Dict[str, List[str]]]:
+        """Compile the trigger table and collect reply phrases of the current style"""
+        patterns = self.chat_style.style_data.get("language_patterns", {})
+        groups = []
+        replies = {}
+        for intent, triggers in INTENT_TRIGGERS.items():
+            phrases = {_normalize(trigger) for trigger in triggers}
+            if intent in TRIGGERS_FROM_STYLE:
+                phrases.update(_normalize(phrase) for phrase in patterns.get(REPLY_PATTERNS[intent], []))
+            phrases.discard("")
+            groups.append(f"(?P<{intent}>{trie_pattern(phrases)})")
+            replies[intent] = list(patterns.get(REPLY_PATTERNS[intent], []))
+        
+        return re.compile(rf"\b(?:{'|'.join(groups)})\b"), replies
+    
+    def classify(self, message: str) -> Tuple[Optional[str], float]:
+        """Find the intent of a message
+        
+        Args:
+            message: Incoming message text (a burst joined by newlines)
+        
+        Returns:
+            Tuple of (intent or None, confidence between 0 and 1)
+        """
+        pattern, _ = self.chat_style.compiled("fast_path", self._build)
+        return self._classify(pattern, message)
+    
+    @staticmethod
+    def _classify(pattern: re.Pattern, message: str) -> Tuple[Optional[str], float]:
+        if QUESTION.search(message):
+            return None, 0.0
+        
+        text = _normalize(message)
+        words = len(text.split())
+        if not words:
+            return None, 0.0
+        
+        covered: Dict[str, int] = {}
+        for match in pattern.finditer(text):
+            covered[match.lastgroup] = covered.get(match.lastgroup, 0) + len(match.group().split())
+        
+        if not covered:
+            return None, 0.0
+        intent = max(covered, key=covered.get)
+        return intent, covered[intent] / words
+    
+    def reply(self, contact: str, message: str, count: int = 1) -> Optional[str]:
+        """Answer a trivial message locally
+        
+        Args:
+            contact: Contact phone number
+            message: Incoming message text
+            count: Incoming messages the text stands for (a burst's size), for the stats
+        
+        Returns:
+            Reply from the style's phrases, or None if the LLM should answer
+        """
+        answer = None
+        if contact not in self.disabled_contacts:
+            pattern, replies = self.chat_style.compiled("fast_path", self._build)
+            intent, confidence = self._classify(pattern, message)
+            if intent is not None and confidence >= self.min_confidence and replies[intent]:
+                answer = random.choice(replies[intent])
+        
+        with self._lock:
+            self._checked += count
+            if answer is not None:
+                self._answered[intent] += count
+        return answer
+    
+    def stats(self) -> Dict:
+        """Share of incoming messages answered without an LLM request
+        
+        Returns:
+            Dictionary with checked, answered, share and answered per intent,
+            counted in messages (a burst answered with one reply counts each message)
+        """
+        with self._lock:
+            answered = sum(self._answered.values())
+            return {
+                'checked': self._checked,
+                'answered': answered,
+                'share': round(answered / self._checked, 3) if self._checked else 0.0,
+                'by_intent': dict(self._answered),
+            }
@@ -0,0 +1,125 @@
+"""Token-budgeted prompt assembly shared by the AI providers"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+# Rough characters per token for budget estimates (no tokenizer needed)
+CHARS_PER_TOKEN = 4
+
+# Tokens a chat API spends on each message besides its text (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Tokens of the current message kept even when the system prompt leaves no room
+MIN_MESSAGE_TOKENS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the number of tokens in a text
+    
+    Args:
+        text: Any text
+    
+    Returns:
+        Estimated token count
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chars_to_tokens(chars: int) -> int:
+    """Tokens needed for a reply of up to ``chars`` characters"""
+    return max(math.ceil(chars / CHARS_PER_TOKEN), 1)
+
+
+@dataclass
+class Prompt:
+    """Prompt content that fits the input budget, ready for a provider"""
+    system: str
+    message: str
+    context: List[Dict] = field(default_factory=list)
+    examples: List[Dict] = field(default_factory=list)
+    tokens: int = 0
+    summary: str = ""
+
+
+class PromptBuilder:
+    """Fills an input token budget by priority
+    
+    The system prompt always goes in, then the current message (cut from
+    the front if it alone would overflow, but never below its last
+    ``MIN_MESSAGE_TOKENS``, even if that exceeds the budget), then the
+    summary of older conversation, then the most recent context turns,
+    then example conversations in the order given. Whatever does not fit
+    is dropped, lowest priority first.
+    """
+    
+    def __init__(self, input_budget: int = 1500, max_context_turns: int = 10):
+        """Initialize builder
+        
+        Args:
+            input_budget: Maximum estimated prompt tokens
+            max_context_turns: Most previous messages considered as context
+        """
+        self.input_budget = input_budget
+        self.max_context_turns = max_context_turns
+    
+    def build(
+        self,
+        system: str,
+        message: str,
+        context: Optional[List[Dict]] = None,
+        examples: Optional[List[Dict]] = None,
+        summary: Optional[str] = None
+    ) -> Prompt:
+        """Choose the prompt content
+        
+        Args:
+            system: System prompt / preamble
+            message: Current message, including any sender prefix
+            context: Previous conversation messages, oldest first
+            examples: Example conversations, most relevant first
+            summary: Summary of the conversation before the context
+        
+        Returns:
+            Prompt with the content that fits, context oldest first
+        """
+        used = estimate_tokens(system) + MESSAGE_OVERHEAD_TOKENS
+        remaining = self.input_budget - used - MESSAGE_OVERHEAD_TOKENS
+        
+        # Keep the end of an oversized message; the latest lines matter most.
+        # It is never dropped entirely, or the provider would get an empty turn
+        remaining = max(remaining, MIN_MESSAGE_TOKENS)
+        if estimate_tokens(message) > remaining:
+            keep = (remaining - 1) * CHARS_PER_TOKEN
+            message = message[-keep:]
+        used += estimate_tokens(message) + MESSAGE_OVERHEAD_TOKENS
+        
+        if summary and used + estimate_tokens(summary) + MESSAGE_OVERHEAD_TOKENS <= self.input_budget:
+            used += estimate_tokens(summary) + MESSAGE_OVERHEAD_TOKENS
+        else:
+            summary = ""
+        
+        recent = (context or [])[-self.max_context_turns:] if self.max_context_turns > 0 else []
+        chosen_context = []
+        for ctx in reversed(recent):
+            tokens = estimate_tokens(ctx.get("message", "")) + MESSAGE_OVERHEAD_TOKENS
+            if used + tokens > self.input_budget:
+                break
+            chosen_context.append(ctx)
+            used += tokens
+        chosen_context.reverse()
+        
+        chosen_examples = []
+        for example in examples or []:
+            tokens = (
+                estimate_tokens(example.get("context", ""))
+                + estimate_tokens(example.get("my_response", ""))
+                + 2 * MESSAGE_OVERHEAD_TOKENS
+            )
+            if used + tokens > self.input_budget:
+                continue
+            chosen_examples.append(example)
+            used += tokens
+        
+        return Prompt(system, message, chosen_context, chosen_examples, used, summary)
@@ -0,0 +1,114 @@
+"""Latency tracking and circuit breaking for AI providers"""
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class ProviderHealth:
+    """Recent latency percentiles and a circuit breaker for one provider
+    
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    the provider is skipped for ``cooldown`` seconds. After that it is tried
+    again (half-open): one success closes the circuit, one failure opens it
+    for another cooldown.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        cooldown: float = 30.0,
+        window: int = 200,
+        min_samples: int = 20
+    ):
+        """Initialize provider health
+        
+        Args:
+            name: Provider name
+            failure_threshold: Consecutive failures that open the circuit
+            cooldown: Seconds an open circuit skips the provider
+            window: Latest successful latencies kept for percentiles
+            min_samples: Samples needed before percentiles are trusted
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._successes = 0
+        self._failures = 0
+        self._lock = threading.Lock()
+    
+    def available(self, now: Optional[float] = None) -> bool:
+        """Whether requests may go to this provider
+        
+        Args:
+            now: Current time (default: time.time())
+        
+        Returns:
+            True if the circuit is closed or its cooldown has passed
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._opened_at is None or now - self._opened_at >= self.cooldown
+    
+    def record_success(self, seconds: float) -> None:
+        """Record a successful request and close the circuit
+        
+        Args:
+            seconds: Request latency
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+            self._successes += 1
+            self._consecutive_failures = 0
+            self._opened_at = None
+    
+    def record_failure(self, now: Optional[float] = None) -> None:
+        """Record a failed request, opening the circuit when failures pile up
+        
+        Args:
+            now: Current time (default: time.time())
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._failures += 1
+            self._consecutive_failures += 1
+            # A failed half-open trial reopens right away
+            if self._opened_at is not None or self._consecutive_failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f"{self.name}: circuit opened after {self._consecutive_failures} failures")
+                self._opened_at = now
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency percentile of recent successful requests
+        
+        Args:
+            pct: Percentile between 0 and 1
+        
+        Returns:
+            Seconds, or None until ``min_samples`` requests succeeded
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+    
+    def stats(self) -> Dict:
+        """Request counts, latency percentiles and circuit state"""
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        with self._lock:
+            return {
+                'successes': self._successes,
+                'failures': self._failures,
+                'p50_ms': round(p50 * 1000) if p50 is not None else None,
+                'p95_ms': round(p95 * 1000) if p95 is not None else None,
+                'circuit': 'closed' if self._opened_at is None else 'open',
+            }
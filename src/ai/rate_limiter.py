@@ -0,0 +1,261 @@
+"""Rate-limit-aware scheduling of LLM requests"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class TokenBucket:
+    """Refills at ``rate_per_minute`` up to ``capacity``; a rate of 0 means unlimited"""
+    
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """Initialize bucket
+        
+        Args:
+            rate_per_minute: Units added per minute (0 disables the limit)
+            capacity: Largest burst (default: ten seconds' worth)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(rate_per_minute / 6.0, 1.0)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+    
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + max(now - self._updated, 0.0) * self.rate)
+        self._updated = now
+    
+    def time_until(self, amount: float, now: Optional[float] = None) -> float:
+        """Seconds until ``amount`` units are available
+        
+        Args:
+            amount: Units needed (capped at the capacity, so it always fits eventually)
+            now: Current monotonic time
+        
+        Returns:
+            Seconds to wait (0 if available now)
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        missing = min(amount, self.capacity) - self._level
+        return max(missing / self.rate, 0.0)
+    
+    def consume(self, amount: float, now: Optional[float] = None) -> None:
+        """Take units out of the bucket
+        
+        Args:
+            amount: Units used
+            now: Current monotonic time
+        """
+        if self.rate <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self._level -= min(amount, self.capacity)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter
+    
+    Args:
+        attempt: Retry number, starting at 0
+        base: Delay of the first retry before jitter, in seconds
+        cap: Longest delay, in seconds
+    
+    Returns:
+        Seconds to wait
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay in seconds or an HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """Admits LLM requests under per-provider request and token rate limits
+    
+    Every provider has a requests/minute and a tokens/minute bucket, and at
+    most ``max_in_flight`` requests run at once across providers. Waiting
+    requests are admitted highest priority first (the bot uses the time a
+    message was handed to generation, so the newest conversations go
+    first). After a 429 the provider is paused for its Retry-After. Runs on
+    one event loop.
+    """
+    
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[float, float]],
+        max_in_flight: int = 0,
+        sample_size: int = 500
+    ):
+        """Initialize scheduler
+        
+        Args:
+            limits: Provider -> (requests per minute, tokens per minute), 0 for no limit
+            max_in_flight: Most admitted requests not yet released (0 for no limit)
+            sample_size: Queue wait samples kept per provider for stats
+        """
+        self.max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._buckets = {
+            provider: (TokenBucket(rpm), TokenBucket(tpm))
+            for provider, (rpm, tpm) in limits.items()
+        }
+        self._paused_until = {provider: 0.0 for provider in limits}
+        self._waiters: Dict[str, List] = {provider: [] for provider in limits}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._dispatchers: Dict[str, asyncio.Task] = {}
+        self._counter = itertools.count()
+        
+        self._waits: Dict[str, Deque[float]] = {provider: deque(maxlen=sample_size) for provider in limits}
+        self._retries = {provider: 0 for provider in limits}
+        self._rate_limited = {provider: 0 for provider in limits}
+    
+    async def acquire(self, provider: str, tokens: int, priority: float) -> float:
+        """Wait until a request may be sent; pair every call with ``release``
+        
+        Args:
+            provider: Provider the request goes to
+            tokens: Estimated tokens of the request (prompt plus reply)
+            priority: Higher is admitted first
+        
+        Returns:
+            Seconds spent waiting
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters[provider], (-priority, next(self._counter), tokens, future))
+        
+        if provider not in self._dispatchers:
+            self._wakeups[provider] = asyncio.Event()
+            self._dispatchers[provider] = asyncio.ensure_future(self._dispatch(provider))
+        self._wakeups[provider].set()
+        
+        start = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Admitted just as the caller gave up: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release(provider)
+            raise
+        waited = time.monotonic() - start
+        self._waits[provider].append(waited)
+        return waited
+    
+    def pause(self, provider: str, seconds: float) -> None:
+        """Hold back all requests to a provider, e.g. after a 429
+        
+        Args:
+            provider: Provider that asked to slow down
+            seconds: How long to pause
+        """
+        self._rate_limited[provider] += 1
+        self._paused_until[provider] = max(self._paused_until[provider], time.monotonic() + seconds)
+    
+    def release(self, provider: str) -> None:
+        """Mark an admitted request as finished
+        
+        Args:
+            provider: Provider the request went to
+        """
+        self._in_flight -= 1
+        for wakeup in self._wakeups.values():
+            wakeup.set()
+    
+    def record_retry(self, provider: str) -> None:
+        """Count a retried request"""
+        self._retries[provider] += 1
+    
+    async def _dispatch(self, provider: str) -> None:
+        """Admit waiting requests as the provider's limits allow"""
+        waiters = self._waiters[provider]
+        requests, tokens = self._buckets[provider]
+        wakeup = self._wakeups[provider]
+        
+        while True:
+            # Forget requests whose caller gave up
+            while waiters and waiters[0][3].done():
+                heapq.heappop(waiters)
+            
+            if not waiters or (self.max_in_flight and self._in_flight >= self.max_in_flight):
+                wakeup.clear()
+                await wakeup.wait()
+                continue
+            
+            now = time.monotonic()
+            needed = waiters[0][2]
+            delay = max(
+                self._paused_until[provider] - now,
+                requests.time_until(1, now),
+                tokens.time_until(needed, now)
+            )
+            if delay > 0:
+                # Wake early if a new request arrives, it may have a higher priority
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            _, _, needed, future = heapq.heappop(waiters)
+            requests.consume(1, now)
+            tokens.consume(needed, now)
+            self._in_flight += 1
+            future.set_result(None)
+    
+    def queued(self) -> int:
+        """Requests waiting for admission across providers"""
+        return sum(
+            sum(1 for waiter in waiters if not waiter[3].done())
+            for waiters in self._waiters.values()
+        )
+    
+    def stats(self) -> Dict[str, Dict]:
+        """Queue wait times, retries and rate-limit responses per provider
+        
+        Returns:
+            Dictionary of provider -> stats
+        """
+        result = {}
+        for provider, samples in self._waits.items():
+            ordered = sorted(samples)
+            result[provider] = {
+                'queued': sum(1 for waiter in self._waiters[provider] if not waiter[3].done()),
+                'admitted': len(ordered),
+                'wait_avg_ms': round(sum(ordered) / len(ordered) * 1000) if ordered else 0,
+                'wait_p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000) if ordered else 0,
+                'wait_max_ms': round(ordered[-1] * 1000) if ordered else 0,
+                'retries': self._retries[provider],
+                'rate_limited': self._rate_limited[provider],
+            }
+        return result
+    
+    async def close(self) -> None:
+        """Stop the dispatchers"""
+        for task in self._dispatchers.values():
+            task.cancel()
+        for task in self._dispatchers.values():
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._dispatchers = {}
@@ -0,0 +1,267 @@
+"""Cache of generated replies to short, repeated messages"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+
+@dataclass
+class CacheEntry:
+    """Candidate replies for one cache key"""
+    candidates: List[str] = field(default_factory=list)
+    next_candidate: int = 0
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+
+
+def normalize_message(text: str) -> str:
+    """Reduce a message to the form used for cache lookups
+    
+    Lowercases, drops punctuation and emoji, shortens stretched letters
+    ("okkkk" -> "okk") and collapses whitespace.
+    
+    Args:
+        text: Incoming message text
+    
+    Returns:
+        Normalized text (empty if nothing is left)
+    """
+    text = re.sub(r"[^\w\s]", "", text.lower())
+    text = re.sub(r"(\w)\1{2,}", r"\1\1", text)
+    return " ".join(text.split())
+
+
+def day_part(hour: int) -> str:
+    """Coarse time of day, so "good morning" is not answered the same at night"""
+    if 5 <= hour < 12:
+        return "morning"
+    if 12 <= hour < 17:
+        return "afternoon"
+    if 17 <= hour < 22:
+        return "evening"
+    return "night"
+
+
+class ReplyCache:
+    """LRU + TTL cache of replies to trivial messages ("ok", "thanks", "lol")
+    
+    Keys combine the normalized message, the contact, the chat style
+    fingerprint and a coarse fingerprint of the conversation (who spoke
+    last, time of day). Replies are never shared between contacts: one
+    written for a conversation can mention things only that contact knows.
+    Each key collects several candidate replies from the LLM before it is
+    served from the cache, and hits rotate through them so the same answer
+    is not repeated every time. Entries are persisted (encrypted) in the
+    chat database and reloaded on start.
+    """
+    
+    def __init__(
+        self,
+        database=None,
+        max_entries: int = 1000,
+        ttl_seconds: float = 7 * 24 * 3600,
+        candidates: int = 3,
+        max_words: int = 3
+    ):
+        """Initialize cache
+        
+        Args:
+            database: ChatDatabase to persist entries in (None keeps them in memory)
+            max_entries: Keys kept before the least recently used are evicted
+            ttl_seconds: Age after which an entry is regenerated
+            candidates: Replies collected per key before it is served from cache
+            max_words: Longest normalized message (in words) that is cached
+        """
+        self.database = database
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.candidates = max(candidates, 1)
+        self.max_words = max_words
+        
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+        
+        self._hits = 0
+        self._misses = 0
+        self._generated = 0
+        self._generation_seconds = 0.0
+        self._saved_seconds = 0.0
+        
+        if database is not None:
+            self._load()
+    
+    def key_for(
+        self,
+        message: str,
+        context: Optional[List[Dict]],
+        style_fingerprint: str,
+        contact: Optional[str]
+    ) -> Optional[str]:
+        """Build the cache key of a message
+        
+        Args:
+            message: Incoming message text
+            context: Previous conversation context, oldest first
+            style_fingerprint: ChatStyle.fingerprint() of the active style
+            contact: Contact the reply goes to
+        
+        Returns:
+            Key, or None if the message is not short enough to cache
+        """
+        normalized = normalize_message(message)
+        if not normalized or len(normalized.split()) > self.max_words:
+            return None
+        
+        if context:
+            last_speaker = "me" if context[-1].get("is_me", False) else "them"
+        else:
+            last_speaker = "none"
+        
+        raw = f"{style_fingerprint}|{contact or ''}|{last_speaker}|{day_part(datetime.now().hour)}|{normalized}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached reply, rotating through the key's candidates
+        
+        Args:
+            key: Result of ``key_for``
+        
+        Returns:
+            Reply, or None if the key is missing, expired or still
+            collecting candidates
+        """
+        now = time.time()
+        expired = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.created_at > self.ttl_seconds:
+                del self._entries[key]
+                self._dirty.discard(key)
+                entry = None
+                expired = True
+            
+            if entry is None or len(entry.candidates) < self.candidates:
+                self._misses += 1
+                reply = None
+            else:
+                reply = entry.candidates[entry.next_candidate % len(entry.candidates)]
+                entry.next_candidate += 1
+                entry.last_used = now
+                self._entries.move_to_end(key)
+                self._dirty.add(key)
+                self._hits += 1
+                self._saved_seconds += self._average_generation_seconds()
+        
+        if expired:
+            self._delete([key])
+        return reply
+    
+    def put(self, key: str, reply: str, generation_seconds: float = 0.0) -> None:
+        """Add a freshly generated reply as a candidate for a key
+        
+        Args:
+            key: Result of ``key_for``
+            reply: Reply returned by the LLM
+            generation_seconds: How long the LLM took (used to estimate time saved)
+        """
+        now = time.time()
+        with self._lock:
+            self._generated += 1
+            self._generation_seconds += generation_seconds
+            
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = CacheEntry(created_at=now, last_used=now)
+            # Duplicates are kept, or a key the LLM always answers alike would never fill
+            if len(entry.candidates) < self.candidates:
+                entry.candidates.append(reply)
+            entry.last_used = now
+            self._entries.move_to_end(key)
+            self._dirty.discard(key)
+            snapshot = CacheEntry(list(entry.candidates), entry.next_candidate, entry.created_at, entry.last_used)
+            
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                self._dirty.discard(oldest)
+                evicted.append(oldest)
+        
+        self._save(key, snapshot)
+        self._delete(evicted)
+    
+    def flush(self) -> None:
+        """Persist rotation and recency of entries that were served since their last save"""
+        with self._lock:
+            dirty = [
+                (key, CacheEntry(list(entry.candidates), entry.next_candidate, entry.created_at, entry.last_used))
+                for key, entry in self._entries.items() if key in self._dirty
+            ]
+            self._dirty.clear()
+        
+        for key, entry in dirty:
+            self._save(key, entry)
+    
+    def stats(self) -> Dict:
+        """Hit rate and estimated LLM time saved
+        
+        Returns:
+            Dictionary with entries, hits, misses, hit_rate, avg_llm_seconds
+            and saved_seconds
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+                'avg_llm_seconds': round(self._average_generation_seconds(), 3),
+                'saved_seconds': round(self._saved_seconds, 1),
+            }
+    
+    def _average_generation_seconds(self) -> float:
+        """Mean LLM latency of the replies put so far (caller holds the lock)"""
+        return self._generation_seconds / self._generated if self._generated else 0.0
+    
+    def _load(self) -> None:
+        """Fill the cache from the database, most recently used last"""
+        try:
+            rows = self.database.load_reply_cache(self.max_entries)
+        except Exception as e:
+            print(f"Error loading reply cache: {e}")
+            return
+        
+        now = time.time()
+        for row in reversed(rows):
+            if now - row['created_at'] > self.ttl_seconds:
+                continue
+            self._entries[row['key']] = CacheEntry(
+                candidates=row['candidates'],
+                next_candidate=row['next_candidate'],
+                created_at=row['created_at'],
+                last_used=row['last_used']
+            )
+    
+    def _save(self, key: str, entry: CacheEntry) -> None:
+        if self.database is None:
+            return
+        try:
+            self.database.save_reply_cache_entry(
+                key, entry.candidates, entry.next_candidate, entry.created_at, entry.last_used
+            )
+        except Exception as e:
+            print(f"Error saving reply cache entry: {e}")
+    
+    def _delete(self, keys: List[str]) -> None:
+        if self.database is None or not keys:
+            return
+        try:
+            self.database.delete_reply_cache_entries(keys)
+        except Exception as e:
+            print(f"Error deleting reply cache entries: {e}")
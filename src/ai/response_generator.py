@@ -1,74 +1,180 @@
 """AI response generation using OpenAI or Cohere"""
 
-from typing import List, Dict, Optional
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Dict, Optional
+import httpx
 import openai
 import cohere
 from src.config import Config
 from src.ai.chat_style import ChatStyle
+from src.ai.prompt_builder import PromptBuilder, Prompt, chars_to_tokens, estimate_tokens
+from src.ai.provider_health import ProviderHealth
+from src.ai.rate_limiter import RequestScheduler, backoff_delay, parse_retry_after
+from src.ai.reply_cache import ReplyCache
+
+
+SUPPORTED_PROVIDERS = ("openai", "cohere")
+
+# Introduces the rolling conversation summary in the prompt
+SUMMARY_HEADING = "Earlier in this conversation (summary):"
 
 
 class ResponseGenerator:
-    """Generate responses using AI with chat style"""
+    """Generate responses using AI with chat style
     
-    def __init__(self, chat_style: ChatStyle):
+    With more than one provider configured, requests go to the first healthy
+    one; if it fails the next one is tried, and if it is slower than its own
+    p95 latency a hedged request goes to the next one as well, the first
+    answer winning. Providers that keep failing are skipped by a circuit
+    breaker. When no provider answers there is no reply at all, never a
+    canned apology.
+    """
+    
+    def __init__(self, chat_style: ChatStyle, reply_cache: Optional[ReplyCache] = None):
         """Initialize response generator
         
         Args:
             chat_style: ChatStyle instance for personality
+            reply_cache: Cache of replies to short repeated messages (None disables it)
         """
         self.chat_style = chat_style
-        self.provider = Config.AI_PROVIDER
+        self.reply_cache = reply_cache
+        self.prompt_builder = PromptBuilder(Config.LLM_INPUT_TOKEN_BUDGET, Config.PROMPT_CONTEXT_TURNS)
         
-        if self.provider == "openai":
-            self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
-        elif self.provider == "cohere":
-            self.client = cohere.Client(Config.COHERE_API_KEY)
-        else:
-            raise ValueError(f"Unsupported AI provider: {self.provider}")
+        # Providers in order of preference
+        self.providers = list(Config.AI_PROVIDERS)
+        for provider in self.providers:
+            if provider not in SUPPORTED_PROVIDERS:
+                raise ValueError(f"Unsupported AI provider: {provider}")
+        if not self.providers:
+            raise ValueError("No AI provider configured")
+        self.provider = self.providers[0]
+        
+        self.health = {
+            provider: ProviderHealth(
+                provider,
+                failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+                cooldown=Config.CIRCUIT_COOLDOWN_SECONDS
+            )
+            for provider in self.providers
+        }
+        
+        # Async path: pooled clients and request scheduler per event loop
+        self._async_loop = None
+        self._async_clients: Dict[str, object] = {}
+        self._scheduler: Optional[RequestScheduler] = None
+        
+        # Background event loop for callers on plain threads (see submit)
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
     
     def generate_response(
         self, 
         message: str, 
         context: Optional[List[Dict]] = None,
-        sender_name: Optional[str] = None
-    ) -> str:
+        sender_name: Optional[str] = None,
+        summary: Optional[str] = None
+    ) -> Optional[str]:
         """Generate a response to a message
         
+        Blocks until the response is ready; the request itself runs on the
+        shared background event loop (see ``submit``).
+        
         Args:
             message: The incoming message to respond to
             context: Previous conversation context
             sender_name: Name of the message sender
+            summary: Summary of the conversation before the context
         
         Returns:
-            Generated response string
+            Generated response string, or None if no provider answered
         """
-        if self.provider == "openai":
-            return self._generate_openai(message, context, sender_name)
-        else:
-            return self._generate_cohere(message, context, sender_name)
+        return self.submit(message, context, sender_name, summary=summary).result()
+    
+    def _cached_reply(self, message: str, context: Optional[List[Dict]], contact: Optional[str]):
+        """Look a message up in the reply cache
+        
+        Returns:
+            Tuple of (cache key or None if not cacheable, cached reply or None)
+        """
+        if self.reply_cache is None:
+            return None, None
+        
+        key = self.reply_cache.key_for(message, context, self.chat_style.fingerprint(), contact)
+        if key is None:
+            return None, None
+        return key, self.reply_cache.get(key)
+    
+    def _cache_reply(self, key: Optional[str], response: Optional[str], seconds: float) -> None:
+        """Remember a generated reply"""
+        if key is not None and response:
+            self.reply_cache.put(key, response, seconds)
     
-    def _generate_openai(
+    def _build_prompt(
         self, 
         message: str, 
         context: Optional[List[Dict]] = None,
-        sender_name: Optional[str] = None
-    ) -> str:
-        """Generate response using OpenAI
+        sender_name: Optional[str] = None,
+        summary: Optional[str] = None
+    ) -> Prompt:
+        """Choose the prompt content that fits the input token budget
         
         Args:
             message: The incoming message
             context: Previous conversation context
             sender_name: Name of sender
+            summary: Summary of the conversation before the context
         
         Returns:
-            Generated response
+            Prompt shared by both providers
         """
-        messages = [
-            {"role": "system", "content": self.chat_style.get_system_prompt()}
-        ]
+        user_message = message
+        if sender_name:
+            user_message = f"{sender_name}: {message}"
+        
+        examples = self.chat_style.select_examples(
+            message,
+            limit=Config.EXAMPLES_TOP_K,
+            token_budget=Config.EXAMPLES_TOKEN_BUDGET
+        )
+        return self.prompt_builder.build(
+            self.chat_style.get_system_prompt(), user_message, context, examples, summary=summary
+        )
+    
+    def _max_output_tokens(self) -> int:
+        """Reply token limit from the style's character limit"""
+        return min(chars_to_tokens(self.chat_style.get_max_response_length()), Config.LLM_MAX_OUTPUT_TOKENS)
+    
+    def _openai_request(
+        self, 
+        message: str, 
+        context: Optional[List[Dict]] = None,
+        sender_name: Optional[str] = None,
+        summary: Optional[str] = None
+    ) -> Dict:
+        """Build the OpenAI chat completion arguments
+        
+        Args:
+            message: The incoming message
+            context: Previous conversation context
+            sender_name: Name of sender
+            summary: Summary of the conversation before the context
+        
+        Returns:
+            Keyword arguments for ``chat.completions.create``
+        """
+        prompt = self._build_prompt(message, context, sender_name, summary)
+        
+        # System prompt (compiled once per style version by ChatStyle)
+        messages = [{"role": "system", "content": prompt.system}]
+        if prompt.summary:
+            messages.append({"role": "system", "content": f"{SUMMARY_HEADING}\n{prompt.summary}"})
         
-        # Add example conversations as context
-        for example in self.chat_style.get_example_conversations():
+        # Add the example conversations most relevant to this message
+        for example in prompt.examples:
             messages.append({
                 "role": "user",
                 "content": example.get("context", "")
@@ -79,90 +185,515 @@ class ResponseGenerator:
             })
         
         # Add conversation context
-        if context:
-            for ctx in context[-5:]:  # Last 5 messages for context
-                role = "assistant" if ctx.get("is_me", False) else "user"
-                messages.append({
-                    "role": role,
-                    "content": ctx.get("message", "")
-                })
+        for ctx in prompt.context:
+            role = "assistant" if ctx.get("is_me", False) else "user"
+            messages.append({
+                "role": role,
+                "content": ctx.get("message", "")
+            })
         
         # Add current message
-        user_message = message
-        if sender_name:
-            user_message = f"{sender_name}: {message}"
+        messages.append({"role": "user", "content": prompt.message})
         
-        messages.append({"role": "user", "content": user_message})
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                max_tokens=self.chat_style.get_max_response_length(),
-                temperature=0.8
-            )
-            
-            return response.choices[0].message.content.strip()
-        
-        except Exception as e:
-            print(f"Error generating OpenAI response: {e}")
-            return "Sorry, I couldn't process that right now."
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": messages,
+            "max_tokens": self._max_output_tokens(),
+            "temperature": 0.8
+        }
     
-    def _generate_cohere(
+    def _cohere_request(
         self, 
         message: str, 
         context: Optional[List[Dict]] = None,
-        sender_name: Optional[str] = None
-    ) -> str:
-        """Generate response using Cohere
+        sender_name: Optional[str] = None,
+        summary: Optional[str] = None
+    ) -> Dict:
+        """Build the Cohere chat arguments
         
         Args:
             message: The incoming message
             context: Previous conversation context
             sender_name: Name of sender
+            summary: Summary of the conversation before the context
         
         Returns:
-            Generated response
+            Keyword arguments for ``chat``
         """
+        prompt = self._build_prompt(message, context, sender_name, summary)
+        
         # Build conversation history
         chat_history = []
+        for ctx in prompt.context:
+            role = "CHATBOT" if ctx.get("is_me", False) else "USER"
+            chat_history.append({
+                "role": role,
+                "message": ctx.get("message", "")
+            })
         
-        if context:
-            for ctx in context[-5:]:  # Last 5 messages for context
-                role = "CHATBOT" if ctx.get("is_me", False) else "USER"
-                chat_history.append({
-                    "role": role,
-                    "message": ctx.get("message", "")
-                })
-        
-        # Build preamble with style
-        preamble = self.chat_style.get_system_prompt()
-        
-        # Add examples to preamble
-        examples = self.chat_style.get_example_conversations()
-        if examples:
+        # Preamble with style, plus the examples most relevant to this message
+        preamble = prompt.system
+        if prompt.summary:
+            preamble += f"\n\n{SUMMARY_HEADING}\n{prompt.summary}"
+        if prompt.examples:
             preamble += "\n\nExample conversations:\n"
-            for ex in examples[:3]:  # Limit to 3 examples
+            for ex in prompt.examples:
                 preamble += f"Q: {ex.get('context', '')}\n"
                 preamble += f"A: {ex.get('my_response', '')}\n\n"
         
-        # Format message
-        user_message = message
-        if sender_name:
-            user_message = f"{sender_name}: {message}"
+        return {
+            "message": prompt.message,
+            "chat_history": chat_history,
+            "preamble_override": preamble,
+            "model": "command",
+            "temperature": 0.8,
+            "max_tokens": self._max_output_tokens()
+        }
+    
+    def _async_resources(self):
+        """Pooled async clients and request scheduler for the running loop
         
-        try:
-            response = self.client.chat(
-                message=user_message,
-                chat_history=chat_history,
-                preamble=preamble,
-                model="command",
-                temperature=0.8,
-                max_tokens=self.chat_style.get_max_response_length()
+        Returns:
+            Tuple of (provider -> client, scheduler)
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            # Retries are done by _call_provider, which knows about rate limits
+            retries = 0
+            clients = {}
+            if "openai" in self.providers:
+                limits = httpx.Limits(
+                    max_connections=Config.LLM_MAX_CONCURRENCY,
+                    max_keepalive_connections=Config.LLM_MAX_CONCURRENCY
+                )
+                clients["openai"] = openai.AsyncOpenAI(
+                    api_key=Config.OPENAI_API_KEY,
+                    base_url=Config.OPENAI_BASE_URL,
+                    timeout=Config.LLM_REQUEST_TIMEOUT_SECONDS,
+                    max_retries=retries,
+                    http_client=httpx.AsyncClient(limits=limits, timeout=Config.LLM_REQUEST_TIMEOUT_SECONDS)
+                )
+            if "cohere" in self.providers:
+                clients["cohere"] = cohere.AsyncClient(
+                    Config.COHERE_API_KEY,
+                    num_workers=Config.LLM_MAX_CONCURRENCY,
+                    check_api_key=False,
+                    max_retries=retries,
+                    timeout=Config.LLM_REQUEST_TIMEOUT_SECONDS,
+                    api_url=Config.COHERE_API_URL
+                )
+            limits = {
+                "openai": (Config.OPENAI_REQUESTS_PER_MINUTE, Config.OPENAI_TOKENS_PER_MINUTE),
+                "cohere": (Config.COHERE_REQUESTS_PER_MINUTE, Config.COHERE_TOKENS_PER_MINUTE),
+            }
+            self._async_clients = clients
+            self._scheduler = RequestScheduler(
+                {provider: limits[provider] for provider in self.providers},
+                max_in_flight=Config.LLM_MAX_CONCURRENCY
+            )
+            self._async_loop = loop
+        
+        return self._async_clients, self._scheduler
+    
+    async def generate_response_async(
+        self, 
+        message: str, 
+        context: Optional[List[Dict]] = None,
+        sender_name: Optional[str] = None,
+        timeout: Optional[float] = None,
+        priority: Optional[float] = None,
+        summary: Optional[str] = None
+    ) -> Optional[str]:
+        """Generate a response without blocking the event loop
+        
+        Requests share one pooled HTTP client per provider, at most
+        ``LLM_MAX_CONCURRENCY`` are in flight at once and each provider's
+        rate limits are respected. Cancelling the task cancels the request.
+        
+        Args:
+            message: The incoming message to respond to
+            context: Previous conversation context
+            sender_name: Name of the message sender
+            timeout: Seconds each attempt may take (default from config)
+            priority: Higher is sent first when requests have to wait
+                (default: the current time, so newer requests go first)
+            summary: Summary of the conversation before the context
+        
+        Returns:
+            Generated response string, or None if no provider answered
+        """
+        key, cached = self._cached_reply(message, context, sender_name)
+        if cached is not None:
+            return cached
+        
+        start = time.perf_counter()
+        priority = time.time() if priority is None else priority
+        
+        def build(provider: str) -> Dict:
+            if provider == "openai":
+                return self._openai_request(message, context, sender_name, summary)
+            return self._cohere_request(message, context, sender_name, summary)
+        
+        response = await self._request_async(build, timeout, priority)
+        
+        if key is not None and response:
+            # put() writes to the database; keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._cache_reply, key, response, time.perf_counter() - start
             )
+        return response
+    
+    async def _call_provider(
+        self, 
+        provider: str, 
+        client, 
+        scheduler: RequestScheduler,
+        request: Dict,
+        timeout: float,
+        priority: float,
+        on_admitted: Optional[Callable[[], None]] = None
+    ) -> str:
+        """Send a request to one provider, retrying rate limits and transient errors
+        
+        ``on_admitted`` is called every time the scheduler lets the request through.
+        
+        Returns:
+            Generated response
+        
+        Raises:
+            Exception: If the request failed for good, timed out or came back empty
+        """
+        tokens = self._estimate_request_tokens(request)
+        
+        attempt = 0
+        while True:
+            await scheduler.acquire(provider, tokens, priority)
+            if on_admitted is not None:
+                on_admitted()
+            start = time.perf_counter()
+            try:
+                if provider == "openai":
+                    response = await asyncio.wait_for(client.chat.completions.create(**request), timeout)
+                    text = (response.choices[0].message.content or "").strip()
+                else:
+                    response = await asyncio.wait_for(client.chat(**request), timeout)
+                    text = (response.text or "").strip()
+                
+                if not text:
+                    raise ValueError("empty response")
+            
+            except asyncio.CancelledError:
+                # Lost a hedge race (or the caller gave up); not the provider's fault
+                raise
             
-            return response.text.strip()
+            except asyncio.TimeoutError:
+                print(f"{provider} response timed out after {timeout}s")
+                self.health[provider].record_failure()
+                raise
+            
+            except Exception as e:
+                status, retry_after = self._error_details(e)
+                if attempt >= Config.LLM_MAX_RETRIES or not self._is_retryable(e, status):
+                    print(f"Error generating {provider} response: {e}")
+                    self.health[provider].record_failure()
+                    raise
+                
+                delay = retry_after if retry_after is not None else backoff_delay(
+                    attempt, Config.LLM_BACKOFF_BASE_SECONDS, Config.LLM_BACKOFF_MAX_SECONDS
+                )
+                if status == 429:
+                    # Rate limited: hold back every request to this provider, not just this one
+                    scheduler.pause(provider, delay)
+                scheduler.record_retry(provider)
+                print(f"{provider} request failed ({status or type(e).__name__}), retrying in {delay:.1f}s")
+                attempt += 1
+            
+            else:
+                self.health[provider].record_success(time.perf_counter() - start)
+                return text
+            
+            finally:
+                scheduler.release(provider)
+            
+            # Back off outside the scheduler slot, so other requests can use it
+            await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _estimate_request_tokens(request: Dict) -> int:
+        """Estimated prompt plus reply tokens of a provider request"""
+        if "messages" in request:
+            texts = [message["content"] for message in request["messages"]]
+        else:
+            texts = [request["preamble_override"], request["message"]]
+            texts += [turn["message"] for turn in request["chat_history"]]
+        return sum(estimate_tokens(text) for text in texts) + request["max_tokens"]
+    
+    @staticmethod
+    def _error_details(error: Exception):
+        """HTTP status and Retry-After delay of a provider error
+        
+        Returns:
+            Tuple of (status or None, seconds or None)
+        """
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code, parse_retry_after(error.response.headers.get("retry-after"))
+        if isinstance(error, cohere.error.CohereAPIError):
+            return error.http_status, parse_retry_after(error.headers.get("Retry-After"))
+        return None, None
+    
+    @staticmethod
+    def _is_retryable(error: Exception, status: Optional[int]) -> bool:
+        """Rate limits, server errors and connection problems are worth retrying"""
+        if status is not None:
+            return status == 429 or status >= 500
+        return isinstance(error, (openai.APIConnectionError, cohere.error.CohereConnectionError))
+    
+    def _hedge_delay(self, provider: str) -> float:
+        """Seconds to wait for a provider before hedging: its p95, or the configured default"""
+        p95 = self.health[provider].percentile(0.95)
+        return p95 if p95 is not None else Config.LLM_HEDGE_DELAY_SECONDS
+    
+    async def _request_async(
+        self, 
+        build: Callable[[str], Dict],
+        timeout: Optional[float],
+        priority: float
+    ) -> Optional[str]:
+        """Get a response from the providers, with failover and hedging
+        
+        Args:
+            build: Builds the request arguments for a provider
+            timeout: Seconds each attempt may take (default from config)
+            priority: Higher is sent first when requests have to wait
+        
+        Returns:
+            Generated response, or None if every available provider failed
+        """
+        clients, scheduler = self._async_resources()
+        timeout = Config.LLM_REQUEST_TIMEOUT_SECONDS if timeout is None else timeout
+        
+        order = [provider for provider in self.providers if self.health[provider].available()]
+        if not order:
+            print("No AI provider available (all circuits open)")
+            return None
+        
+        pending = set()
+        started = []
+        # When each attempt got through the scheduler; the hedge timer starts there,
+        # so time queued behind rate limits neither counts against the provider nor
+        # sends a hedge while the scheduler is saturated
+        admitted_at: List[Optional[float]] = []
+        admission = asyncio.Event()
+        
+        def launch() -> None:
+            index = len(started)
+            provider = order[index]
+            started.append(provider)
+            admitted_at.append(None)
+            admission.clear()
+            
+            def on_admitted() -> None:
+                if admitted_at[index] is None:
+                    admitted_at[index] = time.monotonic()
+                    admission.set()
+            
+            pending.add(asyncio.ensure_future(self._call_provider(
+                provider, clients[provider], scheduler, build(provider), timeout, priority, on_admitted
+            )))
+        
+        launch()
+        admission_wait = None
+        try:
+            while pending:
+                can_hedge = len(started) < len(order)
+                waiting = set(pending)
+                hedge_timeout = None
+                if can_hedge and admitted_at[-1] is None:
+                    admission_wait = asyncio.ensure_future(admission.wait())
+                    waiting.add(admission_wait)
+                elif can_hedge:
+                    hedge_timeout = max(
+                        admitted_at[-1] + self._hedge_delay(started[-1]) - time.monotonic(), 0.0
+                    )
+                
+                done, _ = await asyncio.wait(
+                    waiting,
+                    timeout=hedge_timeout,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                if admission_wait is not None:
+                    admission_wait.cancel()
+                    done.discard(admission_wait)
+                    admission_wait = None
+                    if not done:
+                        # Admitted: now the hedge timer runs
+                        continue
+                
+                if not done:
+                    # Slower than usual: ask the next provider too, first answer wins
+                    launch()
+                    continue
+                
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        return task.result()
+                
+                if not pending and can_hedge:
+                    # Failed outright: fail over to the next provider
+                    launch()
+            
+            return None
+        
+        finally:
+            if admission_wait is not None:
+                admission_wait.cancel()
+            for task in pending:
+                task.cancel()
+    
+    async def generate_many(self, requests: List[Dict], timeout: Optional[float] = None) -> List[Optional[str]]:
+        """Generate responses for several messages concurrently
+        
+        Args:
+            requests: Keyword arguments for ``generate_response_async``
+                (message, context, sender_name), one dict per message
+            timeout: Per-request timeout in seconds (default from config)
+        
+        Returns:
+            Responses in the same order as ``requests``
+        """
+        tasks = [
+            asyncio.ensure_future(self.generate_response_async(timeout=timeout, **request))
+            for request in requests
+        ]
+        try:
+            return await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+    
+    def submit(
+        self, 
+        message: str, 
+        context: Optional[List[Dict]] = None,
+        sender_name: Optional[str] = None,
+        priority: Optional[float] = None,
+        summary: Optional[str] = None
+    ) -> Future:
+        """Schedule ``generate_response_async`` from a plain thread
+        
+        The request runs on a background event loop shared by all callers,
+        so worker threads get connection pooling and the global concurrency
+        limit. Cancelling the returned future cancels the request.
+        
+        Args:
+            message: The incoming message to respond to
+            context: Previous conversation context
+            sender_name: Name of the message sender
+            priority: Higher is sent first under rate limiting (default: now)
+            summary: Summary of the conversation before the context
+        
+        Returns:
+            Future resolving to the generated response
+        """
+        priority = time.time() if priority is None else priority
+        return asyncio.run_coroutine_threadsafe(
+            self.generate_response_async(message, context, sender_name, priority=priority, summary=summary),
+            self._background_loop()
+        )
+    
+    def complete(
+        self,
+        instructions: str,
+        text: str,
+        max_tokens: int,
+        priority: float = 0.0
+    ) -> Future:
+        """Run a plain instruction prompt (not a chat reply) from a plain thread
+        
+        Uses the same providers, failover, rate limits and background loop
+        as replies, without the chat style or the reply cache. The default
+        priority lets every waiting reply go first.
         
+        Args:
+            instructions: System prompt / preamble
+            text: User message
+            max_tokens: Reply token limit
+            priority: Higher is sent first under rate limiting
+        
+        Returns:
+            Future resolving to the completion, or None if no provider answered
+        """
+        def build(provider: str) -> Dict:
+            if provider == "openai":
+                return {
+                    "model": "gpt-3.5-turbo",
+                    "messages": [
+                        {"role": "system", "content": instructions},
+                        {"role": "user", "content": text},
+                    ],
+                    "max_tokens": max_tokens,
+                    "temperature": 0.3
+                }
+            return {
+                "message": text,
+                "chat_history": [],
+                "preamble_override": instructions,
+                "model": "command",
+                "temperature": 0.3,
+                "max_tokens": max_tokens
+            }
+        
+        return asyncio.run_coroutine_threadsafe(self._request_async(build, None, priority), self._background_loop())
+    
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop thread shared by ``submit`` and ``complete``, started on first use"""
+        with self._loop_lock:
+            if self._loop_thread is None:
+                loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=loop.run_forever, name="llm-loop", daemon=True)
+                self._loop_thread.loop = loop
+                self._loop_thread.start()
+            return self._loop_thread.loop
+    
+    async def aclose(self) -> None:
+        """Close the pooled async clients of the running event loop"""
+        if self._async_loop is asyncio.get_running_loop():
+            clients, self._async_clients, self._async_loop = self._async_clients, {}, None
+            for client in clients.values():
+                await client.close()
+            await self._scheduler.close()
+    
+    def get_provider_stats(self) -> Dict[str, Dict]:
+        """Latency percentiles and circuit state per provider
+        
+        Returns:
+            Dictionary of provider -> stats
+        """
+        return {provider: health.stats() for provider, health in self.health.items()}
+    
+    def get_scheduler_stats(self) -> Dict[str, Dict]:
+        """Queue wait times, retries and rate-limit responses per provider
+        
+        Returns:
+            Dictionary of provider -> stats (empty before the first request)
+        """
+        return self._scheduler.stats() if self._scheduler is not None else {}
+    
+    def close(self) -> None:
+        """Close pooled async clients and stop the background loop"""
+        with self._loop_lock:
+            thread, self._loop_thread = self._loop_thread, None
+        
+        if thread is None:
+            return
+        
+        try:
+            asyncio.run_coroutine_threadsafe(self.aclose(), thread.loop).result(timeout=5)
         except Exception as e:
-            print(f"Error generating Cohere response: {e}")
-            return "Sorry, I couldn't process that right now."
+            print(f"Error closing AI clients: {e}")
+        
+        thread.loop.call_soon_threadsafe(thread.loop.stop)
+        thread.join(timeout=5)
@@ -0,0 +1,174 @@
+"""Rolling per-contact conversation summaries used as long-term memory"""
+
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+from src.ai.prompt_builder import chars_to_tokens
+
+
+SUMMARY_INSTRUCTIONS = """You keep the memory of a WhatsApp conversation between me and {contact}.
+Update the summary with the new messages. Keep what matters later: facts about them,
+plans and dates, promises, preferences, running jokes and open questions. Drop small talk.
+Write short plain sentences from my point of view, at most {max_chars} characters.
+Reply with the summary only."""
+
+
+class ConversationSummarizer:
+    """Keeps a short summary per contact, refreshed every few messages
+    
+    The summary covers the conversation up to a stored message id. Once
+    ``refresh_every`` newer messages exist, the old summary and those
+    messages are sent to the LLM for a new summary, on a background thread
+    and at the lowest request priority, so replies never wait for it.
+    Summaries are stored encrypted in the chat database.
+    """
+    
+    def __init__(
+        self,
+        database,
+        response_generator,
+        refresh_every: int = 20,
+        max_chars: int = 600,
+        max_messages: int = 100
+    ):
+        """Initialize summarizer
+        
+        Args:
+            database: ChatDatabase holding messages and summaries
+            response_generator: ResponseGenerator used for the summary requests
+            refresh_every: New messages that trigger a refresh
+            max_chars: Longest summary
+            max_messages: Most new messages sent with one refresh (the newest)
+        """
+        self.database = database
+        self.response_generator = response_generator
+        self.refresh_every = max(refresh_every, 1)
+        self.max_chars = max_chars
+        self.max_messages = max_messages
+        
+        # contact -> (summary, id of the newest message it covers)
+        self._summaries: Dict[str, Tuple[str, int]] = {}
+        self._pending: Set[str] = set()
+        self._request: Optional[Future] = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarizer")
+        
+        self._refreshes = 0
+        self._failures = 0
+    
+    def _load(self, contact: str) -> Tuple[str, int]:
+        with self._lock:
+            if contact in self._summaries:
+                return self._summaries[contact]
+        
+        row = self.database.get_summary(contact)
+        entry = (row['summary'], row['last_message_id']) if row else ("", 0)
+        with self._lock:
+            return self._summaries.setdefault(contact, entry)
+    
+    def get(self, contact: str) -> Optional[str]:
+        """Get the current summary of a conversation
+        
+        Args:
+            contact: Contact phone number
+        
+        Returns:
+            Summary text, or None if there is none yet
+        """
+        try:
+            summary, _ = self._load(contact)
+        except Exception as e:
+            print(f"Error loading conversation summary: {e}")
+            return None
+        return summary or None
+    
+    def schedule_refresh(self, contact: str) -> None:
+        """Refresh the summary in the background if enough messages are new
+        
+        Args:
+            contact: Contact phone number
+        """
+        with self._lock:
+            if contact in self._pending:
+                return
+            self._pending.add(contact)
+        
+        try:
+            self._executor.submit(self._refresh, contact)
+        except RuntimeError:
+            # Shutting down
+            with self._lock:
+                self._pending.discard(contact)
+    
+    def _refresh(self, contact: str) -> None:
+        """Summarize new messages into the stored summary (summarizer thread)"""
+        try:
+            with self._lock:
+                if self._closed:
+                    # Queued before close(); skip instead of cancelling the executor's queue
+                    return
+            summary, last_id = self._load(contact)
+            if self.database.count_messages_after(contact, last_id) < self.refresh_every:
+                return
+            
+            messages = self.database.get_messages_after(contact, last_id, self.max_messages)
+            request = self.response_generator.complete(
+                SUMMARY_INSTRUCTIONS.format(contact=contact, max_chars=self.max_chars),
+                self._format(summary, messages),
+                chars_to_tokens(self.max_chars)
+            )
+            with self._lock:
+                self._request = request
+                if self._closed:
+                    request.cancel()
+            updated = request.result()
+            
+            if not updated:
+                with self._lock:
+                    self._failures += 1
+                return
+            
+            updated = updated[:self.max_chars]
+            self.database.save_summary(contact, updated, messages[-1]['id'])
+            with self._lock:
+                self._summaries[contact] = (updated, messages[-1]['id'])
+                self._refreshes += 1
+        
+        except CancelledError:
+            pass
+        
+        except Exception as e:
+            print(f"Error refreshing conversation summary: {e}")
+            with self._lock:
+                self._failures += 1
+        
+        finally:
+            with self._lock:
+                self._pending.discard(contact)
+                self._request = None
+    
+    @staticmethod
+    def _format(summary: str, messages: List[Dict]) -> str:
+        """Prompt text with the old summary and the new messages, oldest first"""
+        lines = [f"Current summary:\n{summary or '(none yet)'}", "", "New messages:"]
+        for msg in messages:
+            lines.append(f"{'Me' if msg['is_me'] else 'Them'}: {msg['message']}")
+        return "\n".join(lines)
+    
+    def stats(self) -> Dict:
+        """Summaries loaded and refresh counts"""
+        with self._lock:
+            return {
+                'summaries': sum(1 for summary, _ in self._summaries.values() if summary),
+                'refreshes': self._refreshes,
+                'failures': self._failures,
+            }
+    
+    def close(self) -> None:
+        """Stop the summarizer thread, cancelling a summary request in flight"""
+        with self._lock:
+            self._closed = True
+            if self._request is not None:
+                self._request.cancel()
+        self._executor.shutdown(wait=True)
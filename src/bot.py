@@ -1,19 +1,28 @@
 """Main bot orchestrator for digi.Me"""
 
 import time
-from typing import Optional
+from typing import List, Optional
 from src.config import Config
 from src.whatsapp.connector import WhatsAppConnector
 from src.ai.chat_style import ChatStyle
 from src.ai.response_generator import ResponseGenerator
+from src.ai.reply_cache import ReplyCache
+from src.ai.fast_path import FastPathReplier
+from src.ai.summarizer import ConversationSummarizer
 from src.storage.database import ChatDatabase
+from src.pipeline import ReplyPipeline, IncomingMessage, MessageBurst, PendingReply
+from src.scheduler import PollScheduler
 
 
 class DigiMeBot:
     """Main bot that orchestrates WhatsApp automation and AI responses"""
     
-    def __init__(self):
-        """Initialize the bot"""
+    def __init__(self, database: Optional[ChatDatabase] = None):
+        """Initialize the bot
+        
+        Args:
+            database: Database to share with the dashboard (default: open one from config)
+        """
         # Validate configuration
         errors = Config.validate()
         if errors:
@@ -22,10 +31,48 @@ class DigiMeBot:
         # Initialize components
         print("Initializing digi.Me bot...")
         
-        self.whatsapp = WhatsAppConnector(headless=False)
+        self.database = database or ChatDatabase(
+            Config.DATABASE_PATH,
+            Config.ENCRYPTION_KEY,
+            **Config.database_options()
+        )
+        self.whatsapp = WhatsAppConnector(headless=Config.WHATSAPP_HEADLESS, watermark_store=self.database)
         self.chat_style = ChatStyle(Config.CHAT_STYLE_PATH)
-        self.response_generator = ResponseGenerator(self.chat_style)
-        self.database = ChatDatabase(Config.DATABASE_PATH, Config.ENCRYPTION_KEY)
+        self.reply_cache = ReplyCache(
+            self.database,
+            max_entries=Config.REPLY_CACHE_MAX_ENTRIES,
+            ttl_seconds=Config.REPLY_CACHE_TTL_SECONDS,
+            candidates=Config.REPLY_CACHE_CANDIDATES,
+            max_words=Config.REPLY_CACHE_MAX_WORDS
+        ) if Config.REPLY_CACHE_ENABLED else None
+        self.response_generator = ResponseGenerator(self.chat_style, self.reply_cache)
+        self.fast_path = FastPathReplier(
+            self.chat_style,
+            min_confidence=Config.FAST_PATH_MIN_CONFIDENCE,
+            disabled_contacts=Config.FAST_PATH_DISABLED_CONTACTS
+        ) if Config.FAST_PATH_ENABLED else None
+        self.summarizer = ConversationSummarizer(
+            self.database,
+            self.response_generator,
+            refresh_every=Config.SUMMARY_REFRESH_MESSAGES,
+            max_chars=Config.SUMMARY_MAX_CHARS
+        ) if Config.SUMMARY_ENABLED else None
+        self.pipeline = ReplyPipeline(
+            self.database,
+            self._generate_response,
+            auto_reply=Config.AUTO_REPLY_ENABLED,
+            queue_size=Config.PIPELINE_QUEUE_SIZE,
+            workers=Config.GENERATION_WORKERS,
+            quiet_period=Config.BURST_QUIET_PERIOD_SECONDS,
+            max_burst_wait=Config.BURST_MAX_WAIT_SECONDS
+        )
+        self.scheduler = PollScheduler(
+            Config.APPROVED_CONTACTS,
+            min_interval=Config.POLL_MIN_INTERVAL_SECONDS,
+            max_interval=Config.CHECK_INTERVAL_SECONDS,
+            backoff=Config.POLL_BACKOFF_FACTOR
+        )
+        self._last_unread_scan = 0.0
         
         # Initialize approved contacts in database
         self._sync_approved_contacts()
@@ -47,6 +94,8 @@ class DigiMeBot:
         print("Connecting to WhatsApp Web...")
         self.whatsapp.connect()
         
+        self.pipeline.start()
+        
         print("Bot is running! Monitoring messages...")
         print(f"Auto-reply enabled: {Config.AUTO_REPLY_ENABLED}")
         print(f"Approved contacts: {len(Config.APPROVED_CONTACTS)}")
@@ -61,94 +110,228 @@ class DigiMeBot:
     
     def stop(self) -> None:
         """Stop the bot"""
+        # Detected messages are past the watermark: answer them now or never
+        deadline = time.time() + Config.PIPELINE_DRAIN_SECONDS
+        while not self.pipeline.drain(min(max(deadline - time.time(), 0.0), 0.5)) and time.time() < deadline:
+            self._send_ready_replies()
+        self._send_ready_replies()
+        self.pipeline.stop()
+        if self.summarizer is not None:
+            self.summarizer.close()
+            print(f"Conversation summaries: {self.summarizer.stats()}")
+        self.response_generator.close()
+        print(f"AI providers: {self.response_generator.get_provider_stats()}")
+        print(f"AI request queue: {self.response_generator.get_scheduler_stats()}")
+        if self.fast_path is not None:
+            print(f"Answered without AI: {self.fast_path.stats()}")
+        
+        if self.reply_cache is not None:
+            self.reply_cache.flush()
+            print(f"Reply cache: {self.reply_cache.stats()}")
+        
+        if self.database.writer is not None:
+            self.database.close()
+            print(f"Message writer: {self.database.writer.stats()}")
+        
+        wait_stats = self.whatsapp.get_wait_stats()
+        if wait_stats:
+            print("WhatsApp wait times:")
+            for phase, stats in wait_stats.items():
+                print(
+                    f"  {phase}: n={stats['count']} avg={stats['avg_ms']}ms "
+                    f"p95={stats['p95_ms']}ms max={stats['max_ms']}ms (timeout {stats['timeout_s']}s)"
+                )
+        
         print("Disconnecting from WhatsApp...")
         self.whatsapp.disconnect()
         print("Bot stopped.")
     
     def _run_loop(self) -> None:
-        """Main message monitoring loop"""
+        """Main message monitoring loop
+        
+        Runs on the browser thread: detects new messages and sends replies
+        as the pipeline produces them, while storage and generation happen
+        on the pipeline's own threads. Contacts are checked when the
+        scheduler says they are due rather than in a fixed round robin.
+        """
         while True:
             try:
-                # Check each approved contact
-                for contact in Config.APPROVED_CONTACTS:
-                    self._check_and_respond(contact)
+                self._send_ready_replies()
+                
+                # Check the contacts most likely to have news first
+                contacts = self._contacts_to_check()
+                for contact in contacts[Config.POLL_BUDGET_PER_CYCLE:]:
+                    self.scheduler.mark_due(contact)
+                
+                for contact in contacts[:Config.POLL_BUDGET_PER_CYCLE]:
+                    found = self._check_messages(contact)
+                    self.scheduler.reschedule(contact, active=found)
+                    self._send_ready_replies()
                 
-                # Wait before next check
-                time.sleep(Config.CHECK_INTERVAL_SECONDS)
+                depths = self.pipeline.queue_depths()
+                if any(depths.values()):
+                    print(f"Queue depths: {depths}")
+                
+                # Wait until the next contact is due, sending replies as they become ready
+                self._send_replies_for(self.scheduler.seconds_until_next())
             
             except Exception as e:
                 print(f"Error in main loop: {e}")
                 time.sleep(5)  # Wait a bit before retrying
     
-    def _check_and_respond(self, contact: str) -> None:
-        """Check messages from a contact and respond if needed
+    def _contacts_to_check(self) -> List[str]:
+        """Get approved contacts whose chats should be opened this cycle
+        
+        In full scan mode these are the contacts the scheduler says are due.
+        In badge mode the chat list is read only when some contact is due,
+        and at most once per ``UNREAD_SCAN_MIN_INTERVAL_SECONDS`` however
+        short the contacts' intervals are; flagged chats are opened (busiest
+        conversations first) and due contacts without a badge count as an
+        idle check.
+        
+        Returns:
+            List of contacts, highest priority first
+        """
+        due = self.scheduler.pop_due()
+        
+        if Config.UNREAD_SCAN_MODE == "full":
+            return due
+        
+        if not due:
+            return []
+        
+        now = time.time()
+        next_scan = self._last_unread_scan + Config.UNREAD_SCAN_MIN_INTERVAL_SECONDS
+        if now < next_scan:
+            # The chat list was read moments ago; look again once the scan interval is up
+            for contact in due:
+                self.scheduler.defer(contact, next_scan)
+            return []
+        self._last_unread_scan = now
+        
+        flagged = self.whatsapp.get_contacts_with_unread(Config.APPROVED_CONTACTS)
+        for contact in due:
+            if contact not in flagged:
+                self.scheduler.reschedule(contact, active=False)
+        
+        return self.scheduler.busiest_first(flagged)
+    
+    def _check_messages(self, contact: str) -> bool:
+        """Check messages from a contact and hand them to the pipeline
         
         Args:
             contact: Contact phone number
+        
+        Returns:
+            True if there were new messages
         """
         # Get unread messages
         messages = self.whatsapp.get_unread_messages(contact)
         
         if not messages:
-            return
+            return False
         
         print(f"\n--- New messages from {contact} ---")
         
         for msg in messages:
-            message_text = msg['message']
-            timestamp = msg.get('timestamp', 'unknown')
-            
-            print(f"[{timestamp}] {contact}: {message_text}")
-            
-            # Store incoming message
-            self.database.add_message(
+            message = IncomingMessage(
                 contact=contact,
-                message=message_text,
-                is_me=False,
-                sender_name=contact
+                message=msg['message'],
+                timestamp=msg.get('timestamp', 'unknown')
             )
             
-            # Generate and send response if auto-reply is enabled
-            if Config.AUTO_REPLY_ENABLED:
-                response = self._generate_response(contact, message_text)
-                
-                if response:
-                    print(f"[AI Response]: {response}")
-                    
-                    # Send response
-                    if self.whatsapp.send_message(contact, response):
-                        # Store AI response
-                        self.database.add_message(
-                            contact=contact,
-                            message=response,
-                            is_me=True,
-                            replied_by_ai=True
-                        )
-                        print("✓ Response sent")
-                    else:
-                        print("✗ Failed to send response")
+            print(f"[{message.timestamp}] {contact}: {message.message}")
+            
+            # Store and answer in the background; keep sending while the queue is full
+            while not self.pipeline.submit(message, timeout=0.5):
+                self._send_ready_replies()
+        
+        return True
+    
+    def _send_ready_replies(self) -> None:
+        """Send every reply the pipeline has ready, without waiting"""
+        reply = self.pipeline.next_reply(timeout=0)
+        while reply:
+            self._send_reply(reply)
+            reply = self.pipeline.next_reply(timeout=0)
     
-    def _generate_response(self, contact: str, message: str) -> Optional[str]:
-        """Generate AI response for a message
+    def _send_replies_for(self, seconds: float) -> None:
+        """Send replies as they become ready for the given time
+        
+        Args:
+            seconds: How long to wait
+        """
+        deadline = time.time() + seconds
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            reply = self.pipeline.next_reply(timeout=remaining)
+            if reply:
+                self._send_reply(reply)
+    
+    def _send_reply(self, reply: PendingReply) -> None:
+        """Send a generated reply and store it once sent
+        
+        Args:
+            reply: Reply produced by the pipeline
+        """
+        print(f"[AI Response to {reply.contact}]: {reply.response}")
+        
+        # Send response, split into several messages if the style asks for it
+        if self.whatsapp.send_messages(reply.contact, self.chat_style.split_reply(reply.response)):
+            self.pipeline.record_sent(reply)
+            # A reply usually gets an answer soon; poll this chat fast again
+            self.scheduler.reschedule(reply.contact, active=True)
+            print(f"✓ Response sent ({time.time() - reply.detected_at:.1f}s after detection)")
+        else:
+            print("✗ Failed to send response")
+    
+    def _generate_response(self, contact: str, burst: MessageBurst) -> Optional[str]:
+        """Generate one AI response for a burst of messages
         
         Args:
             contact: Contact phone number
-            message: Incoming message
+            burst: Stored incoming messages to answer, oldest first
         
         Returns:
-            Generated response or None if error
+            Generated response, or None if no reply should be sent
         """
+        messages = burst.texts
         try:
-            # Get conversation context
-            context = self.database.get_conversation(contact, limit=10)
+            # Plain greetings, thanks and the like need no context and no API call
+            if self.fast_path is not None:
+                response = self.fast_path.reply(contact, "\n".join(messages), len(messages))
+                if response is not None:
+                    return response
             
-            # Generate response
-            response = self.response_generator.generate_response(
-                message=message,
+            # Get conversation context; the burst itself is already stored,
+            # so keep it out of the history and send it as the current turn
+            # (found by its stored timestamps: replies may have been stored after it)
+            burst_rows = {message.stored_at for message in burst.messages}
+            context = [
+                ctx for ctx in self.database.get_recent_context(
+                    contact, limit=Config.PROMPT_CONTEXT_TURNS + len(messages)
+                )
+                if ctx['is_me'] or ctx['timestamp'] not in burst_rows
+            ]
+            
+            # Older conversation is remembered through its rolling summary
+            summary = None
+            if self.summarizer is not None and self.chat_style.remembers_conversations():
+                summary = self.summarizer.get(contact)
+                self.summarizer.schedule_refresh(contact)
+            
+            # Generate response on the generator's pooled async client
+            response = self.response_generator.submit(
+                message="\n".join(messages),
                 context=context,
-                sender_name=contact
-            )
+                sender_name=contact,
+                summary=summary
+            ).result()
             
+            if response is None:
+                print(f"No AI provider answered; not replying to {contact}")
             return response
         
         except Exception as e:
@@ -167,11 +350,11 @@ class DigiMeBot:
         """
         if self.whatsapp.send_message(contact, message):
             # Store message
-            self.database.add_message(
-                contact=contact,
-                message=message,
-                is_me=True,
-                replied_by_ai=False
-            )
+            self.database.queue_messages([{
+                'contact': contact,
+                'message': message,
+                'is_me': True,
+                'replied_by_ai': False,
+            }])
             return True
         return False
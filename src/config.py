@@ -15,13 +15,73 @@ class Config:
     CHAT_DATA_DIR = BASE_DIR / "chat_data"
     CHAT_STYLE_DIR = BASE_DIR / "chat-style"
     
+    # Deployment environment ("production" turns on production defaults)
+    ENVIRONMENT = os.getenv("ENVIRONMENT", "development").lower()
+    
     # API Keys
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
     COHERE_API_KEY = os.getenv("COHERE_API_KEY", "")
     AI_PROVIDER = os.getenv("AI_PROVIDER", "openai")
+    # Providers in order of preference; more than one enables failover and hedging
+    AI_PROVIDERS = [
+        provider.strip().lower()
+        for provider in (os.getenv("AI_PROVIDERS") or AI_PROVIDER).split(",")
+        if provider.strip()
+    ]
+    # Optional API endpoints (e.g. a proxy or a local stub server)
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+    COHERE_API_URL = os.getenv("COHERE_API_URL") or None
+    # Concurrent LLM requests over the pooled async client, and per-request timeout
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "30"))
+    # Hedge to the next provider after this long until the primary's p95 is known
+    LLM_HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "3"))
+    # Skip a provider for the cooldown after this many failures in a row
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "30"))
+    # Provider rate limits (0 means no limit) and retries of rate-limited/failed requests
+    OPENAI_REQUESTS_PER_MINUTE = float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+    OPENAI_TOKENS_PER_MINUTE = float(os.getenv("OPENAI_TOKENS_PER_MINUTE", "60000"))
+    COHERE_REQUESTS_PER_MINUTE = float(os.getenv("COHERE_REQUESTS_PER_MINUTE", "100"))
+    COHERE_TOKENS_PER_MINUTE = float(os.getenv("COHERE_TOKENS_PER_MINUTE", "0"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+    # Prompt size: estimated input tokens, previous messages considered, reply tokens
+    LLM_INPUT_TOKEN_BUDGET = int(os.getenv("LLM_INPUT_TOKEN_BUDGET", "1500"))
+    PROMPT_CONTEXT_TURNS = int(os.getenv("PROMPT_CONTEXT_TURNS", "10"))
+    LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "300"))
+    # Example conversations sent with each request, picked by relevance
+    EXAMPLES_TOP_K = int(os.getenv("EXAMPLES_TOP_K", "4"))
+    EXAMPLES_TOKEN_BUDGET = int(os.getenv("EXAMPLES_TOKEN_BUDGET", "400"))
+    # Rolling per-contact summary of older messages, refreshed every N new messages
+    SUMMARY_ENABLED = os.getenv("SUMMARY_ENABLED", "true").lower() == "true"
+    SUMMARY_REFRESH_MESSAGES = int(os.getenv("SUMMARY_REFRESH_MESSAGES", "20"))
+    SUMMARY_MAX_CHARS = int(os.getenv("SUMMARY_MAX_CHARS", "600"))
+    # Cached replies to short repeated messages ("ok", "thanks", "lol")
+    REPLY_CACHE_ENABLED = os.getenv("REPLY_CACHE_ENABLED", "true").lower() == "true"
+    REPLY_CACHE_MAX_ENTRIES = int(os.getenv("REPLY_CACHE_MAX_ENTRIES", "1000"))
+    REPLY_CACHE_TTL_SECONDS = float(os.getenv("REPLY_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    REPLY_CACHE_CANDIDATES = int(os.getenv("REPLY_CACHE_CANDIDATES", "3"))
+    REPLY_CACHE_MAX_WORDS = int(os.getenv("REPLY_CACHE_MAX_WORDS", "3"))
+    # Greetings, thanks, acknowledgments and farewells answered from the style's phrases
+    FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+    FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.8"))
+    FAST_PATH_DISABLED_CONTACTS = [
+        contact.strip()
+        for contact in os.getenv("FAST_PATH_DISABLED_CONTACTS", "").split(",")
+        if contact.strip()
+    ]
     
     # WhatsApp Configuration
     WHATSAPP_PHONE_NUMBER = os.getenv("WHATSAPP_PHONE_NUMBER", "")
+    WHATSAPP_WEB_URL = os.getenv("WHATSAPP_WEB_URL", "https://web.whatsapp.com")
+    WHATSAPP_HEADLESS = os.getenv(
+        "WHATSAPP_HEADLESS", "true" if ENVIRONMENT == "production" else "false"
+    ).lower() == "true"
+    # Cached chromedriver path and a lean browser profile
+    WHATSAPP_FAST_START = os.getenv("WHATSAPP_FAST_START", "true").lower() == "true"
+    CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", "")
     APPROVED_CONTACTS = [
         contact.strip() 
         for contact in os.getenv("APPROVED_CONTACTS", "").split(",")
@@ -31,6 +91,21 @@ class Config:
     # Database Configuration
     DATABASE_PATH = BASE_DIR / os.getenv("DATABASE_PATH", "chat_data/chat_history.db")
     ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY", "").encode() if os.getenv("ENCRYPTION_KEY") else None
+    # In-memory cache of recent decrypted messages used as reply context
+    CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "20"))
+    CONTEXT_CACHE_MAX_BYTES = int(os.getenv("CONTEXT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+    # Tuned SQLite (WAL, synchronous=NORMAL, mmap and page cache) so dashboard reads never block the bot
+    DATABASE_TUNED = os.getenv("DATABASE_TUNED", "false").lower() == "true"
+    DATABASE_BUSY_TIMEOUT_SECONDS = float(os.getenv("DATABASE_BUSY_TIMEOUT_SECONDS", "5"))
+    DATABASE_MMAP_SIZE = int(os.getenv("DATABASE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    DATABASE_CACHE_SIZE_KB = int(os.getenv("DATABASE_CACHE_SIZE_KB", str(16 * 1024)))
+    DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "8"))
+    
+    # Write-behind: messages are stored by a background thread, many per commit
+    DATABASE_WRITE_BEHIND = os.getenv("DATABASE_WRITE_BEHIND", "false").lower() == "true"
+    DATABASE_WRITE_INTERVAL_MS = float(os.getenv("DATABASE_WRITE_INTERVAL_MS", "5"))
+    DATABASE_WRITE_BATCH_SIZE = int(os.getenv("DATABASE_WRITE_BATCH_SIZE", "100"))
+    DATABASE_WRITE_QUEUE_SIZE = int(os.getenv("DATABASE_WRITE_QUEUE_SIZE", "1000"))
     
     # Dashboard Configuration
     DASHBOARD_HOST = os.getenv("DASHBOARD_HOST", "0.0.0.0")
@@ -44,23 +119,69 @@ class Config:
     
     # Automation Settings
     AUTO_REPLY_ENABLED = os.getenv("AUTO_REPLY_ENABLED", "true").lower() == "true"
+    # Slowest polling interval; chats with recent activity are polled faster
     CHECK_INTERVAL_SECONDS = int(os.getenv("CHECK_INTERVAL_SECONDS", "10"))
+    POLL_MIN_INTERVAL_SECONDS = float(os.getenv("POLL_MIN_INTERVAL_SECONDS", "1"))
+    POLL_BACKOFF_FACTOR = float(os.getenv("POLL_BACKOFF_FACTOR", "2"))
+    POLL_BUDGET_PER_CYCLE = int(os.getenv("POLL_BUDGET_PER_CYCLE", "10"))
+    # "badge" reads the chat list once per cycle; "full" opens every approved chat
+    UNREAD_SCAN_MODE = os.getenv("UNREAD_SCAN_MODE", "badge").lower()
+    # Shortest time between two reads of the chat list in badge mode
+    UNREAD_SCAN_MIN_INTERVAL_SECONDS = float(os.getenv("UNREAD_SCAN_MIN_INTERVAL_SECONDS", "3"))
+    
+    # WhatsApp Web readiness timeouts (seconds)
+    WHATSAPP_SEARCH_TIMEOUT = float(os.getenv("WHATSAPP_SEARCH_TIMEOUT", "10"))
+    WHATSAPP_CHAT_OPEN_TIMEOUT = float(os.getenv("WHATSAPP_CHAT_OPEN_TIMEOUT", "10"))
+    WHATSAPP_SEND_TIMEOUT = float(os.getenv("WHATSAPP_SEND_TIMEOUT", "10"))
     MAX_RESPONSE_LENGTH = int(os.getenv("MAX_RESPONSE_LENGTH", "500"))
     
+    # Reply pipeline
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))
+    GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "4"))
+    # Messages within the quiet period are answered with one reply
+    BURST_QUIET_PERIOD_SECONDS = float(os.getenv("BURST_QUIET_PERIOD_SECONDS", "4"))
+    BURST_MAX_WAIT_SECONDS = float(os.getenv("BURST_MAX_WAIT_SECONDS", "15"))
+    # Time spent on shutdown answering messages already detected
+    PIPELINE_DRAIN_SECONDS = float(os.getenv("PIPELINE_DRAIN_SECONDS", "30"))
+    
+    @classmethod
+    def database_options(cls):
+        """Keyword arguments for ChatDatabase besides the path and key"""
+        return {
+            'context_cache_size': cls.CONTEXT_CACHE_SIZE,
+            'context_cache_max_bytes': cls.CONTEXT_CACHE_MAX_BYTES,
+            'tuned': cls.DATABASE_TUNED,
+            'busy_timeout': cls.DATABASE_BUSY_TIMEOUT_SECONDS,
+            'mmap_size': cls.DATABASE_MMAP_SIZE,
+            'cache_size_kb': cls.DATABASE_CACHE_SIZE_KB,
+            'pool_size': cls.DATABASE_POOL_SIZE,
+            'write_behind': cls.DATABASE_WRITE_BEHIND,
+            'write_interval': cls.DATABASE_WRITE_INTERVAL_MS / 1000,
+            'write_batch_size': cls.DATABASE_WRITE_BATCH_SIZE,
+            'write_queue_size': cls.DATABASE_WRITE_QUEUE_SIZE,
+        }
+    
     @classmethod
     def validate(cls):
         """Validate configuration"""
         errors = []
         
-        if cls.AI_PROVIDER == "openai" and not cls.OPENAI_API_KEY:
+        for provider in cls.AI_PROVIDERS:
+            if provider not in ("openai", "cohere"):
+                errors.append(f"Unsupported AI provider: '{provider}'")
+        
+        if "openai" in cls.AI_PROVIDERS and not cls.OPENAI_API_KEY:
             errors.append("OPENAI_API_KEY is required when AI_PROVIDER is 'openai'")
         
-        if cls.AI_PROVIDER == "cohere" and not cls.COHERE_API_KEY:
+        if "cohere" in cls.AI_PROVIDERS and not cls.COHERE_API_KEY:
             errors.append("COHERE_API_KEY is required when AI_PROVIDER is 'cohere'")
         
         if not cls.APPROVED_CONTACTS:
             errors.append("APPROVED_CONTACTS must have at least one contact")
         
+        if cls.UNREAD_SCAN_MODE not in ("badge", "full"):
+            errors.append("UNREAD_SCAN_MODE must be 'badge' or 'full'")
+        
         if not cls.ENCRYPTION_KEY:
             errors.append("ENCRYPTION_KEY is required for secure storage")
         
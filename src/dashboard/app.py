@@ -20,8 +20,8 @@ app.config['SECRET_KEY'] = Config.DASHBOARD_SECRET_KEY
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Initialize database
-database = ChatDatabase(Config.DATABASE_PATH, Config.ENCRYPTION_KEY)
+# Initialize database (main.py both hands the same instance to the bot)
+database = ChatDatabase(Config.DATABASE_PATH, Config.ENCRYPTION_KEY, **Config.database_options())
 chat_style = ChatStyle(Config.CHAT_STYLE_PATH)
 
 
@@ -0,0 +1,432 @@
+"""Staged reply pipeline: detect -> persist -> generate -> send"""
+
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+
+@dataclass
+class IncomingMessage:
+    """A message detected in WhatsApp, waiting to be stored and answered"""
+    contact: str
+    message: str
+    timestamp: str = 'unknown'
+    detected_at: float = field(default_factory=time.time)
+    # Timestamp of the stored row, set by the persist stage; identifies the
+    # message in the conversation history
+    stored_at: Optional[str] = None
+
+
+@dataclass
+class MessageBurst:
+    """Messages from one contact that are answered with a single reply"""
+    contact: str
+    messages: List[IncomingMessage] = field(default_factory=list)
+    
+    @property
+    def texts(self) -> List[str]:
+        return [message.message for message in self.messages]
+    
+    @property
+    def detected_at(self) -> float:
+        return self.messages[0].detected_at
+
+
+@dataclass
+class PendingReply:
+    """A generated reply waiting to be sent by the browser thread"""
+    contact: str
+    message: str
+    response: str
+    detected_at: float = field(default_factory=time.time)
+
+
+class ReplyPipeline:
+    """Runs persistence and reply generation off the browser thread
+    
+    The browser thread detects messages and hands them to ``submit``. A
+    persist thread stores them and queues them for generation, a pool of
+    generation workers calls the LLM (at most one request per contact at a
+    time, so replies stay in order), and finished replies come back to the
+    browser thread through ``next_reply``. Every hand-off is bounded, so a
+    slow stage pushes back on the one before it instead of growing memory.
+    
+    Messages a contact sends in quick succession are coalesced: a burst is
+    only handed to generation once the contact has been quiet for
+    ``quiet_period`` seconds (or ``max_burst_wait`` has passed), and messages
+    arriving while an earlier burst is still waiting join that burst.
+    
+    Stored messages are already past the connector's watermark, so on
+    shutdown ``drain`` answers everything still in flight (open bursts
+    without waiting for their quiet period) instead of dropping it.
+    """
+    
+    def __init__(
+        self,
+        database,
+        generate_fn: Callable[[str, MessageBurst], Optional[str]],
+        auto_reply: bool = True,
+        queue_size: int = 100,
+        workers: int = 4,
+        quiet_period: float = 0.0,
+        max_burst_wait: float = 15.0
+    ):
+        """Initialize pipeline
+        
+        Args:
+            database: ChatDatabase used to store messages
+            generate_fn: Callable (contact, burst of stored messages) -> reply or None
+            auto_reply: Whether stored incoming messages are answered
+            queue_size: Capacity of each stage's queue
+            workers: Number of concurrent generation workers
+            quiet_period: Seconds without new messages before a burst is
+                answered (0 answers every message on its own)
+            max_burst_wait: Longest a burst is held back, in seconds
+        """
+        self.database = database
+        self.generate_fn = generate_fn
+        self.auto_reply = auto_reply
+        self.workers = workers
+        self.quiet_period = quiet_period
+        self.max_burst_wait = max_burst_wait
+        
+        # persist stage: incoming messages are bounded, sent replies are not
+        # (they are already bounded by the send queue they came from)
+        self._persist_queue: queue.Queue = queue.Queue()
+        self._persist_slots = threading.Semaphore(queue_size)
+        self._batch_size = max(queue_size, 1)
+        
+        # coalesce stage: open bursts and when each one is due
+        self._bursts: Dict[str, MessageBurst] = {}
+        self._burst_due: Dict[str, float] = {}
+        self._burst_started: Dict[str, float] = {}
+        self._burst_ready = threading.Condition(threading.Lock())
+        
+        # generate stage: per-contact FIFOs of bursts and a queue of contacts ready to run
+        self._generate_slots = threading.Semaphore(queue_size)
+        self._pending: Dict[str, Deque[MessageBurst]] = {}
+        self._active: Set[str] = set()
+        self._ready: queue.Queue = queue.Queue()
+        self._generating = 0
+        # Incoming messages submitted for an answer whose generation has not finished
+        self._unanswered = 0
+        self._lock = threading.Lock()
+        
+        # send stage: drained by the browser thread
+        self._send_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        
+        self._stop = threading.Event()
+        self._threads = []
+    
+    def start(self) -> None:
+        """Start the persist thread and the generation workers"""
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._persist_loop, name="persist", daemon=True),
+            threading.Thread(target=self._coalesce_loop, name="coalesce", daemon=True),
+        ]
+        for i in range(self.workers):
+            self._threads.append(
+                threading.Thread(target=self._generation_loop, name=f"generate-{i}", daemon=True)
+            )
+        for thread in self._threads:
+            thread.start()
+    
+    def drain(self, timeout: float) -> bool:
+        """Answer every message handed to the pipeline so far
+        
+        Open bursts go to generation right away, and this waits until every
+        submitted message has been answered (its reply is in the send queue)
+        or dropped. Replies are left for ``next_reply``.
+        
+        Args:
+            timeout: Longest wait, in seconds
+        
+        Returns:
+            True if nothing is left to answer
+        """
+        deadline = time.time() + timeout
+        while True:
+            with self._burst_ready:
+                for contact in self._burst_due:
+                    self._burst_due[contact] = 0.0
+                self._burst_ready.notify()
+            
+            with self._lock:
+                if not self._unanswered:
+                    return True
+            if not self._threads or time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+    
+    def stop(self, timeout: float = 5.0, drain_timeout: float = 0.0) -> None:
+        """Stop all stages
+        
+        Args:
+            timeout: Seconds to wait for each thread to finish
+            drain_timeout: Seconds to spend answering messages in flight first
+                (see ``drain``); 0 stops right away
+        """
+        if drain_timeout > 0:
+            self.drain(drain_timeout)
+        
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        
+        # Store whatever was detected or sent but not persisted yet
+        while True:
+            items = self._drain_persist_queue(self._batch_size)
+            if not items:
+                break
+            self._persist_batch(items, forward=False)
+        
+        depths = self.queue_depths()
+        if any(depths.values()):
+            print(f"Pipeline stopped with unfinished work: {depths}")
+        with self._lock:
+            if self._unanswered:
+                print(f"{self._unanswered} stored message(s) were left unanswered")
+    
+    def submit(self, message: IncomingMessage, timeout: Optional[float] = None) -> bool:
+        """Hand a detected message to the persist stage
+        
+        Args:
+            message: Detected message
+            timeout: Seconds to wait for room in the queue (None waits forever)
+        
+        Returns:
+            True if queued, False if the queue stayed full
+        """
+        if not self._persist_slots.acquire(timeout=timeout):
+            return False
+        if self.auto_reply:
+            with self._lock:
+                self._unanswered += 1
+        self._persist_queue.put(('incoming', message))
+        return True
+    
+    def record_sent(self, reply: PendingReply) -> None:
+        """Hand a reply that was sent to the persist stage
+        
+        Args:
+            reply: Sent reply
+        """
+        self._persist_queue.put(('sent', reply))
+    
+    def next_reply(self, timeout: Optional[float] = None) -> Optional[PendingReply]:
+        """Take the next reply that is ready to send
+        
+        Args:
+            timeout: Seconds to wait (None waits forever, 0 does not wait)
+        
+        Returns:
+            Reply, or None if none became ready in time
+        """
+        try:
+            if timeout == 0:
+                return self._send_queue.get_nowait()
+            return self._send_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def queue_depths(self) -> Dict[str, int]:
+        """Current number of items in each stage
+        
+        Returns:
+            Dictionary of stage -> items waiting (``generating`` is in flight)
+        """
+        with self._burst_ready:
+            coalescing = sum(len(burst.messages) for burst in self._bursts.values())
+        
+        with self._lock:
+            waiting = sum(len(burst.messages) for burst in self._pending_bursts())
+            generating = self._generating
+        
+        return {
+            'persist': self._persist_queue.qsize(),
+            'coalesce': coalescing,
+            'generate': waiting,
+            'generating': generating,
+            'send': self._send_queue.qsize(),
+        }
+    
+    def _persist_loop(self) -> None:
+        """Store messages in batches and pass incoming ones on to generation"""
+        while not self._stop.is_set():
+            try:
+                first = self._persist_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            self._persist_batch([first] + self._drain_persist_queue(self._batch_size - 1))
+    
+    def _drain_persist_queue(self, limit: int) -> List:
+        """Take up to ``limit`` items already waiting in the persist queue"""
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self._persist_queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+    
+    def _persist_batch(self, items: List, forward: bool = True) -> None:
+        """Store items in one transaction, then queue the incoming ones for generation
+        
+        Messages detected together (typically a contact's burst) and the
+        replies sent meanwhile are written with a single commit, or handed
+        to the database's background writer if write-behind is enabled.
+        
+        Args:
+            items: (kind, item) tuples in arrival order
+            forward: Whether stored incoming messages go on to generation
+        """
+        try:
+            stored = self.database.queue_messages([self._record(kind, item) for kind, item in items])
+            for (kind, item), stored_at in zip(items, stored):
+                if kind == 'incoming':
+                    item.stored_at = stored_at
+            if forward:
+                for kind, item in items:
+                    if kind == 'incoming':
+                        self._queue_for_generation(item)
+        except Exception as e:
+            contacts = ", ".join(sorted({item.contact for _, item in items}))
+            print(f"Error storing {len(items)} message(s) for {contacts}: {e}")
+            if forward:
+                self._answered(sum(1 for kind, _ in items if kind == 'incoming'))
+        finally:
+            for kind, _ in items:
+                if kind == 'incoming':
+                    self._persist_slots.release()
+    
+    @staticmethod
+    def _record(kind: str, item) -> Dict:
+        """Database record of a detected message or a sent reply"""
+        if kind == 'incoming':
+            return {
+                'contact': item.contact,
+                'message': item.message,
+                'is_me': False,
+                'sender_name': item.contact,
+            }
+        return {
+            'contact': item.contact,
+            'message': item.response,
+            'is_me': True,
+            'replied_by_ai': True,
+        }
+    
+    def _queue_for_generation(self, message: IncomingMessage) -> None:
+        """Add a stored incoming message to its contact's burst"""
+        if not self.auto_reply:
+            return
+        
+        if self.quiet_period <= 0:
+            self._enqueue_burst(MessageBurst(message.contact, [message]))
+            return
+        
+        now = time.time()
+        with self._burst_ready:
+            burst = self._bursts.setdefault(message.contact, MessageBurst(message.contact))
+            burst.messages.append(message)
+            started = self._burst_started.setdefault(message.contact, now)
+            self._burst_due[message.contact] = min(now + self.quiet_period, started + self.max_burst_wait)
+            self._burst_ready.notify()
+    
+    def _coalesce_loop(self) -> None:
+        """Hand bursts to generation once their contact has gone quiet"""
+        while not self._stop.is_set():
+            with self._burst_ready:
+                now = time.time()
+                due = [contact for contact, at in self._burst_due.items() if at <= now]
+                bursts = []
+                for contact in due:
+                    bursts.append(self._bursts.pop(contact))
+                    del self._burst_due[contact]
+                    del self._burst_started[contact]
+                
+                if not bursts:
+                    next_due = min(self._burst_due.values(), default=now + 0.2)
+                    self._burst_ready.wait(timeout=min(max(next_due - now, 0.01), 0.2))
+                    continue
+            
+            for burst in bursts:
+                self._enqueue_burst(burst)
+    
+    def _enqueue_burst(self, burst: MessageBurst) -> None:
+        """Queue a burst for generation behind the contact's earlier bursts"""
+        with self._lock:
+            waiting = self._pending.get(burst.contact)
+            if waiting:
+                # An earlier burst has not started generating yet; answer both at once
+                waiting[-1].messages.extend(burst.messages)
+                return
+        
+        # Wait for room in the generate stage (backpressure on earlier stages)
+        while not self._generate_slots.acquire(timeout=0.2):
+            if self._stop.is_set():
+                return
+        
+        with self._lock:
+            self._pending.setdefault(burst.contact, deque()).append(burst)
+            if burst.contact not in self._active:
+                self._active.add(burst.contact)
+                self._ready.put(burst.contact)
+    
+    def _pending_bursts(self) -> List[MessageBurst]:
+        """All bursts waiting for generation (caller holds ``_lock``)"""
+        return [burst for bursts in self._pending.values() for burst in bursts]
+    
+    def _generation_loop(self) -> None:
+        """Generate replies, one contact at a time per worker"""
+        while not self._stop.is_set():
+            try:
+                contact = self._ready.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            
+            with self._lock:
+                burst = self._pending[contact].popleft()
+                self._generating += 1
+            self._generate_slots.release()
+            
+            try:
+                response = self.generate_fn(contact, burst)
+                if response:
+                    self._put_reply(PendingReply(
+                        contact=contact,
+                        message="\n".join(burst.texts),
+                        response=response,
+                        detected_at=burst.detected_at
+                    ))
+            except Exception as e:
+                print(f"Error generating reply for {contact}: {e}")
+            finally:
+                self._answered(len(burst.messages))
+                with self._lock:
+                    self._generating -= 1
+                    if self._pending[contact]:
+                        self._ready.put(contact)
+                    else:
+                        self._active.discard(contact)
+                        del self._pending[contact]
+    
+    def _answered(self, count: int) -> None:
+        """Count messages as done, whether a reply was queued or not"""
+        if self.auto_reply:
+            with self._lock:
+                self._unanswered -= count
+    
+    def _put_reply(self, reply: PendingReply) -> None:
+        """Queue a reply for sending, waiting while the send queue is full"""
+        while not self._stop.is_set():
+            try:
+                self._send_queue.put(reply, timeout=0.2)
+                return
+            except queue.Full:
+                continue
@@ -0,0 +1,142 @@
+"""Activity-adaptive polling schedule for approved contacts"""
+
+import heapq
+import itertools
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class PollScheduler:
+    """Decides which contacts to check next
+    
+    Each contact has a next-due time kept in a heap. A contact that just had
+    activity is polled again after ``min_interval``; every check that finds
+    nothing multiplies its interval by ``backoff`` up to ``max_interval``, so
+    busy conversations are checked often and quiet ones rarely.
+    """
+    
+    def __init__(
+        self,
+        contacts: Iterable[str],
+        min_interval: float,
+        max_interval: float,
+        backoff: float = 2.0
+    ):
+        """Initialize scheduler
+        
+        Args:
+            contacts: Contacts to schedule (all due immediately)
+            min_interval: Interval right after activity, in seconds
+            max_interval: Slowest interval for idle contacts, in seconds
+            backoff: Factor the interval grows by after each idle check
+        """
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = backoff
+        
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}
+        self._intervals: Dict[str, float] = {}
+        self._last_active: Dict[str, float] = {}
+        self._counter = itertools.count()
+        
+        now = time.time()
+        for contact in contacts:
+            self._intervals[contact] = self.min_interval
+            self._push(contact, now)
+    
+    def _push(self, contact: str, due: float) -> None:
+        """Schedule a contact, superseding any earlier entry"""
+        self._due[contact] = due
+        heapq.heappush(self._heap, (due, next(self._counter), contact))
+    
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """Remove and return every contact that is due
+        
+        Args:
+            now: Current time (default: time.time())
+        
+        Returns:
+            Due contacts, most overdue first
+        """
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            at, _, contact = heapq.heappop(self._heap)
+            # Skip entries superseded by a later reschedule
+            if self._due.get(contact) != at:
+                continue
+            del self._due[contact]
+            due.append(contact)
+        return due
+    
+    def reschedule(self, contact: str, active: bool, now: Optional[float] = None) -> None:
+        """Schedule a contact's next check after it was checked
+        
+        Args:
+            contact: Contact that was checked
+            active: Whether the check found activity
+            now: Current time (default: time.time())
+        """
+        now = time.time() if now is None else now
+        if active:
+            interval = self.min_interval
+            self._last_active[contact] = now
+        else:
+            interval = min(self.interval(contact) * self.backoff, self.max_interval)
+        self._intervals[contact] = interval
+        self._push(contact, now + interval)
+    
+    def mark_due(self, contact: str, now: Optional[float] = None) -> None:
+        """Make a contact due right away without changing its interval
+        
+        Args:
+            contact: Contact to check on the next cycle
+            now: Current time (default: time.time())
+        """
+        self._push(contact, time.time() if now is None else now)
+    
+    def defer(self, contact: str, until: float) -> None:
+        """Put a due contact back, due at a later time, without changing its interval
+        
+        Args:
+            contact: Contact taken from ``pop_due``
+            until: Time the contact is due again
+        """
+        self._push(contact, until)
+    
+    def busiest_first(self, contacts: Iterable[str]) -> List[str]:
+        """Order contacts by how busy their conversation is
+        
+        Shortest polling interval first; ties (including contacts that never
+        had activity) go to the most recent activity, then by name.
+        
+        Args:
+            contacts: Contacts to order
+        
+        Returns:
+            Ordered list
+        """
+        return sorted(contacts, key=lambda contact: (
+            self.interval(contact), -self._last_active.get(contact, float('-inf')), contact
+        ))
+    
+    def interval(self, contact: str) -> float:
+        """Current polling interval of a contact"""
+        return self._intervals.get(contact, self.min_interval)
+    
+    def seconds_until_next(self, now: Optional[float] = None) -> float:
+        """Time until the next contact is due
+        
+        Args:
+            now: Current time (default: time.time())
+        
+        Returns:
+            Seconds to wait (0 if something is already due)
+        """
+        now = time.time() if now is None else now
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return self.max_interval
+        return max(self._heap[0][0] - now, 0.0)
@@ -0,0 +1,150 @@
+"""In-memory cache of recent decrypted messages per contact"""
+
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+
+# Rough per-message bookkeeping cost on top of the text itself (bytes)
+ENTRY_OVERHEAD_BYTES = 256
+
+
+class ContextCache:
+    """Bounded ring buffers of recent messages, one per contact
+    
+    Buffers are filled lazily from the database on first access and kept
+    current by write-through appends. The total size across contacts is
+    capped; the least recently used contacts are evicted first.
+    """
+    
+    def __init__(self, per_contact: int = 20, max_bytes: int = 8 * 1024 * 1024):
+        """Initialize cache
+        
+        Args:
+            per_contact: Messages kept per contact
+            max_bytes: Approximate memory budget across all contacts
+        """
+        self.per_contact = per_contact
+        self.max_bytes = max_bytes
+        
+        self._buffers: "OrderedDict[str, Deque[Dict]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._writes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _entry_size(message: Dict) -> int:
+        return len(message.get('message', '')) + ENTRY_OVERHEAD_BYTES
+    
+    def get(self, contact: str, limit: int) -> Optional[List[Dict]]:
+        """Get the most recent messages of a contact
+        
+        Args:
+            contact: Contact phone number
+            limit: Maximum number of messages
+        
+        Returns:
+            Messages oldest first, or None if the contact is not cached or
+            ``limit`` exceeds what the buffer holds
+        """
+        with self._lock:
+            buffer = self._buffers.get(contact)
+            if buffer is None or limit > self.per_contact:
+                return None
+            self._buffers.move_to_end(contact)
+            return [dict(message) for message in list(buffer)[-limit:]]
+    
+    def write_version(self, contact: str) -> int:
+        """Number of writes seen for a contact, taken before reading the database"""
+        with self._lock:
+            return self._writes.get(contact, 0)
+    
+    def warm(self, contact: str, messages: List[Dict], version: int) -> None:
+        """Fill a contact's buffer with messages read from the database
+        
+        Ignored if a write for the contact happened since ``version`` was
+        taken, because the read may then be missing that message.
+        
+        Args:
+            contact: Contact phone number
+            messages: Most recent messages, oldest first
+            version: Result of ``write_version`` before the read
+        """
+        with self._lock:
+            if self._writes.get(contact, 0) != version:
+                return
+            self._drop(contact)
+            buffer = deque((dict(message) for message in messages), maxlen=self.per_contact)
+            self._buffers[contact] = buffer
+            self._sizes[contact] = sum(self._entry_size(message) for message in buffer)
+            self._total_bytes += self._sizes[contact]
+            self._evict()
+    
+    def append(self, contact: str, message: Dict) -> None:
+        """Write-through a newly stored message
+        
+        Args:
+            contact: Contact phone number
+            message: Message dictionary as returned by the database
+        """
+        with self._lock:
+            self._writes[contact] = self._writes.get(contact, 0) + 1
+            buffer = self._buffers.get(contact)
+            if buffer is None:
+                return
+            
+            if len(buffer) == buffer.maxlen:
+                removed = self._entry_size(buffer[0])
+                self._sizes[contact] -= removed
+                self._total_bytes -= removed
+            buffer.append(dict(message))
+            added = self._entry_size(message)
+            self._sizes[contact] += added
+            self._total_bytes += added
+            self._buffers.move_to_end(contact)
+            self._evict()
+    
+    def assign_ids(self, contact: str, ids: Dict[str, int]) -> None:
+        """Fill in the ids of cached messages that were written after being cached
+        
+        Args:
+            contact: Contact phone number
+            ids: Stored timestamp (ISO format) -> message id
+        """
+        with self._lock:
+            for message in self._buffers.get(contact, ()):
+                if message.get('id') is None and message.get('timestamp') in ids:
+                    message['id'] = ids[message['timestamp']]
+    
+    def invalidate(self, contact: Optional[str] = None) -> None:
+        """Forget one contact's buffer, or all of them
+        
+        Args:
+            contact: Contact to forget (None clears everything)
+        """
+        with self._lock:
+            contacts = [contact] if contact else list(self._buffers)
+            for name in contacts:
+                self._writes[name] = self._writes.get(name, 0) + 1
+                self._drop(name)
+    
+    def stats(self) -> Dict[str, int]:
+        """Current cache size"""
+        with self._lock:
+            return {
+                'contacts': len(self._buffers),
+                'messages': sum(len(buffer) for buffer in self._buffers.values()),
+                'bytes': self._total_bytes,
+            }
+    
+    def _drop(self, contact: str) -> None:
+        """Remove a contact's buffer (caller holds the lock)"""
+        if self._buffers.pop(contact, None) is not None:
+            self._total_bytes -= self._sizes.pop(contact)
+    
+    def _evict(self) -> None:
+        """Evict least recently used contacts until under budget (caller holds the lock)"""
+        while self._total_bytes > self.max_bytes and len(self._buffers) > 1:
+            oldest = next(iter(self._buffers))
+            self._drop(oldest)
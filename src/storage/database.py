@@ -1,14 +1,18 @@
 """Database management for secure chat storage"""
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Optional, Dict
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import create_engine, event, insert, select, Column, Index, Integer, String, DateTime, Boolean, Text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import aliased, sessionmaker, Session
 from cryptography.fernet import Fernet
 import base64
 import hashlib
+import json
+import threading
+from src.storage.context_cache import ContextCache
+from src.storage.message_writer import MessageWriter
 
 Base = declarative_base()
 
@@ -24,6 +28,11 @@ class ChatMessage(Base):
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     replied_by_ai = Column(Boolean, default=False)
     sender_name = Column(String(100))
+    
+    __table_args__ = (
+        # Latest messages per contact straight from the index (see get_all_conversations)
+        Index('ix_chat_messages_contact_timestamp', 'contact', 'timestamp'),
+    )
 
 
 class ApprovedContact(Base):
@@ -37,15 +46,76 @@ class ApprovedContact(Base):
     is_active = Column(Boolean, default=True)
 
 
+class MessageWatermark(Base):
+    """Newest processed WhatsApp message per contact"""
+    __tablename__ = 'message_watermarks'
+    
+    id = Column(Integer, primary_key=True)
+    contact = Column(String(50), unique=True, nullable=False)
+    message_id = Column(String(200), nullable=False)  # WhatsApp data-id
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ReplyCacheRow(Base):
+    """Cached candidate replies for a short incoming message"""
+    __tablename__ = 'reply_cache'
+    
+    id = Column(Integer, primary_key=True)
+    cache_key = Column(String(64), unique=True, nullable=False)  # SHA-256, no message text
+    candidates = Column(Text, nullable=False)  # Encrypted JSON list
+    next_candidate = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class ContactSummary(Base):
+    """Rolling summary of older conversation with a contact"""
+    __tablename__ = 'contact_summaries'
+    
+    id = Column(Integer, primary_key=True)
+    contact = Column(String(50), unique=True, nullable=False)
+    summary = Column(Text, nullable=False)  # Encrypted
+    last_message_id = Column(Integer, nullable=False)  # Newest message covered
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class ChatDatabase:
     """Manages secure chat database"""
     
-    def __init__(self, db_path: Path, encryption_key: Optional[bytes] = None):
+    def __init__(
+        self,
+        db_path: Path,
+        encryption_key: Optional[bytes] = None,
+        context_cache_size: int = 20,
+        context_cache_max_bytes: int = 8 * 1024 * 1024,
+        tuned: bool = False,
+        busy_timeout: float = 5.0,
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size_kb: int = 16 * 1024,
+        pool_size: int = 8,
+        write_behind: bool = False,
+        write_interval: float = 0.005,
+        write_batch_size: int = 100,
+        write_queue_size: int = 1000
+    ):
         """Initialize database
         
         Args:
             db_path: Path to SQLite database
             encryption_key: Encryption key for sensitive data
+            context_cache_size: Recent messages kept in memory per contact
+            context_cache_max_bytes: Memory budget of the recent-message cache
+            tuned: Use WAL journaling and the pragmas below, so readers
+                (e.g. the dashboard) never block writers (the bot)
+            busy_timeout: Seconds a write waits for a lock before failing
+            mmap_size: Bytes of the file read through memory mapping (tuned mode)
+            cache_size_kb: Page cache per connection in KiB (tuned mode)
+            pool_size: Connections kept open for concurrent threads
+            write_behind: Store messages given to ``queue_messages`` on a
+                background thread, many per commit (call ``close`` to flush)
+            write_interval: Longest a queued message waits to share a commit, in seconds
+            write_batch_size: Most queued messages per commit
+            write_queue_size: Queued messages before ``queue_messages`` blocks
         """
         self.db_path = db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -61,11 +131,49 @@ class ChatDatabase:
             self.cipher = None
         
         # Create engine and tables
-        self.engine = create_engine(f'sqlite:///{db_path}')
+        self.tuned = tuned
+        self.engine = create_engine(
+            f'sqlite:///{db_path}',
+            connect_args={'timeout': busy_timeout, 'check_same_thread': False},
+            pool_size=pool_size,
+            max_overflow=pool_size
+        )
+        if tuned:
+            pragmas = (
+                "PRAGMA journal_mode=WAL",
+                "PRAGMA synchronous=NORMAL",
+                f"PRAGMA busy_timeout={int(busy_timeout * 1000)}",
+                f"PRAGMA mmap_size={int(mmap_size)}",
+                f"PRAGMA cache_size=-{int(cache_size_kb)}",
+                "PRAGMA temp_store=MEMORY",
+            )
+            
+            @event.listens_for(self.engine, "connect")
+            def _apply_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+                cursor.close()
+        
         Base.metadata.create_all(self.engine)
+        # create_all skips indexes added to tables that already exist
+        for index in ChatMessage.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
         
         # Create session factory
         self.Session = sessionmaker(bind=self.engine)
+        
+        # Newest timestamp handed out by _message_records
+        self._last_timestamp = datetime.min
+        self._timestamp_lock = threading.Lock()
+        
+        # Decrypted recent messages for the reply path
+        self.context_cache = ContextCache(context_cache_size, context_cache_max_bytes)
+        
+        # Background writer for queue_messages
+        self.writer = MessageWriter(
+            self, write_interval, write_batch_size, write_queue_size
+        ) if write_behind else None
     
     def _encrypt(self, text: str) -> str:
         """Encrypt text
@@ -93,6 +201,20 @@ class ChatDatabase:
             return self.cipher.decrypt(encrypted_text.encode()).decode()
         return encrypted_text
     
+    def _decrypt_many(self, encrypted_texts: List[str]) -> List[str]:
+        """Decrypt a batch of texts
+        
+        Args:
+            encrypted_texts: Encrypted texts
+        
+        Returns:
+            Plain texts, in the same order
+        """
+        if not self.cipher:
+            return list(encrypted_texts)
+        decrypt = self.cipher.decrypt
+        return [decrypt(text.encode()).decode() for text in encrypted_texts]
+    
     def add_message(
         self, 
         contact: str, 
@@ -113,24 +235,146 @@ class ChatDatabase:
         Returns:
             Message ID
         """
+        return self.add_messages([{
+            'contact': contact,
+            'message': message,
+            'is_me': is_me,
+            'replied_by_ai': replied_by_ai,
+            'sender_name': sender_name
+        }])[0]
+    
+    def add_messages(self, messages: List[Dict]) -> List[int]:
+        """Add a batch of messages in one transaction
+        
+        Much faster than one ``add_message`` call per message: the batch is
+        encrypted up front and written with a single multi-row insert and a
+        single commit. Either every message is stored or none is.
+        
+        Args:
+            messages: Dictionaries with contact and message, and optionally
+                is_me, replied_by_ai, sender_name and timestamp (datetime,
+                default now), oldest first
+        
+        Returns:
+            Message IDs, in the same order
+        """
+        return self._add_records(self._message_records(messages))
+    
+    def _add_records(self, records: List[Dict]) -> List[int]:
+        """Write complete message records in one transaction and cache them"""
+        if not records:
+            return []
+        
         session = self.Session()
         try:
-            encrypted_message = self._encrypt(message)
-            
-            msg = ChatMessage(
-                contact=contact,
-                message=encrypted_message,
-                is_me=is_me,
-                replied_by_ai=replied_by_ai,
-                sender_name=sender_name
-            )
-            
-            session.add(msg)
+            message_ids = self._insert_messages(session, records)
             session.commit()
-            return msg.id
         
         finally:
             session.close()
+        
+        for record, message_id in zip(records, message_ids):
+            self.context_cache.append(record['contact'], self._message_dict(record, message_id))
+        return message_ids
+    
+    def queue_messages(self, messages: List[Dict]) -> List[str]:
+        """Store messages, through the background writer if there is one
+        
+        With write-behind enabled this returns as soon as the messages are
+        queued; they show up in ``get_conversation`` and
+        ``get_recent_context`` right away (with an id of None until written).
+        Otherwise it is ``add_messages``.
+        
+        Args:
+            messages: Same dictionaries as for ``add_messages``, oldest first
+        
+        Returns:
+            Stored timestamps (ISO format), in the same order. Unless given
+            explicitly they are unique, so they identify the messages in the
+            read methods' results even before the writer assigns ids.
+        """
+        records = self._message_records(messages)
+        if self.writer is None or not self.writer.submit(records):
+            self._add_records(records)
+        return [record['timestamp'].isoformat() for record in records]
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until messages queued so far are written
+        
+        Args:
+            timeout: Seconds to wait (None waits forever)
+        
+        Returns:
+            True if nothing is left pending
+        """
+        return self.writer.flush(timeout) if self.writer is not None else True
+    
+    def close(self) -> None:
+        """Write pending messages and stop the background writer
+        
+        Later writes go straight to the database.
+        """
+        if self.writer is not None:
+            self.writer.close()
+    
+    def _message_records(self, messages: List[Dict]) -> List[Dict]:
+        """Fill in the optional fields of new messages
+        
+        Messages without a timestamp get the current time, at least a
+        microsecond after the previous one, so no two share a timestamp.
+        """
+        records = []
+        with self._timestamp_lock:
+            for msg in messages:
+                timestamp = msg.get('timestamp')
+                if timestamp is None:
+                    timestamp = max(datetime.utcnow(), self._last_timestamp + timedelta(microseconds=1))
+                    self._last_timestamp = timestamp
+                records.append({
+                    'contact': msg['contact'],
+                    'message': msg['message'],
+                    'is_me': msg.get('is_me', False),
+                    'timestamp': timestamp,
+                    'replied_by_ai': msg.get('replied_by_ai', False),
+                    'sender_name': msg.get('sender_name'),
+                })
+        return records
+    
+    def _insert_messages(self, session: Session, records: List[Dict]) -> List[int]:
+        """Encrypt and insert records in the session's transaction, without committing
+        
+        One executemany with RETURNING where the database supports it (SQLite
+        3.35 or newer); older SQLite builds fall back to the ORM, which inserts
+        row by row to learn each id.
+        
+        Returns:
+            Message IDs, in the same order
+        """
+        rows = [dict(record, message=self._encrypt(record['message'])) for record in records]
+        if not session.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+            messages = [ChatMessage(**row) for row in rows]
+            session.add_all(messages)
+            session.flush()
+            return [message.id for message in messages]
+        
+        result = session.execute(
+            insert(ChatMessage).returning(ChatMessage.id, sort_by_parameter_order=True),
+            rows
+        )
+        return list(result.scalars())
+    
+    @staticmethod
+    def _message_dict(record: Dict, message_id: Optional[int]) -> Dict:
+        """Message dictionary as returned by the read methods"""
+        return {
+            'id': message_id,
+            'contact': record['contact'],
+            'message': record['message'],
+            'is_me': record['is_me'],
+            'timestamp': record['timestamp'].isoformat(),
+            'replied_by_ai': record['replied_by_ai'],
+            'sender_name': record['sender_name']
+        }
     
     def get_conversation(
         self, 
@@ -144,13 +388,17 @@ class ChatDatabase:
             limit: Maximum number of messages
         
         Returns:
-            List of message dictionaries
+            List of message dictionaries, including messages still queued
+            for the background writer
         """
+        # Taken before the read: anything written meanwhile is then in both
+        pending = self.writer.pending(contact) if self.writer is not None else []
+        
         session = self.Session()
         try:
             messages = session.query(ChatMessage)\
                 .filter(ChatMessage.contact == contact)\
-                .order_by(ChatMessage.timestamp.desc())\
+                .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())\
                 .limit(limit)\
                 .all()
             
@@ -165,35 +413,201 @@ class ChatDatabase:
                     'replied_by_ai': msg.replied_by_ai,
                     'sender_name': msg.sender_name
                 })
+        
+        finally:
+            session.close()
+        
+        if pending:
+            # The writer assigns ids before committing, so written ones are recognised
+            stored = {msg['id'] for msg in result}
+            result.extend(dict(msg) for msg in pending if msg['id'] not in stored)
+            result = result[-limit:]
+        return result
+    
+    def get_recent_context(self, contact: str, limit: int = 10) -> List[Dict]:
+        """Get the most recent messages with a contact for reply generation
+        
+        Served from the in-memory cache; the database is read (and the
+        cache warmed) only on the first access for a contact.
+        
+        Args:
+            contact: Contact phone number
+            limit: Maximum number of messages
+        
+        Returns:
+            List of message dictionaries, oldest first
+        """
+        cached = self.context_cache.get(contact, limit)
+        if cached is not None:
+            return cached
+        
+        if limit > self.context_cache.per_contact:
+            return self.get_conversation(contact, limit)
+        
+        version = self.context_cache.write_version(contact)
+        messages = self.get_conversation(contact, self.context_cache.per_contact)
+        self.context_cache.warm(contact, messages, version)
+        return messages[-limit:]
+    
+    def count_messages_after(self, contact: str, message_id: int) -> int:
+        """Count messages with a contact newer than a given message
+        
+        Args:
+            contact: Contact phone number
+            message_id: ID of the last message already seen (0 for all)
+        
+        Returns:
+            Number of newer messages
+        """
+        session = self.Session()
+        try:
+            return session.query(ChatMessage)\
+                .filter(ChatMessage.contact == contact)\
+                .filter(ChatMessage.id > message_id)\
+                .count()
+        
+        finally:
+            session.close()
+    
+    def get_messages_after(self, contact: str, message_id: int, limit: int = 100) -> List[Dict]:
+        """Get the newest messages with a contact after a given message
+        
+        Args:
+            contact: Contact phone number
+            message_id: ID of the last message already seen (0 for all)
+            limit: Maximum number of messages (the newest are kept)
+        
+        Returns:
+            List of message dictionaries, oldest first
+        """
+        session = self.Session()
+        try:
+            messages = session.query(ChatMessage)\
+                .filter(ChatMessage.contact == contact)\
+                .filter(ChatMessage.id > message_id)\
+                .order_by(ChatMessage.id.desc())\
+                .limit(limit)\
+                .all()
             
-            return result
+            return [
+                {
+                    'id': msg.id,
+                    'message': self._decrypt(msg.message),
+                    'is_me': msg.is_me,
+                    'timestamp': msg.timestamp.isoformat()
+                }
+                for msg in reversed(messages)
+            ]
         
         finally:
             session.close()
     
-    def get_all_conversations(self, limit_per_contact: int = 10) -> Dict[str, List[Dict]]:
-        """Get all conversations grouped by contact
+    def get_summary(self, contact: str) -> Optional[Dict]:
+        """Get the rolling conversation summary of a contact
         
         Args:
-            limit_per_contact: Max messages per contact
+            contact: Contact phone number
         
         Returns:
-            Dictionary of contact -> messages
+            Dictionary with summary, last_message_id and updated_at, or None
+        """
+        session = self.Session()
+        try:
+            row = session.query(ContactSummary)\
+                .filter(ContactSummary.contact == contact)\
+                .first()
+            
+            if row is None:
+                return None
+            return {
+                'summary': self._decrypt(row.summary),
+                'last_message_id': row.last_message_id,
+                'updated_at': row.updated_at.isoformat()
+            }
+        
+        finally:
+            session.close()
+    
+    def save_summary(self, contact: str, summary: str, last_message_id: int) -> None:
+        """Insert or replace the rolling conversation summary of a contact
+        
+        Args:
+            contact: Contact phone number
+            summary: Summary text
+            last_message_id: ID of the newest message the summary covers
         """
         session = self.Session()
         try:
-            # Get unique contacts
-            contacts = session.query(ChatMessage.contact).distinct().all()
+            row = session.query(ContactSummary)\
+                .filter(ContactSummary.contact == contact)\
+                .first()
             
-            result = {}
-            for (contact,) in contacts:
-                result[contact] = self.get_conversation(contact, limit_per_contact)
+            if row is None:
+                row = ContactSummary(contact=contact)
+                session.add(row)
             
-            return result
+            row.summary = self._encrypt(summary)
+            row.last_message_id = last_message_id
+            session.commit()
         
         finally:
             session.close()
     
+    def get_all_conversations(self, limit_per_contact: int = 10) -> Dict[str, List[Dict]]:
+        """Get all conversations grouped by contact
+        
+        One query returns the latest messages of every contact, which are
+        then decrypted in a single pass.
+        
+        Args:
+            limit_per_contact: Max messages per contact
+        
+        Returns:
+            Dictionary of contact -> messages, oldest first
+        """
+        # For each contact, the ids of its latest messages come straight from
+        # the (contact, timestamp) index; only those rows are read
+        contacts = select(ChatMessage.contact).distinct().subquery('contacts')
+        latest = aliased(ChatMessage)
+        latest_ids = select(latest.id)\
+            .where(latest.contact == contacts.c.contact)\
+            .order_by(latest.timestamp.desc(), latest.id.desc())\
+            .limit(limit_per_contact)\
+            .correlate(contacts)
+        query = select(
+            ChatMessage.id,
+            ChatMessage.contact,
+            ChatMessage.message,
+            ChatMessage.is_me,
+            ChatMessage.timestamp,
+            ChatMessage.replied_by_ai,
+            ChatMessage.sender_name
+        ).select_from(contacts)\
+            .join(ChatMessage, ChatMessage.id.in_(latest_ids))\
+            .order_by(ChatMessage.contact, ChatMessage.timestamp, ChatMessage.id)
+        
+        session = self.Session()
+        try:
+            rows = session.execute(query).all()
+        finally:
+            session.close()
+        
+        texts = self._decrypt_many([row.message for row in rows])
+        
+        result = {}
+        for row, text in zip(rows, texts):
+            result.setdefault(row.contact, []).append({
+                'id': row.id,
+                'contact': row.contact,
+                'message': text,
+                'is_me': row.is_me,
+                'timestamp': row.timestamp.isoformat(),
+                'replied_by_ai': row.replied_by_ai,
+                'sender_name': row.sender_name
+            })
+        
+        return result
+    
     def add_approved_contact(self, phone_number: str, name: Optional[str] = None) -> int:
         """Add an approved contact
         
@@ -263,3 +677,128 @@ class ChatDatabase:
         
         finally:
             session.close()
+    
+    def get_watermark(self, contact: str) -> Optional[str]:
+        """Get the data-id of the newest processed message from a contact
+        
+        Args:
+            contact: Contact phone number
+        
+        Returns:
+            WhatsApp message data-id, or None if nothing was processed yet
+        """
+        session = self.Session()
+        try:
+            watermark = session.query(MessageWatermark)\
+                .filter(MessageWatermark.contact == contact)\
+                .first()
+            
+            return watermark.message_id if watermark else None
+        
+        finally:
+            session.close()
+    
+    def set_watermark(self, contact: str, message_id: str) -> None:
+        """Store the data-id of the newest processed message from a contact
+        
+        Args:
+            contact: Contact phone number
+            message_id: WhatsApp message data-id
+        """
+        session = self.Session()
+        try:
+            watermark = session.query(MessageWatermark)\
+                .filter(MessageWatermark.contact == contact)\
+                .first()
+            
+            if watermark:
+                watermark.message_id = message_id
+            else:
+                session.add(MessageWatermark(contact=contact, message_id=message_id))
+            
+            session.commit()
+        
+        finally:
+            session.close()
+    
+    def load_reply_cache(self, limit: int) -> List[Dict]:
+        """Get the most recently used reply cache entries
+        
+        Args:
+            limit: Maximum number of entries
+        
+        Returns:
+            List of entry dictionaries (times as Unix timestamps), most recently used first
+        """
+        session = self.Session()
+        try:
+            rows = session.query(ReplyCacheRow)\
+                .order_by(ReplyCacheRow.last_used.desc())\
+                .limit(limit)\
+                .all()
+            
+            return [
+                {
+                    'key': row.cache_key,
+                    'candidates': json.loads(self._decrypt(row.candidates)),
+                    'next_candidate': row.next_candidate,
+                    'created_at': (row.created_at - datetime(1970, 1, 1)).total_seconds(),
+                    'last_used': (row.last_used - datetime(1970, 1, 1)).total_seconds()
+                }
+                for row in rows
+            ]
+        
+        finally:
+            session.close()
+    
+    def save_reply_cache_entry(
+        self,
+        key: str,
+        candidates: List[str],
+        next_candidate: int,
+        created_at: float,
+        last_used: float
+    ) -> None:
+        """Insert or update a reply cache entry
+        
+        Args:
+            key: Cache key
+            candidates: Candidate replies
+            next_candidate: Index of the next candidate to serve
+            created_at: Unix time the entry was created
+            last_used: Unix time the entry was last used
+        """
+        session = self.Session()
+        try:
+            row = session.query(ReplyCacheRow)\
+                .filter(ReplyCacheRow.cache_key == key)\
+                .first()
+            
+            if row is None:
+                row = ReplyCacheRow(cache_key=key)
+                session.add(row)
+            
+            row.candidates = self._encrypt(json.dumps(candidates))
+            row.next_candidate = next_candidate
+            row.created_at = datetime.utcfromtimestamp(created_at)
+            row.last_used = datetime.utcfromtimestamp(last_used)
+            session.commit()
+        
+        finally:
+            session.close()
+    
+    def delete_reply_cache_entries(self, keys: List[str]) -> None:
+        """Delete reply cache entries
+        
+        Args:
+            keys: Cache keys to delete
+        """
+        session = self.Session()
+        try:
+            session.query(ReplyCacheRow)\
+                .filter(ReplyCacheRow.cache_key.in_(keys))\
+                .delete(synchronize_session=False)
+            session.commit()
+        
+        finally:
+            session.close()
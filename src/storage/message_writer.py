@@ -0,0 +1,191 @@
+"""Write-behind storage of new messages on a background thread"""
+
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class MessageWriter:
+    """Stores new messages in the background, many per commit
+    
+    ``submit`` queues message records and returns. The writer thread takes
+    what is queued, waits up to ``interval`` seconds for more (at most
+    ``batch_size`` records) and writes them in one transaction through its
+    own session. Queued messages are written through to the context cache
+    right away (getting their ids once committed) and listed by ``pending``
+    until they are committed, so reads through the database see them before
+    they reach SQLite. The queue is
+    bounded: ``submit`` blocks while ``max_queued`` records are waiting.
+    """
+    
+    def __init__(
+        self,
+        database,
+        interval: float = 0.005,
+        batch_size: int = 100,
+        max_queued: int = 1000
+    ):
+        """Initialize writer and start its thread
+        
+        Args:
+            database: ChatDatabase the messages go to
+            interval: Longest a record waits for others to share its commit, in seconds
+            batch_size: Most records per commit
+            max_queued: Records waiting before ``submit`` blocks
+        """
+        self.database = database
+        self.interval = interval
+        self.batch_size = max(batch_size, 1)
+        
+        self._queue: queue.Queue = queue.Queue(maxsize=max(max_queued, 1))
+        # contact -> message dictionaries not committed yet, oldest first
+        self._pending: Dict[str, List[Dict]] = {}
+        self._changed = threading.Condition()
+        self._submitted = 0
+        self._finished = 0
+        self._closed = False
+        
+        self._written = 0
+        self._commits = 0
+        self._failed = 0
+        
+        self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, records: List[Dict]) -> bool:
+        """Queue message records for writing
+        
+        Args:
+            records: Complete message records (see ``ChatDatabase._message_records``)
+        
+        Returns:
+            False if the writer is closed and nothing was queued
+        """
+        with self._changed:
+            if self._closed:
+                return False
+            items = []
+            for record in records:
+                message = self.database._message_dict(record, None)
+                self._pending.setdefault(record['contact'], []).append(message)
+                self.database.context_cache.append(record['contact'], message)
+                items.append((record, message))
+            self._submitted += len(items)
+        
+        # Outside the lock: the writer needs it to make room
+        for item in items:
+            self._queue.put(item)
+        return True
+    
+    def pending(self, contact: str) -> List[Dict]:
+        """Messages of a contact not committed yet, oldest first
+        
+        The dictionaries are shared with the writer, which fills in ``id``
+        just before committing them; copy them before handing them out.
+        
+        Args:
+            contact: Contact phone number
+        
+        Returns:
+            Message dictionaries
+        """
+        with self._changed:
+            return list(self._pending.get(contact, ()))
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the messages submitted so far are written (or failed)
+        
+        Args:
+            timeout: Seconds to wait (None waits forever)
+        
+        Returns:
+            True if they were
+        """
+        with self._changed:
+            target = self._submitted
+            return self._changed.wait_for(lambda: self._finished >= target, timeout)
+    
+    def close(self) -> None:
+        """Write everything queued and stop the thread"""
+        with self._changed:
+            self._closed = True
+        self._thread.join()
+    
+    def _run(self) -> None:
+        """Group-commit queued records until closed and drained (writer thread)"""
+        session = self.database.Session()
+        try:
+            while True:
+                try:
+                    batch = [self._queue.get(timeout=0.1)]
+                except queue.Empty:
+                    with self._changed:
+                        if self._closed and self._finished >= self._submitted:
+                            return
+                    continue
+                
+                deadline = time.monotonic() + self.interval
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0.0)))
+                    except queue.Empty:
+                        break
+                self._write(session, batch)
+        finally:
+            session.close()
+    
+    def _write(self, session, batch: List[Tuple[Dict, Dict]]) -> None:
+        """Write one batch in a single transaction"""
+        records = [record for record, _ in batch]
+        messages = [message for _, message in batch]
+        failed = False
+        try:
+            message_ids = self.database._insert_messages(session, records)
+            # Before the commit, so a reader that sees the rows also sees the ids
+            for message, message_id in zip(messages, message_ids):
+                message['id'] = message_id
+            session.commit()
+            # The context cache copied the messages while their ids were unknown
+            ids: Dict[str, Dict[str, int]] = {}
+            for record, message in batch:
+                ids.setdefault(record['contact'], {})[message['timestamp']] = message['id']
+            for contact, contact_ids in ids.items():
+                self.database.context_cache.assign_ids(contact, contact_ids)
+        except Exception as e:
+            failed = True
+            session.rollback()
+            for message in messages:
+                message['id'] = None
+            print(f"Error writing {len(batch)} queued message(s): {e}")
+        
+        with self._changed:
+            done = {id(message) for message in messages}
+            for contact in {record['contact'] for record in records}:
+                remaining = [message for message in self._pending[contact] if id(message) not in done]
+                if remaining:
+                    self._pending[contact] = remaining
+                else:
+                    del self._pending[contact]
+                if failed:
+                    # The cache holds messages that never made it to the database
+                    self.database.context_cache.invalidate(contact)
+            
+            self._finished += len(batch)
+            if failed:
+                self._failed += len(batch)
+            else:
+                self._written += len(batch)
+                self._commits += 1
+            self._changed.notify_all()
+    
+    def stats(self) -> Dict:
+        """Messages written, commits and messages still queued"""
+        with self._changed:
+            return {
+                'written': self._written,
+                'commits': self._commits,
+                'avg_batch': round(self._written / self._commits, 1) if self._commits else 0.0,
+                'failed': self._failed,
+                'queued': self._submitted - self._finished,
+            }
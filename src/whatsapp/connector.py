@@ -1,7 +1,9 @@
 """WhatsApp Web automation using Selenium"""
 
 import time
-from typing import List, Optional, Dict, Tuple
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Iterable, List, Optional, Dict, Set, Tuple
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -9,50 +11,235 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import (
+    TimeoutException,
+    NoSuchElementException,
+    WebDriverException,
+    StaleElementReferenceException,
+    ElementClickInterceptedException,
+    SessionNotCreatedException,
+)
 from webdriver_manager.chrome import ChromeDriverManager
+from src.config import Config
+
+
+# Local state (browser session, cached chromedriver path)
+DIGI_ME_DIR = Path.home() / ".digi-me"
+DRIVER_PATH_CACHE = DIGI_ME_DIR / "chromedriver-path"
+
+# Chrome switches for the fast-start profile: no images, no media autoplay,
+# no background networking or other browser housekeeping
+LEAN_PROFILE_ARGUMENTS = [
+    "--blink-settings=imagesEnabled=false",
+    "--autoplay-policy=user-gesture-required",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-extensions",
+    "--disable-sync",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+]
+
+LEAN_PROFILE_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.default_content_setting_values.media_stream": 2,
+}
+
+# Number of recent samples kept per wait phase
+WAIT_SAMPLE_SIZE = 200
+
+# How often readiness conditions are re-checked (seconds)
+WAIT_POLL_FREQUENCY = 0.05
+
+
+# Reads the chat list once and returns the titles of every chat that shows an
+# unread badge, plus the title of the conversation that is currently open
+# (WhatsApp does not badge the open chat, so new messages there would be missed).
+UNREAD_SCAN_JS = """
+const titles = [];
+document.querySelectorAll('div._ak8l').forEach(function (row) {
+    if (!row.querySelector('span._ahzz')) {
+        return;
+    }
+    const title = row.querySelector('span[title]');
+    if (title) {
+        titles.push(title.getAttribute('title'));
+    }
+});
+const header = document.querySelector('#main header span[title]');
+return {unread: titles, open: header ? header.getAttribute('title') : null};
+"""
+
+# Collects every visible message bubble in the open chat in a single round trip.
+# Mirrors the XPath loop in ``_harvest_messages_xpath``: bubbles without a text
+# span (media, deleted messages) are skipped.
+HARVEST_MESSAGES_JS = """
+const messages = [];
+document.querySelectorAll('div[class="_akbu"] div[class="copyable-text"]').forEach(function (el) {
+    const text = el.querySelector('span[class="_ao3e"]');
+    const time = el.querySelector('span[class="_ao_h"]');
+    if (!text || !time) {
+        return;
+    }
+    const row = el.closest('[data-id]');
+    messages.push({
+        is_from_me: el.closest('.message-out') !== null,
+        message: text.innerText,
+        timestamp: time.innerText,
+        message_id: row ? row.getAttribute('data-id') : null
+    });
+});
+return messages;
+"""
+
+# data-id of the newest outgoing bubble in the open chat (None if there is none
+# or it has no id yet), taken before a send to recognise the new bubble.
+LAST_OUTGOING_JS = """
+const out = document.querySelectorAll('#main .message-out');
+const row = out.length ? out[out.length - 1].closest('[data-id]') : null;
+return row ? row.getAttribute('data-id') : null;
+"""
+
+# True once the newest outgoing bubble is a new one and carries a delivery tick
+# (pending clock, single or double check). WhatsApp trims and virtualizes the
+# message list, so the bubble is recognised by its data-id differing from
+# ``arguments[0]`` rather than by counting; bubbles without ids are compared
+# by their text with ``arguments[1]``, the last message sent.
+SENT_BUBBLE_JS = """
+const out = document.querySelectorAll('#main .message-out');
+if (!out.length) {
+    return false;
+}
+const last = out[out.length - 1];
+const row = last.closest('[data-id]');
+const id = row ? row.getAttribute('data-id') : null;
+if (id === arguments[0]) {
+    const squeeze = function (value) { return value.replace(/\\s+/g, ' ').trim(); };
+    const text = last.querySelector('span[class="_ao3e"]');
+    if (id !== null || !text || squeeze(text.innerText) !== squeeze(arguments[1])) {
+        return false;
+    }
+}
+const icons = 'span[data-icon="msg-time"], span[data-icon="msg-check"], span[data-icon="msg-dblcheck"]';
+return last.querySelector(icons) !== null;
+"""
+
+# Puts the whole text into the composer in one operation. WhatsApp's editor
+# consumes paste events (keeping newlines and emoji intact) and may apply them
+# after the event returns, so a consumed paste is reported as 'pasted' without
+# looking at the composer. If nothing handles the event, the text is inserted
+# line by line with editing commands instead ('inserted', or 'empty' if that
+# left the composer empty).
+INSERT_TEXT_JS = """
+const box = arguments[0];
+const text = arguments[1];
+box.focus();
+const data = new DataTransfer();
+data.setData('text/plain', text);
+const paste = new ClipboardEvent('paste', {clipboardData: data, bubbles: true, cancelable: true});
+if (!box.dispatchEvent(paste)) {
+    return 'pasted';
+}
+text.split('\\n').forEach(function (line, i) {
+    if (i > 0) {
+        document.execCommand('insertLineBreak');
+    }
+    if (line) {
+        document.execCommand('insertText', false, line);
+    }
+});
+return box.innerText.trim().length > 0 ? 'inserted' : 'empty';
+"""
+
+COMPOSER_FILLED_JS = "return arguments[0].innerText.trim().length > 0;"
 
 
 class WhatsAppConnector:
     """Manages WhatsApp Web connection and message handling"""
     
-    def __init__(self, headless: bool = False):
+    def __init__(self, headless: bool = False, watermark_store=None, fast_start: Optional[bool] = None):
         """Initialize WhatsApp connector
         
         Args:
             headless: Run browser in headless mode
+            watermark_store: Optional object with ``get_watermark`` and
+                ``set_watermark`` (e.g. ChatDatabase) to persist the newest
+                processed message per contact across restarts
+            fast_start: Cache the chromedriver path and use a lean browser
+                profile (default from config)
         """
         self.driver = None
         self.headless = headless
+        self.fast_start = Config.WHATSAPP_FAST_START if fast_start is None else fast_start
+        self.startup_timings: Dict[str, float] = {}
         self.wait = None
-        self.last_checked_messages = {}
+        self.watermark_store = watermark_store
+        self.watermarks: Dict[str, Optional[str]] = {}
+        
+        # Contact whose conversation is currently open, if known
+        self.current_chat: Optional[str] = None
+        
+        # Readiness timeouts per wait phase and how long each wait actually took
+        self.wait_timeouts = {
+            'search_box': Config.WHATSAPP_SEARCH_TIMEOUT,
+            'search_result': Config.WHATSAPP_SEARCH_TIMEOUT,
+            'chat_open': Config.WHATSAPP_CHAT_OPEN_TIMEOUT,
+            'composer': Config.WHATSAPP_CHAT_OPEN_TIMEOUT,
+            'paste': Config.WHATSAPP_SEND_TIMEOUT,
+            'send_ack': Config.WHATSAPP_SEND_TIMEOUT,
+        }
+        self.wait_timings: Dict[str, Deque[float]] = {}
     
     def connect(self) -> None:
         """Connect to WhatsApp Web"""
+        started = time.perf_counter()
         chrome_options = Options()
         
         # User data directory to save session
         # Use a more secure location than /tmp
-        from pathlib import Path
-        session_dir = Path.home() / ".digi-me" / "whatsapp-session"
+        session_dir = DIGI_ME_DIR / "whatsapp-session"
         session_dir.mkdir(parents=True, exist_ok=True)
         chrome_options.add_argument(f"--user-data-dir={session_dir}")
         
         if self.headless:
-            chrome_options.add_argument("--headless")
+            chrome_options.add_argument("--headless=new")
         
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
+        
+        if self.fast_start:
+            chrome_options.add_argument("--window-size=1280,800")
+            for argument in LEAN_PROFILE_ARGUMENTS:
+                chrome_options.add_argument(argument)
+            chrome_options.add_experimental_option("prefs", LEAN_PROFILE_PREFS)
+        else:
+            chrome_options.add_argument("--window-size=1920,1080")
         
         # Initialize driver
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver_path, cached = self._resolve_driver_path()
+        resolved = time.perf_counter()
+        
+        try:
+            self.driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+        except SessionNotCreatedException:
+            if not cached:
+                raise
+            # Chrome was probably updated; drop the cached driver and resolve again
+            print("Cached chromedriver does not match Chrome, resolving a new one...")
+            DRIVER_PATH_CACHE.unlink(missing_ok=True)
+            driver_path, cached = self._resolve_driver_path()
+            self.driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+        
+        launched = time.perf_counter()
         self.wait = WebDriverWait(self.driver, 30)
         
         # Open WhatsApp Web
-        self.driver.get("https://web.whatsapp.com")
+        self.driver.get(Config.WHATSAPP_WEB_URL)
         
         print("Waiting for WhatsApp Web to load...")
         print("Please scan QR code if this is first time...")
@@ -66,12 +253,55 @@ class WhatsAppConnector:
         except TimeoutException:
             print("Timeout waiting for WhatsApp Web. Make sure you scanned the QR code.")
             raise
+        
+        ready = time.perf_counter()
+        self.startup_timings = {
+            'driver_resolve_s': round(resolved - started, 3),
+            'browser_launch_s': round(launched - resolved, 3),
+            'page_ready_s': round(ready - launched, 3),
+            'total_s': round(ready - started, 3),
+            'driver_cached': cached,
+        }
+        print(
+            f"Time to ready: {self.startup_timings['total_s']:.2f}s "
+            f"(driver {self.startup_timings['driver_resolve_s']:.2f}s"
+            f"{' cached' if cached else ''}, "
+            f"browser {self.startup_timings['browser_launch_s']:.2f}s, "
+            f"page {self.startup_timings['page_ready_s']:.2f}s)"
+        )
+    
+    def _resolve_driver_path(self) -> Tuple[str, bool]:
+        """Find the chromedriver executable
+        
+        In fast-start mode the path resolved by webdriver-manager is cached in
+        ``~/.digi-me`` so warm restarts skip the network lookup.
+        
+        Returns:
+            Tuple of (driver path, whether it came from the cache)
+        """
+        # A configured driver is never replaced, so it does not count as cached
+        if Config.CHROMEDRIVER_PATH:
+            return Config.CHROMEDRIVER_PATH, False
+        
+        if self.fast_start and DRIVER_PATH_CACHE.exists():
+            cached_path = DRIVER_PATH_CACHE.read_text(encoding='utf-8').strip()
+            if cached_path and Path(cached_path).exists():
+                return cached_path, True
+        
+        driver_path = ChromeDriverManager().install()
+        
+        if self.fast_start:
+            DIGI_ME_DIR.mkdir(parents=True, exist_ok=True)
+            DRIVER_PATH_CACHE.write_text(driver_path, encoding='utf-8')
+        
+        return driver_path, False
     
     def disconnect(self) -> None:
         """Disconnect from WhatsApp Web"""
         if self.driver:
             self.driver.quit()
             self.driver = None
+        self.current_chat = None
     
     def search_contact(self, contact: str) -> bool:
         """Search for a contact
@@ -84,7 +314,8 @@ class WhatsAppConnector:
         """
         try:
             # Find search box
-            search_box = self.wait.until(
+            search_box = self._wait_for(
+                'search_box',
                 EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]'))
             )
             
@@ -92,19 +323,84 @@ class WhatsAppConnector:
             search_box.click()
             search_box.clear()
             search_box.send_keys(contact)
-            time.sleep(2)
             
-            # Click on the contact
-            contact_elem = self.wait.until(
-                EC.presence_of_element_located((By.XPATH, f'//span[@title="{contact}"]'))
+            # Click on the contact as soon as the search result is clickable
+            def click_result(driver):
+                results = driver.find_elements(By.XPATH, f'//span[@title="{contact}"]')
+                if not results:
+                    return False
+                results[0].click()
+                return True
+            
+            self._wait_for('search_result', click_result)
+            
+            # Wait until the conversation header shows the contact
+            self._wait_for(
+                'chat_open',
+                EC.presence_of_element_located((By.XPATH, f'//div[@id="main"]//header//span[@title="{contact}"]'))
             )
-            contact_elem.click()
-            time.sleep(1)
             
+            # Leave the search so the chat list shows every chat again
+            # (get_contacts_with_unread only sees the chats that are listed)
+            self._clear_search(search_box)
+            
+            self.current_chat = contact
             return True
         
         except (TimeoutException, NoSuchElementException):
             print(f"Contact {contact} not found")
+            self.current_chat = None
+            return False
+    
+    def _clear_search(self, search_box) -> None:
+        """Empty the search box with Escape, falling back to clearing its text
+        
+        Args:
+            search_box: Search box element
+        """
+        try:
+            search_box.send_keys(Keys.ESCAPE)
+            if search_box.text.strip():
+                search_box.clear()
+        
+        except WebDriverException as e:
+            print(f"Could not clear the chat search: {e}")
+    
+    def open_chat(self, contact: str) -> bool:
+        """Make sure the contact's conversation is open
+        
+        Reuses the open chat when the conversation header already shows the
+        contact, so a read followed by a send (or a burst of sends) only
+        goes through the search box once.
+        
+        Args:
+            contact: Contact name or phone number
+        
+        Returns:
+            True if the chat is open, False otherwise
+        """
+        if self.current_chat == contact and self._is_chat_open(contact):
+            return True
+        
+        return self.search_contact(contact)
+    
+    def _is_chat_open(self, contact: str) -> bool:
+        """Check whether the conversation header shows the contact
+        
+        Args:
+            contact: Contact name or phone number
+        
+        Returns:
+            True if the contact's chat is the open one
+        """
+        try:
+            headers = self.driver.find_elements(
+                By.XPATH,
+                f'//div[@id="main"]//header//span[@title="{contact}"]'
+            )
+            return len(headers) > 0
+        
+        except WebDriverException:
             return False
     
     def get_unread_messages(self, contact: str) -> List[Dict]:
@@ -116,45 +412,25 @@ class WhatsAppConnector:
         Returns:
             List of message dictionaries
         """
-        if not self.search_contact(contact):
+        if not self.open_chat(contact):
             return []
         
         try:
-            # Get all messages in the chat
-            messages = self.driver.find_elements(By.XPATH, '//div[@class="_akbu"]//div[@class="copyable-text"]')
-            
-            unread = []
-            current_messages = []
-            
-            for msg in messages:
-                try:
-                    # Check if message is from contact (not from me)
-                    parent = msg.find_element(By.XPATH, './ancestor::div[@class="_akbu"]')
-                    is_from_me = "message-out" in parent.get_attribute("class")
-                    
-                    if not is_from_me:
-                        # Get message text
-                        text_elem = msg.find_element(By.XPATH, './/span[@class="_ao3e"]')
-                        message_text = text_elem.text
-                        
-                        # Get timestamp
-                        time_elem = msg.find_element(By.XPATH, './/span[@class="_ao_h"]')
-                        timestamp = time_elem.text
-                        
-                        current_messages.append({
-                            'contact': contact,
-                            'message': message_text,
-                            'timestamp': timestamp
-                        })
-                
-                except NoSuchElementException:
-                    continue
+            messages = self._harvest_messages()
+            unread = [
+                {
+                    'contact': contact,
+                    'message': msg['message'],
+                    'timestamp': msg['timestamp'],
+                    'message_id': msg.get('message_id')
+                }
+                for msg in self._select_new_messages(messages, self._get_watermark(contact))
+            ]
             
-            # Filter to only new messages
-            last_count = self.last_checked_messages.get(contact, 0)
-            if len(current_messages) > last_count:
-                unread = current_messages[last_count:]
-                self.last_checked_messages[contact] = len(current_messages)
+            # Advance the watermark to the newest message handed out (never
+            # to our own reply, which may have been sent after newer messages)
+            if unread and unread[-1]['message_id']:
+                self._set_watermark(contact, unread[-1]['message_id'])
             
             return unread
         
@@ -162,6 +438,114 @@ class WhatsAppConnector:
             print(f"Error getting messages from {contact}: {e}")
             return []
     
+    @staticmethod
+    def _select_new_messages(messages: List[Dict], watermark: Optional[str]) -> List[Dict]:
+        """Pick the incoming messages newer than the watermark
+        
+        Walks back from the newest message to the watermark, skipping our
+        own replies: messages that arrived while a reply was being generated
+        sit before that reply and still need an answer. Without a watermark,
+        or when it has scrolled out of the DOM, this yields the trailing run
+        of incoming messages (anything before a reply has been answered).
+        
+        Args:
+            messages: Harvested messages, oldest first
+            watermark: data-id of the newest processed message, if any
+        
+        Returns:
+            New incoming messages, oldest first
+        """
+        if watermark is not None:
+            for position in range(len(messages) - 1, -1, -1):
+                if messages[position].get('message_id') == watermark:
+                    return [msg for msg in messages[position + 1:] if not msg['is_from_me']]
+        
+        new_messages = []
+        for msg in reversed(messages):
+            if msg['is_from_me']:
+                break
+            new_messages.append(msg)
+        
+        new_messages.reverse()
+        return new_messages
+    
+    def _get_watermark(self, contact: str) -> Optional[str]:
+        """Get the newest processed message id for a contact"""
+        if contact not in self.watermarks:
+            stored = self.watermark_store.get_watermark(contact) if self.watermark_store else None
+            self.watermarks[contact] = stored
+        return self.watermarks[contact]
+    
+    def _set_watermark(self, contact: str, message_id: str) -> None:
+        """Remember (and persist) the newest processed message id for a contact"""
+        if self.watermarks.get(contact) == message_id:
+            return
+        
+        self.watermarks[contact] = message_id
+        if self.watermark_store:
+            try:
+                self.watermark_store.set_watermark(contact, message_id)
+            except Exception as e:
+                print(f"Error saving watermark for {contact}: {e}")
+    
+    def _harvest_messages(self) -> List[Dict]:
+        """Read all visible messages of the open chat
+        
+        Uses a single ``execute_script`` call and falls back to the slower
+        XPath loop if the script fails or returns something unexpected.
+        
+        Returns:
+            List of dicts with ``is_from_me``, ``message``, ``timestamp``
+            and ``message_id`` (the bubble's data-id, or None)
+        """
+        try:
+            messages = self.driver.execute_script(HARVEST_MESSAGES_JS)
+            if isinstance(messages, list):
+                return messages
+            print("Message harvest script returned no data, falling back to XPath")
+        
+        except WebDriverException as e:
+            print(f"Message harvest script failed, falling back to XPath: {e}")
+        
+        return self._harvest_messages_xpath()
+    
+    def _harvest_messages_xpath(self) -> List[Dict]:
+        """Read all visible messages of the open chat element by element
+        
+        Costs several WebDriver round trips per message; kept as the fallback
+        for ``_harvest_messages``.
+        
+        Returns:
+            Same structure as ``_harvest_messages``
+        """
+        messages = self.driver.find_elements(By.XPATH, '//div[@class="_akbu"]//div[@class="copyable-text"]')
+        
+        result = []
+        for msg in messages:
+            try:
+                # Check if message is from contact (not from me)
+                is_from_me = len(msg.find_elements(By.XPATH, './ancestor::div[contains(@class, "message-out")]')) > 0
+                
+                # Get message text
+                text_elem = msg.find_element(By.XPATH, './/span[@class="_ao3e"]')
+                
+                # Get timestamp
+                time_elem = msg.find_element(By.XPATH, './/span[@class="_ao_h"]')
+                
+                rows = msg.find_elements(By.XPATH, './ancestor::div[@data-id][1]')
+                
+                result.append({
+                    'is_from_me': is_from_me,
+                    'message': text_elem.text,
+                    'timestamp': time_elem.text,
+                    'message_id': rows[0].get_attribute("data-id") if rows else None
+                })
+            
+            except NoSuchElementException:
+                continue
+        
+        return result
+    
     def send_message(self, contact: str, message: str) -> bool:
         """Send a message to a contact
         
@@ -172,30 +556,149 @@ class WhatsAppConnector:
         Returns:
             True if sent successfully, False otherwise
         """
-        if not self.search_contact(contact):
+        return self.send_messages(contact, [message])
+    
+    def send_messages(self, contact: str, messages: List[str]) -> bool:
+        """Send several messages to a contact in one batch
+        
+        The chat is opened once, each message is inserted in a single
+        operation and sent with Enter, and only the last bubble is waited for.
+        
+        Args:
+            contact: Contact name or phone number
+            messages: Messages to send, in order
+        
+        Returns:
+            True if sent successfully, False otherwise
+        """
+        messages = [message for message in messages if message.strip()]
+        if not messages:
+            return False
+        
+        if not self.open_chat(contact):
             return False
         
         try:
             # Find message input box
-            message_box = self.wait.until(
+            message_box = self._wait_for(
+                'composer',
                 EC.presence_of_element_located((
                     By.XPATH, 
                     '//div[@contenteditable="true"][@data-tab="10"]'
                 ))
             )
+            last_before = self.driver.execute_script(LAST_OUTGOING_JS)
             
-            # Type and send message
+            # Insert and send each message
             message_box.click()
-            message_box.send_keys(message)
-            message_box.send_keys(Keys.ENTER)
+            for message in messages:
+                self._insert_text(message_box, message)
+                message_box.send_keys(Keys.ENTER)
+            
+            # Wait for the last sent bubble to show up with its pending tick
+            try:
+                self._wait_for(
+                    'send_ack',
+                    lambda driver: driver.execute_script(SENT_BUBBLE_JS, last_before, messages[-1])
+                )
+            except TimeoutException:
+                print(f"Sent message to {contact} but its bubble did not appear in time")
             
-            time.sleep(1)
             return True
         
         except Exception as e:
             print(f"Error sending message to {contact}: {e}")
             return False
     
+    def _insert_text(self, message_box, text: str) -> None:
+        """Put text into the composer without synthetic keystrokes
+        
+        A paste the editor consumed is waited for until the composer holds
+        text, and never typed again (that would send the text twice). Falls
+        back to typing (with Shift+Enter for line breaks) only if the
+        insertion script fails or leaves the composer empty.
+        
+        Args:
+            message_box: Composer element
+            text: Text to insert
+        """
+        try:
+            result = self.driver.execute_script(INSERT_TEXT_JS, message_box, text)
+            if result == 'pasted':
+                try:
+                    self._wait_for('paste', lambda driver: driver.execute_script(COMPOSER_FILLED_JS, message_box))
+                except WebDriverException:
+                    # Typing now could send the message twice once the paste lands
+                    print("Composer still empty after pasting the message, not typing it again")
+                return
+            if result == 'inserted':
+                return
+            print("Text insertion script left the composer empty, typing instead")
+        
+        except WebDriverException as e:
+            print(f"Text insertion script failed, typing instead: {e}")
+        
+        for i, line in enumerate(text.split("\n")):
+            if i > 0:
+                message_box.send_keys(Keys.SHIFT, Keys.ENTER)
+            if line:
+                message_box.send_keys(line)
+    
+    def _wait_for(self, phase: str, condition: Callable, timeout: Optional[float] = None):
+        """Wait for a readiness condition and record how long it took
+        
+        Args:
+            phase: Wait phase name, used for the timeout and the timing stats
+            condition: Callable taking the driver, truthy when ready
+            timeout: Override for the phase's configured timeout
+        
+        Returns:
+            The condition's truthy result
+        
+        Raises:
+            TimeoutException: If the condition is not met in time
+        """
+        if timeout is None:
+            timeout = self.wait_timeouts.get(phase, 30)
+        
+        wait = WebDriverWait(
+            self.driver,
+            timeout,
+            poll_frequency=WAIT_POLL_FREQUENCY,
+            ignored_exceptions=(
+                NoSuchElementException,
+                StaleElementReferenceException,
+                ElementClickInterceptedException,
+            )
+        )
+        
+        start = time.perf_counter()
+        try:
+            return wait.until(condition)
+        finally:
+            timings = self.wait_timings.setdefault(phase, deque(maxlen=WAIT_SAMPLE_SIZE))
+            timings.append(time.perf_counter() - start)
+    
+    def get_wait_stats(self) -> Dict[str, Dict]:
+        """Summarize recorded wait times per phase
+        
+        Returns:
+            Dictionary of phase -> count, average, p95 and max in milliseconds
+        """
+        stats = {}
+        for phase, timings in self.wait_timings.items():
+            if not timings:
+                continue
+            ordered = sorted(timings)
+            stats[phase] = {
+                'count': len(ordered),
+                'avg_ms': round(sum(ordered) / len(ordered) * 1000, 1),
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                'max_ms': round(ordered[-1] * 1000, 1),
+                'timeout_s': self.wait_timeouts.get(phase),
+            }
+        return stats
+    
     def get_all_chats(self) -> List[str]:
         """Get list of all chat contacts
         
@@ -218,6 +721,33 @@ class WhatsAppConnector:
             print(f"Error getting chats: {e}")
             return []
     
+    def get_contacts_with_unread(self, contacts: Iterable[str]) -> Set[str]:
+        """Find which of the given contacts have new messages in one chat list read
+        
+        Instead of opening every chat, the chat list is scanned once for the
+        unread badges targeted by ``has_unread_indicator``. The currently open
+        conversation is always included because WhatsApp does not badge it.
+        
+        Args:
+            contacts: Contact names or phone numbers to consider
+        
+        Returns:
+            Set of contacts whose chats should be opened
+        """
+        wanted = set(contacts)
+        
+        try:
+            result = self.driver.execute_script(UNREAD_SCAN_JS) or {}
+            flagged = set(result.get('unread') or [])
+            if result.get('open'):
+                flagged.add(result['open'])
+        
+        except Exception as e:
+            print(f"Unread scan script failed, falling back to per-contact check: {e}")
+            flagged = {contact for contact in wanted if self.has_unread_indicator(contact)}
+        
+        return wanted & flagged
+    
     def has_unread_indicator(self, contact: str) -> bool:
         """Check if contact has unread messages indicator
         
@@ -0,0 +1,81 @@
+"""Tests for the bot's polling and reply generation"""
+
+from concurrent.futures import Future
+import pytest
+from src.bot import DigiMeBot
+from src.config import Config
+from src.pipeline import IncomingMessage, MessageBurst
+from src.scheduler import PollScheduler
+from src.storage.database import ChatDatabase
+
+
+class StubGenerator:
+    """Response generator that records the prompt it was given"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def submit(self, **kwargs):
+        self.calls.append(kwargs)
+        future = Future()
+        future.set_result("reply")
+        return future
+
+
+@pytest.fixture
+def bot(tmp_path):
+    """Bot with a real database and no browser, fast path or summaries"""
+    bot = DigiMeBot.__new__(DigiMeBot)
+    bot.database = ChatDatabase(tmp_path / "chat.db", b"test-key")
+    bot.response_generator = StubGenerator()
+    bot.fast_path = None
+    bot.summarizer = None
+    return bot
+
+
+def test_burst_is_left_out_of_context(bot):
+    """Test that only the burst's own rows are dropped, even with a reply stored after it"""
+    bot.database.add_message("+100", "are you free?")
+    bot.database.add_message("+100", "not today", is_me=True)
+    stored = bot.database.queue_messages([{'contact': "+100", 'message': "are you free?"}])
+    bot.database.add_message("+100", "earlier reply sent late", is_me=True, replied_by_ai=True)
+    burst = MessageBurst("+100", [IncomingMessage("+100", "are you free?", stored_at=stored[0])])
+    
+    assert bot._generate_response("+100", burst) == "reply"
+    
+    call = bot.response_generator.calls[0]
+    assert call['message'] == "are you free?"
+    assert [ctx['message'] for ctx in call['context']] == [
+        "are you free?", "not today", "earlier reply sent late"
+    ]
+
+
+class StubWhatsApp:
+    """Connector whose chat list badges the given contacts"""
+    
+    def __init__(self, unread):
+        self.unread = set(unread)
+        self.scans = 0
+    
+    def get_contacts_with_unread(self, contacts):
+        self.scans += 1
+        return set(self.unread)
+
+
+def test_badge_scan_has_its_own_interval(bot, monkeypatch):
+    """Test that due contacts do not read the chat list more often than the scan interval"""
+    monkeypatch.setattr(Config, 'UNREAD_SCAN_MODE', "badge")
+    monkeypatch.setattr(Config, 'UNREAD_SCAN_MIN_INTERVAL_SECONDS', 60)
+    bot.whatsapp = StubWhatsApp(["+100"])
+    bot.scheduler = PollScheduler(["+100", "+200"], min_interval=0, max_interval=60)
+    bot._last_unread_scan = 0.0
+    
+    assert bot._contacts_to_check() == ["+100"]
+    bot.scheduler.reschedule("+100", active=True)
+    
+    assert bot._contacts_to_check() == []
+    assert bot.whatsapp.scans == 1
+    assert bot.scheduler.seconds_until_next() > 50
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
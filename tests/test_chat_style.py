@@ -137,5 +137,69 @@ def test_default_max_response_length(tmp_path):
     assert chat_style.get_max_response_length() == 500  # Default
 
 
+def test_split_reply_at_sentence_boundaries(tmp_path):
+    """Test splitting long replies into sentence-aligned chunks"""
+    style_data = {
+        "response_rules": {
+            "break_long_messages": True,
+            "chunk_length": 50
+        }
+    }
+    
+    style_file = tmp_path / "test_style.json"
+    with open(style_file, 'w') as f:
+        json.dump(style_data, f)
+    
+    chat_style = ChatStyle(style_file)
+    chunks = chat_style.split_reply(
+        "Hey! Yeah, the project's coming along well. Should be done Friday.\n\nTalk soon 👋"
+    )
+    
+    assert chunks == [
+        "Hey! Yeah, the project's coming along well.",
+        "Should be done Friday.",
+        "Talk soon 👋"
+    ]
+
+
+def test_split_reply_disabled(tmp_path):
+    """Test that replies are sent whole unless break_long_messages is set"""
+    style_data = {"response_rules": {"chunk_length": 10}}
+    
+    style_file = tmp_path / "test_style.json"
+    with open(style_file, 'w') as f:
+        json.dump(style_data, f)
+    
+    chat_style = ChatStyle(style_file)
+    
+    assert chat_style.split_reply("One sentence. Another sentence.") == ["One sentence. Another sentence."]
+
+
+def test_compiled_prompt_per_version(tmp_path):
+    """Test that the system prompt is built once and rebuilt after changes"""
+    style_file = tmp_path / "test_style.json"
+    with open(style_file, 'w') as f:
+        json.dump({"personality": {"tone": "casual"}}, f)
+    
+    chat_style = ChatStyle(style_file)
+    prompt = chat_style.get_system_prompt()
+    
+    assert chat_style.get_system_prompt() is prompt
+    assert chat_style.version == 0
+    
+    chat_style.update_style({"personality": {"tone": "sarcastic"}})
+    assert chat_style.version == 1
+    assert "sarcastic" in chat_style.get_system_prompt()
+    
+    builds = []
+    chat_style.compiled("prefix", lambda: builds.append(1) or "x")
+    chat_style.compiled("prefix", lambda: builds.append(1) or "x")
+    chat_style.add_example_conversation("hi", "yo")
+    chat_style.compiled("prefix", lambda: builds.append(1) or "x")
+    
+    assert chat_style.version == 2
+    assert len(builds) == 2
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
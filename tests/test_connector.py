@@ -0,0 +1,427 @@
+"""Tests for WhatsApp connector message handling"""
+
+import time
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from benchmarks.browser import headless_chrome
+from benchmarks.fake_whatsapp import FakeWhatsAppServer
+from src.config import Config
+from src.whatsapp import connector as connector_module
+from src.whatsapp.connector import WhatsAppConnector
+
+
+SEARCH_BOX = '//div[@contenteditable="true"][@data-tab="3"]'
+
+
+class StubElement:
+    """Element that records clicks and keys, with child elements by XPath"""
+    
+    def __init__(self, text="", on_click=None, children=None, attributes=None):
+        self.text = text
+        self.keys = []
+        self.on_click = on_click
+        self.children = children or {}
+        self.attributes = attributes or {}
+    
+    def find_elements(self, by, xpath):
+        return list(self.children.get(xpath, []))
+    
+    def find_element(self, by, xpath):
+        elements = self.find_elements(by, xpath)
+        if not elements:
+            raise NoSuchElementException(xpath)
+        return elements[0]
+    
+    def get_attribute(self, name):
+        return self.attributes.get(name)
+    
+    def click(self):
+        if self.on_click:
+            self.on_click()
+    
+    def clear(self):
+        self.text = ""
+    
+    def send_keys(self, *keys):
+        self.keys.extend(keys)
+        if Keys.ESCAPE in keys:
+            self.text = ""
+        else:
+            self.text += "".join(keys)
+
+
+class StubDriver:
+    """WebDriver stand-in serving elements by XPath and canned script results
+    
+    ``script_result`` may be a callable taking the script and its arguments.
+    """
+    
+    def __init__(self, script_result=None):
+        self.elements = {}
+        self.script_result = script_result
+        self.scripts = 0
+    
+    def find_elements(self, by, xpath):
+        return list(self.elements.get(xpath, []))
+    
+    def find_element(self, by, xpath):
+        elements = self.find_elements(by, xpath)
+        if not elements:
+            raise NoSuchElementException(xpath)
+        return elements[0]
+    
+    def execute_script(self, script, *args):
+        self.scripts += 1
+        if isinstance(self.script_result, Exception):
+            raise self.script_result
+        if callable(self.script_result):
+            return self.script_result(script, *args)
+        return self.script_result
+
+
+def _msg(message_id, is_from_me=False):
+    return {'message_id': message_id, 'is_from_me': is_from_me, 'message': message_id, 'timestamp': '10:00'}
+
+
+def test_select_new_messages_after_watermark():
+    """Test that only messages newer than the watermark are returned"""
+    messages = [_msg("a"), _msg("b"), _msg("c"), _msg("d")]
+    
+    new = WhatsAppConnector._select_new_messages(messages, "b")
+    
+    assert [m['message_id'] for m in new] == ["c", "d"]
+
+
+def test_select_new_messages_stops_at_reply():
+    """Test that messages before an outgoing reply are not replayed"""
+    messages = [_msg("a"), _msg("b"), _msg("r", is_from_me=True), _msg("c")]
+    
+    assert [m['message_id'] for m in WhatsAppConnector._select_new_messages(messages, None)] == ["c"]
+    assert [m['message_id'] for m in WhatsAppConnector._select_new_messages(messages, "gone")] == ["c"]
+
+
+def test_select_new_messages_skips_reply_after_watermark():
+    """Test that a message sent while our reply was generated is not lost"""
+    messages = [_msg("m1"), _msg("m2"), _msg("r1", is_from_me=True)]
+    
+    assert [m['message_id'] for m in WhatsAppConnector._select_new_messages(messages, "m1")] == ["m2"]
+    assert WhatsAppConnector._select_new_messages(messages, "m2") == []
+
+
+def test_watermark_moves_to_newest_incoming_message():
+    """Test that the watermark never lands on our own reply"""
+    connector = WhatsAppConnector()
+    connector.open_chat = lambda contact: True
+    connector.watermarks["+100"] = "m1"
+    connector._harvest_messages = lambda: [_msg("m1"), _msg("m2"), _msg("r1", is_from_me=True)]
+    
+    assert [m['message_id'] for m in connector.get_unread_messages("+100")] == ["m2"]
+    assert connector.watermarks["+100"] == "m2"
+    
+    assert connector.get_unread_messages("+100") == []
+    assert connector.watermarks["+100"] == "m2"
+
+
+def test_select_new_messages_nothing_new():
+    """Test that nothing is returned when the watermark is the newest message"""
+    messages = [_msg("a"), _msg("b")]
+    
+    assert WhatsAppConnector._select_new_messages(messages, "b") == []
+
+
+def test_watermarks_are_persisted():
+    """Test that watermarks are loaded from and saved to the store"""
+    class Store:
+        def __init__(self):
+            self.saved = {"+100": "a"}
+        
+        def get_watermark(self, contact):
+            return self.saved.get(contact)
+        
+        def set_watermark(self, contact, message_id):
+            self.saved[contact] = message_id
+    
+    store = Store()
+    connector = WhatsAppConnector(watermark_store=store)
+    
+    assert connector._get_watermark("+100") == "a"
+    connector._set_watermark("+100", "b")
+    assert store.saved["+100"] == "b"
+
+
+def test_open_chat_reuses_open_conversation():
+    """Test that an already open chat skips the search box"""
+    connector = WhatsAppConnector()
+    searches = []
+    connector.search_contact = lambda contact: searches.append(contact) or True
+    connector._is_chat_open = lambda contact: True
+    
+    connector.current_chat = "+100"
+    assert connector.open_chat("+100")
+    assert searches == []
+    
+    assert connector.open_chat("+200")
+    assert searches == ["+200"]
+
+
+def test_search_contact_clears_search_box():
+    """Test that the search is left once the chat is open, so every chat is listed again"""
+    driver = StubDriver()
+    search_box = StubElement()
+    header = '//div[@id="main"]//header//span[@title="+100"]'
+    result = StubElement(on_click=lambda: driver.elements.update({header: [StubElement("+100")]}))
+    driver.elements = {SEARCH_BOX: [search_box], '//span[@title="+100"]': [result]}
+    connector = WhatsAppConnector()
+    connector.driver = driver
+    
+    assert connector.search_contact("+100")
+    
+    assert search_box.keys == ["+100", Keys.ESCAPE]
+    assert search_box.text == ""
+    assert connector.current_chat == "+100"
+
+
+def test_unread_scan_reads_chat_list_once():
+    """Test that badged chats and the open chat are found with one script call"""
+    connector = WhatsAppConnector()
+    connector.driver = StubDriver({'unread': ["+100", "+300"], 'open': "+200"})
+    
+    assert connector.get_contacts_with_unread(["+100", "+200", "+400"]) == {"+100", "+200"}
+    assert connector.driver.scripts == 1
+
+
+def test_unread_scan_falls_back_to_badge_lookups():
+    """Test that a failing scan script falls back to one badge lookup per contact"""
+    connector = WhatsAppConnector()
+    connector.driver = StubDriver(WebDriverException("script failed"))
+    badge = '//span[@title="+200"]/ancestor::div[contains(@class, "_ak8l")]//span[@class="_ahzz"]'
+    connector.driver.elements = {badge: [StubElement("1")]}
+    
+    assert connector.get_contacts_with_unread(["+100", "+200"]) == {"+200"}
+
+
+def _bubble(text, message_id, is_from_me=False):
+    """Message bubble as the XPath fallback sees it"""
+    return StubElement(children={
+        './ancestor::div[contains(@class, "message-out")]': [StubElement()] if is_from_me else [],
+        './/span[@class="_ao3e"]': [StubElement(text)],
+        './/span[@class="_ao_h"]': [StubElement("10:00")],
+        './ancestor::div[@data-id][1]': [StubElement(attributes={'data-id': message_id})],
+    })
+
+
+@pytest.mark.parametrize("script_result", [WebDriverException("script failed"), None])
+def test_harvest_falls_back_to_xpath(script_result):
+    """Test that a failing or empty harvest script falls back to the XPath loop"""
+    connector = WhatsAppConnector()
+    connector.driver = StubDriver(script_result)
+    connector.driver.elements = {'//div[@class="_akbu"]//div[@class="copyable-text"]': [
+        _bubble("hi", "a"),
+        _bubble("hello!", "b", is_from_me=True),
+        StubElement(),  # media bubble without text
+    ]}
+    
+    assert connector._harvest_messages() == [
+        {'is_from_me': False, 'message': "hi", 'timestamp': "10:00", 'message_id': "a"},
+        {'is_from_me': True, 'message': "hello!", 'timestamp': "10:00", 'message_id': "b"},
+    ]
+
+
+def test_harvest_uses_script_result():
+    """Test that the harvest script's list is used as is"""
+    messages = [{'is_from_me': False, 'message': "hi", 'timestamp': "10:00", 'message_id': "a"}]
+    connector = WhatsAppConnector()
+    connector.driver = StubDriver(messages)
+    
+    assert connector._harvest_messages() == messages
+    assert connector.driver.scripts == 1
+
+
+def test_wait_for_returns_as_soon_as_ready():
+    """Test that waits poll the condition and record how long they took"""
+    connector = WhatsAppConnector()
+    connector.driver = StubDriver()
+    polls = []
+    
+    def ready_on_third_poll(driver):
+        polls.append(driver)
+        if len(polls) < 3:
+            raise NoSuchElementException("not yet")
+        return "element"
+    
+    assert connector._wait_for('composer', ready_on_third_poll) == "element"
+    assert len(polls) == 3
+    
+    connector.wait_timeouts['chat_open'] = 0.2
+    with pytest.raises(TimeoutException):
+        connector._wait_for('chat_open', lambda driver: False)
+    
+    stats = connector.get_wait_stats()
+    assert set(stats) == {'composer', 'chat_open'}
+    assert stats['composer']['count'] == 1
+    assert stats['composer']['max_ms'] < 1000
+    assert stats['chat_open']['max_ms'] >= 200
+    assert stats['chat_open']['timeout_s'] == 0.2
+
+
+def _insert_with(results, timeout=1.0):
+    """Insert text into a stub composer whose scripts return ``results`` in turn"""
+    results = iter(results)
+    connector = WhatsAppConnector()
+    connector.driver = StubDriver(lambda script, *args: next(results))
+    connector.wait_timeouts['paste'] = timeout
+    box = StubElement()
+    connector._insert_text(box, "one\ntwo")
+    return box
+
+
+def test_consumed_paste_is_not_typed_again():
+    """Test that a paste the editor applies later is waited for, not typed a second time"""
+    assert _insert_with(['pasted', False, False, True]).keys == []
+    assert _insert_with(['pasted'] + [False] * 100, timeout=0.2).keys == []
+
+
+def test_insertion_falls_back_to_typing():
+    """Test that the text is typed when the script left the composer empty or failed"""
+    typed = ["one", Keys.SHIFT, Keys.ENTER, "two"]
+    assert _insert_with(['empty']).keys == typed
+    assert _insert_with([WebDriverException("no script")]).keys == typed
+    assert _insert_with(['inserted']).keys == []
+
+
+@pytest.fixture
+def driver_cache(tmp_path, monkeypatch):
+    """Driver path cache in a temporary directory and a counting webdriver-manager"""
+    installs = []
+    
+    class Manager:
+        def install(self):
+            installs.append(True)
+            return str(tmp_path / "fresh-chromedriver")
+    
+    monkeypatch.setattr(connector_module, "DIGI_ME_DIR", tmp_path)
+    monkeypatch.setattr(connector_module, "DRIVER_PATH_CACHE", tmp_path / "chromedriver-path")
+    monkeypatch.setattr(connector_module, "ChromeDriverManager", Manager)
+    monkeypatch.setattr(Config, "CHROMEDRIVER_PATH", "")
+    return tmp_path, installs
+
+
+def test_driver_path_cache_hit(driver_cache):
+    """Test that a cached driver path is reused without webdriver-manager"""
+    tmp_path, installs = driver_cache
+    driver = tmp_path / "chromedriver"
+    driver.write_text("")
+    (tmp_path / "chromedriver-path").write_text(str(driver))
+    
+    assert WhatsAppConnector(fast_start=True)._resolve_driver_path() == (str(driver), True)
+    assert installs == []
+
+
+def test_driver_path_cache_stale(driver_cache):
+    """Test that a cached path to a missing driver is resolved again and replaced"""
+    tmp_path, installs = driver_cache
+    (tmp_path / "chromedriver-path").write_text(str(tmp_path / "deleted"))
+    fresh = str(tmp_path / "fresh-chromedriver")
+    
+    assert WhatsAppConnector(fast_start=True)._resolve_driver_path() == (fresh, False)
+    assert installs == [True]
+    assert (tmp_path / "chromedriver-path").read_text() == fresh
+
+
+def test_driver_path_not_cached_without_fast_start(driver_cache):
+    """Test that the cache is neither read nor written when fast start is off"""
+    tmp_path, installs = driver_cache
+    
+    assert WhatsAppConnector(fast_start=False)._resolve_driver_path() == (str(tmp_path / "fresh-chromedriver"), False)
+    assert not (tmp_path / "chromedriver-path").exists()
+
+
+def test_configured_driver_path_is_not_cached(driver_cache, monkeypatch):
+    """Test that an explicit CHROMEDRIVER_PATH is not treated as a cache hit"""
+    monkeypatch.setattr(Config, "CHROMEDRIVER_PATH", "/opt/chromedriver")
+    
+    assert WhatsAppConnector(fast_start=True)._resolve_driver_path() == ("/opt/chromedriver", False)
+
+
+@pytest.fixture
+def whatsapp():
+    """Connector driving headless Chrome against the fake WhatsApp Web (skipped without Chrome)"""
+    server = FakeWhatsAppServer(["+100", "+200"]).start()
+    try:
+        driver = headless_chrome()
+    except WebDriverException as e:
+        server.stop()
+        pytest.skip(f"Chrome is not available: {e.msg}")
+    
+    connector = WhatsAppConnector(headless=True)
+    connector.driver = driver
+    connector.wait = WebDriverWait(driver, 30)
+    
+    def load(query=""):
+        driver.get(server.url + query)
+        connector.wait.until(EC.presence_of_element_located((By.XPATH, SEARCH_BOX)))
+    
+    yield server, connector, load
+    connector.disconnect()
+    server.stop()
+
+
+def _sent_texts(server, expected, timeout=5.0):
+    """Texts the fake server received, once ``expected`` have arrived"""
+    sent = []
+    deadline = time.time() + timeout
+    while len(sent) < expected and time.time() < deadline:
+        sent.extend(server.state.drain_sent())
+        time.sleep(0.05)
+    time.sleep(0.3)
+    sent.extend(server.state.drain_sent())
+    return [message['text'] for message in sent]
+
+
+def test_send_messages_batch_in_browser(whatsapp):
+    """Test that multi-line and emoji messages arrive once each and in order"""
+    server, connector, load = whatsapp
+    load()
+    messages = ["first line\nsecond line", "party time \U0001F389\U0001F44D", "last one"]
+    
+    assert connector.send_messages("+100", messages)
+    
+    assert _sent_texts(server, len(messages)) == messages
+
+
+def test_send_falls_back_to_typing_in_browser(whatsapp):
+    """Test that the text is typed when neither the paste nor editing commands insert it"""
+    server, connector, load = whatsapp
+    load()
+    connector.driver.execute_script(
+        "document.addEventListener('paste', function (event) { event.stopPropagation(); }, true);"
+        "document.execCommand = function () { return false; };"
+    )
+    
+    assert connector.send_message("+100", "typed\nby hand")
+    
+    assert _sent_texts(server, 1) == ["typed\nby hand"]
+
+
+def test_send_ack_with_trimmed_message_list(whatsapp):
+    """Test that sends are acknowledged while the chat keeps only a few bubbles in the DOM"""
+    server, connector, load = whatsapp
+    load("?keep=2")
+    for i in range(3):
+        server.state.inject("+100", f"incoming {i}")
+    connector.wait_timeouts['send_ack'] = 5
+    
+    for text in ("ok", "ok", "see you"):
+        start = time.perf_counter()
+        assert connector.send_message("+100", text)
+        assert time.perf_counter() - start < 3
+    
+    assert _sent_texts(server, 3) == ["ok", "ok", "see you"]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
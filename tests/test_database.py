@@ -0,0 +1,139 @@
+"""Tests for chat database functionality"""
+
+import pytest
+from src.storage.database import ChatDatabase
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Encrypted database in a temporary directory"""
+    return ChatDatabase(tmp_path / "chat.db", b"test-key")
+
+
+def test_add_and_get_conversation(database):
+    """Test storing and reading back a conversation"""
+    database.add_message("+100", "hello", is_me=False, sender_name="+100")
+    database.add_message("+100", "hey!", is_me=True, replied_by_ai=True)
+    
+    messages = database.get_conversation("+100")
+    
+    assert [m['message'] for m in messages] == ["hello", "hey!"]
+    assert messages[1]['is_me'] is True
+    assert messages[1]['replied_by_ai'] is True
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_add_messages_stores_batch_in_order(database, monkeypatch, returning):
+    """Test that a batch is stored in one call and shows up in the context cache"""
+    # Without RETURNING support (SQLite before 3.35) rows go through the ORM
+    monkeypatch.setattr(database.engine.dialect, 'insert_executemany_returning_sort_by_parameter_order', returning)
+    database.add_message("+100", "before")
+    assert len(database.get_recent_context("+100")) == 1
+    
+    ids = database.add_messages([
+        {'contact': "+100", 'message': "one", 'sender_name': "+100"},
+        {'contact': "+200", 'message': "other"},
+        {'contact': "+100", 'message': "two"},
+        {'contact': "+100", 'message': "reply", 'is_me': True, 'replied_by_ai': True},
+    ])
+    
+    assert len(ids) == 4 and ids == sorted(ids)
+    messages = database.get_conversation("+100")
+    assert [m['message'] for m in messages] == ["before", "one", "two", "reply"]
+    assert [m['id'] for m in messages[1:]] == [ids[0], ids[2], ids[3]]
+    assert messages[-1]['replied_by_ai'] is True
+    assert database.get_recent_context("+100") == messages
+    assert database.add_messages([]) == []
+
+
+def test_all_conversations_keeps_latest_per_contact(database):
+    """Test that every contact gets its latest messages, oldest first"""
+    for i in range(5):
+        database.add_message("+100", f"a{i}")
+        database.add_message("+200", f"b{i}", is_me=True)
+    database.add_message("+300", "only one")
+    
+    conversations = database.get_all_conversations(limit_per_contact=3)
+    
+    assert {contact: [m['message'] for m in messages] for contact, messages in conversations.items()} == {
+        "+100": ["a2", "a3", "a4"],
+        "+200": ["b2", "b3", "b4"],
+        "+300": ["only one"],
+    }
+    assert conversations["+200"][0]['is_me'] is True
+    assert conversations["+100"] == database.get_conversation("+100", 3)
+
+
+def test_tuned_mode_writes_while_reading(tmp_path):
+    """Test that WAL mode lets the bot write while a reader holds a snapshot"""
+    database = ChatDatabase(tmp_path / "chat.db", b"test-key", tuned=True, busy_timeout=0.5)
+    database.add_message("+100", "hello")
+    
+    with database.engine.connect() as reader:
+        assert reader.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert reader.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        reader.exec_driver_sql("BEGIN")
+        reader.exec_driver_sql("SELECT COUNT(*) FROM chat_messages").scalar()
+        
+        database.add_message("+100", "written during the read")
+        
+        # The reader still sees its snapshot
+        assert reader.exec_driver_sql("SELECT COUNT(*) FROM chat_messages").scalar() == 1
+    
+    assert len(database.get_conversation("+100")) == 2
+
+
+def test_watermark_roundtrip(database):
+    """Test storing and updating message watermarks"""
+    assert database.get_watermark("+100") is None
+    
+    database.set_watermark("+100", "false_100@c.us_AAA")
+    database.set_watermark("+100", "false_100@c.us_BBB")
+    database.set_watermark("+200", "false_200@c.us_CCC")
+    
+    assert database.get_watermark("+100") == "false_100@c.us_BBB"
+    assert database.get_watermark("+200") == "false_200@c.us_CCC"
+
+
+def test_watermark_survives_restart(tmp_path):
+    """Test that watermarks persist across database instances"""
+    ChatDatabase(tmp_path / "chat.db", b"test-key").set_watermark("+100", "id-1")
+    
+    assert ChatDatabase(tmp_path / "chat.db", b"test-key").get_watermark("+100") == "id-1"
+
+
+def test_recent_context_is_cached(database, monkeypatch):
+    """Test that recent context is served from memory after the first read"""
+    database.add_message("+100", "one")
+    database.add_message("+100", "two")
+    
+    assert [m['message'] for m in database.get_recent_context("+100", limit=5)] == ["one", "two"]
+    
+    # Write-through: new messages show up without another database read
+    def no_database_reads(*args, **kwargs):
+        raise AssertionError("context should come from the cache")
+    
+    monkeypatch.setattr(database, "get_conversation", no_database_reads)
+    database.add_message("+100", "three")
+    
+    context = database.get_recent_context("+100", limit=2)
+    assert [m['message'] for m in context] == ["two", "three"]
+    assert context[-1]['is_me'] is False
+
+
+def test_context_cache_evicts_least_recently_used(tmp_path):
+    """Test that the cache stays within its memory budget"""
+    database = ChatDatabase(tmp_path / "chat.db", b"test-key", context_cache_size=5, context_cache_max_bytes=1500)
+    for contact in ["+100", "+200", "+300"]:
+        for i in range(3):
+            database.add_message(contact, f"message {i}")
+        database.get_recent_context(contact, limit=3)
+    
+    stats = database.context_cache.stats()
+    assert stats['bytes'] <= 1500
+    assert database.context_cache.get("+100", 3) is None
+    assert [m['message'] for m in database.context_cache.get("+300", 3)] == ["message 0", "message 1", "message 2"]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,75 @@
+"""Tests for relevance-ranked example selection"""
+
+import json
+import pytest
+from src.ai.chat_style import ChatStyle
+from src.ai.example_index import ExampleIndex
+
+
+@pytest.fixture
+def chat_style(tmp_path):
+    """Chat style with a few example conversations"""
+    style_data = {
+        "example_conversations": [
+            {"context": "Want to grab dinner tonight?", "my_response": "yes! pizza?"},
+            {"context": "How's the project going?", "my_response": "almost done, shipping friday"},
+            {"context": "Did you watch the match?", "my_response": "what a goal lol"},
+            {"context": "Can you review my project proposal?", "my_response": "sure, send it over"},
+        ]
+    }
+    style_file = tmp_path / "test_style.json"
+    with open(style_file, 'w') as f:
+        json.dump(style_data, f)
+    return ChatStyle(style_file)
+
+
+def test_rank_by_relevance():
+    """Test that overlapping words rank an example first"""
+    index = ExampleIndex(["dinner tonight?", "the project deadline", "football match"])
+    
+    assert index.rank("when is the project deadline")[0] == 1
+    assert index.rank("dinner?")[0] == 0
+    assert sorted(index.rank("unrelated")) == [0, 1, 2]
+
+
+def test_select_examples_top_k(chat_style):
+    """Test that the most relevant examples are picked"""
+    selected = chat_style.select_examples("how is the project going", limit=2)
+    
+    assert [ex["my_response"] for ex in selected] == [
+        "almost done, shipping friday",
+        "sure, send it over",
+    ]
+
+
+def test_select_examples_token_budget(chat_style):
+    """Test that examples beyond the token budget are left out"""
+    assert len(chat_style.select_examples("project", limit=4, token_budget=20)) == 1
+    assert chat_style.select_examples("project", limit=4, token_budget=1) == []
+    assert chat_style.select_examples("project", limit=0) == []
+
+
+def test_added_examples_are_indexed(chat_style):
+    """Test that the index picks up new examples without a rebuild"""
+    chat_style.select_examples("warmup")
+    index = chat_style._example_index
+    
+    chat_style.add_example_conversation("Are you coming to the gym?", "leg day, obviously")
+    
+    assert chat_style._example_index is index
+    assert chat_style.select_examples("gym later?", limit=1)[0]["my_response"] == "leg day, obviously"
+
+
+def test_index_rebuilt_after_same_length_edit(chat_style):
+    """Test that replacing examples rebuilds the index even if their number is unchanged"""
+    chat_style.select_examples("warmup")
+    examples = [dict(ex) for ex in chat_style.get_example_conversations()]
+    examples[0] = {"context": "Coming to the beach?", "my_response": "bringing snacks"}
+    
+    chat_style.update_style({"example_conversations": examples})
+    
+    assert chat_style.select_examples("beach day?", limit=1)[0]["my_response"] == "bringing snacks"
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,57 @@
+"""Tests for the offline fake WhatsApp Web server"""
+
+import json
+import urllib.request
+import pytest
+from benchmarks.fake_whatsapp import FakeWhatsAppServer
+
+
+@pytest.fixture
+def server():
+    """Fake server on a free port"""
+    server = FakeWhatsAppServer(["+100", "+200"]).start()
+    yield server
+    server.stop()
+
+
+def _post(url, data):
+    request = urllib.request.Request(url, data=json.dumps(data).encode(), method='POST')
+    return json.loads(urllib.request.urlopen(request).read())
+
+
+def _get(url):
+    return json.loads(urllib.request.urlopen(url).read())
+
+
+def test_injected_messages_show_as_unread(server):
+    """Test that injected messages badge the chat until it is opened"""
+    _post(server.url + "api/inject", {'contact': "+100", 'text': "hey"})
+    
+    chats = {c['title']: c['unread'] for c in _get(server.url + "api/state")['chats']}
+    assert chats == {"+100": 1, "+200": 0}
+    
+    state = _get(server.url + "api/state?open=%2B100")
+    assert [m['text'] for m in state['messages']] == ["hey"]
+    assert state['messages'][0]['id'].startswith("false_")
+    assert all(c['unread'] == 0 for c in state['chats'])
+
+
+def test_sent_messages_are_recorded(server):
+    """Test that outgoing messages are recorded once"""
+    msg = _post(server.url + "api/send", {'contact': "+200", 'text': "hi there"})
+    
+    assert msg['id'].startswith("true_")
+    assert [s['text'] for s in _get(server.url + "api/sent")] == ["hi there"]
+    assert _get(server.url + "api/sent") == []
+
+
+def test_page_has_connector_dom_hooks(server):
+    """Test that the page carries the structure the connector targets"""
+    page = urllib.request.urlopen(server.url).read().decode()
+    
+    for hook in ('data-tab="3"', 'data-tab="10"', "_ak8l", "_ahzz", "_akbu", "copyable-text", "_ao3e", "_ao_h"):
+        assert hook in page
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,75 @@
+"""Tests for local replies to trivial messages"""
+
+import json
+import re
+import pytest
+from src.ai.chat_style import ChatStyle
+from src.ai.fast_path import FastPathReplier, trie_pattern
+
+
+@pytest.fixture
+def chat_style(tmp_path):
+    """Chat style with one phrase per intent"""
+    path = tmp_path / "style.json"
+    path.write_text(json.dumps({
+        "language_patterns": {
+            "greetings": ["Yo!"],
+            "farewells": ["Later!"],
+            "acknowledgments": ["Bet!"],
+            "thanks_replies": ["Anytime!"],
+        }
+    }))
+    return ChatStyle(path)
+
+
+def test_trie_pattern_matches_every_phrase():
+    """Test that the trie regex matches exactly the phrases, longest first"""
+    phrases = ["thanks", "thank you", "thx", "ty", "thanks a lot"]
+    pattern = re.compile(trie_pattern(phrases))
+    
+    for phrase in phrases:
+        assert pattern.fullmatch(phrase)
+    assert not pattern.fullmatch("than")
+    assert pattern.match("thanks a lot").group() == "thanks a lot"
+
+
+@pytest.mark.parametrize("message,reply", [
+    ("heyyy!!", "Yo!"),
+    ("Good morning :)", "Yo!"),
+    ("thank you so much", "Anytime!"),
+    ("ok cool", "Bet!"),
+    ("see you later", "Later!"),
+    ("hey, are you free tonight?", None),
+    ("ok?", None),
+    ("sure?\nhey", None),
+    ("later? ", None),
+    ("thanks, bye", None),
+    ("what did you think of the movie", None),
+])
+def test_replies_only_to_confident_matches(chat_style, message, reply):
+    """Test that only messages made of one intent's phrases are answered locally"""
+    assert FastPathReplier(chat_style).reply("+100", message) == reply
+
+
+def test_opt_out_style_change_and_stats(chat_style):
+    """Test per-contact opt-out, recompiling after a style change and the share stats"""
+    replier = FastPathReplier(chat_style, disabled_contacts=["+200"])
+    
+    assert replier.reply("+200", "hi") is None
+    assert replier.reply("+100", "hi") == "Yo!"
+    
+    chat_style.update_style({"language_patterns": {"greetings": ["Howdy partner"]}})
+    assert replier.reply("+100", "howdy partner") == "Howdy partner"
+    
+    assert replier.reply("+100", "can you call me") is None
+    assert replier.reply("+100", "thanks\nthank you so much", count=2) is not None
+    assert replier.stats() == {
+        'checked': 6,
+        'answered': 4,
+        'share': 0.667,
+        'by_intent': {'greeting': 2, 'thanks': 2, 'acknowledgment': 0, 'farewell': 0},
+    }
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
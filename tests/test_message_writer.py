@@ -0,0 +1,81 @@
+"""Tests for write-behind message storage"""
+
+import threading
+import pytest
+from src.storage.database import ChatDatabase
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Encrypted database with a background writer"""
+    database = ChatDatabase(tmp_path / "chat.db", b"test-key", write_behind=True, write_interval=0.01)
+    yield database
+    database.close()
+
+
+def _hold_writes(database, monkeypatch):
+    """Make the writer wait for the returned event before inserting"""
+    release = threading.Event()
+    insert = database._insert_messages
+    
+    def held(session, records):
+        release.wait(5)
+        return insert(session, records)
+    
+    monkeypatch.setattr(database, "_insert_messages", held)
+    return release
+
+
+def test_queued_messages_are_read_before_commit(database, monkeypatch):
+    """Test read-your-writes for messages the writer has not committed yet"""
+    database.add_message("+100", "stored")
+    assert len(database.get_recent_context("+100")) == 1
+    release = _hold_writes(database, monkeypatch)
+    
+    database.queue_messages([
+        {'contact': "+100", 'message': "queued", 'sender_name': "+100"},
+        {'contact': "+200", 'message': "cold contact", 'is_me': True},
+    ])
+    
+    assert [m['message'] for m in database.get_recent_context("+100")] == ["stored", "queued"]
+    assert [(m['id'], m['message']) for m in database.get_conversation("+200")] == [(None, "cold contact")]
+    assert not database.flush(timeout=0.1)
+    
+    release.set()
+    assert database.flush(timeout=5)
+    messages = database.get_conversation("+100")
+    assert [m['message'] for m in messages] == ["stored", "queued"]
+    assert messages[-1]['id'] is not None
+    # The cached copies made at submit time get the committed ids too
+    assert database.get_recent_context("+100") == messages
+    assert database.writer.stats()['written'] == 2
+
+
+def test_close_writes_queued_messages(tmp_path):
+    """Test that closing flushes the queue and later writes go straight through"""
+    database = ChatDatabase(tmp_path / "chat.db", b"test-key", write_behind=True, write_interval=0.05)
+    database.queue_messages([{'contact': "+100", 'message': f"m{i}"} for i in range(250)])
+    database.close()
+    database.queue_messages([{'contact': "+100", 'message': "after close"}])
+    
+    reopened = ChatDatabase(tmp_path / "chat.db", b"test-key")
+    messages = reopened.get_conversation("+100", 300)
+    assert [m['message'] for m in messages] == [f"m{i}" for i in range(250)] + ["after close"]
+    assert database.writer.stats()['queued'] == 0
+
+
+def test_failed_write_is_dropped_from_reads(database, monkeypatch):
+    """Test that messages whose commit failed stop showing up"""
+    def fail(session, records):
+        raise RuntimeError("disk full")
+    
+    monkeypatch.setattr(database, "_insert_messages", fail)
+    database.queue_messages([{'contact': "+100", 'message': "lost"}])
+    
+    assert database.flush(timeout=5)
+    assert database.get_recent_context("+100") == []
+    assert database.writer.stats()['failed'] == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
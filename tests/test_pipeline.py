@@ -0,0 +1,149 @@
+"""Tests for the staged reply pipeline"""
+
+import threading
+import time
+import pytest
+from src.pipeline import ReplyPipeline, IncomingMessage
+from src.storage.database import ChatDatabase
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Encrypted database in a temporary directory"""
+    return ChatDatabase(tmp_path / "chat.db", b"test-key")
+
+
+def _collect_replies(pipeline, count, timeout=5.0):
+    replies = []
+    deadline = time.time() + timeout
+    while len(replies) < count and time.time() < deadline:
+        reply = pipeline.next_reply(timeout=0.1)
+        if reply:
+            replies.append(reply)
+    return replies
+
+
+def test_slow_contact_does_not_block_others(database):
+    """Test that a slow reply for one contact does not hold up another"""
+    release_slow = threading.Event()
+    
+    def generate(contact, burst):
+        if contact == "+slow":
+            release_slow.wait(5)
+        return f"re: {' '.join(burst.texts)}"
+    
+    pipeline = ReplyPipeline(database, generate, workers=2)
+    pipeline.start()
+    try:
+        pipeline.submit(IncomingMessage("+slow", "first"))
+        pipeline.submit(IncomingMessage("+fast", "second"))
+        
+        replies = _collect_replies(pipeline, 1)
+        assert [r.contact for r in replies] == ["+fast"]
+        
+        release_slow.set()
+        replies = _collect_replies(pipeline, 1)
+        assert [r.response for r in replies] == ["re: first"]
+    finally:
+        release_slow.set()
+        pipeline.stop()
+
+
+def test_replies_stay_in_order_per_contact(database):
+    """Test that messages from one contact are answered in order"""
+    pipeline = ReplyPipeline(database, lambda contact, burst: " ".join(burst.texts).upper(), workers=4)
+    pipeline.start()
+    try:
+        for text in ["a", "b", "c", "d"]:
+            pipeline.submit(IncomingMessage("+100", text))
+        
+        # Messages stored in one batch may be answered together
+        replies = []
+        while sum(len(r.split()) for r in replies) < 4:
+            reply = pipeline.next_reply(timeout=5.0)
+            assert reply is not None
+            replies.append(reply.response)
+        assert " ".join(replies) == "A B C D"
+    finally:
+        pipeline.stop()
+    
+    assert [m['message'] for m in database.get_conversation("+100")] == ["a", "b", "c", "d"]
+
+
+def test_submit_applies_backpressure(database):
+    """Test that submit gives up when the persist stage is full"""
+    pipeline = ReplyPipeline(database, lambda contact, burst: None, queue_size=1)
+    
+    assert pipeline.submit(IncomingMessage("+100", "one"), timeout=0.1)
+    assert not pipeline.submit(IncomingMessage("+100", "two"), timeout=0.1)
+    assert pipeline.queue_depths()['persist'] == 1
+
+
+def test_stop_stores_pending_messages(database):
+    """Test that messages still queued at shutdown are stored"""
+    pipeline = ReplyPipeline(database, lambda contact, burst: None, auto_reply=False)
+    pipeline.submit(IncomingMessage("+100", "late"))
+    pipeline.stop()
+    
+    assert [m['message'] for m in database.get_conversation("+100")] == ["late"]
+
+
+def test_stop_answers_open_burst(database):
+    """Test that a burst still in its quiet period is answered on stop, not dropped"""
+    pipeline = ReplyPipeline(database, lambda contact, burst: " ".join(burst.texts).upper(), quiet_period=10)
+    pipeline.start()
+    pipeline.submit(IncomingMessage("+100", "are you"))
+    pipeline.submit(IncomingMessage("+100", "there"))
+    
+    start = time.time()
+    pipeline.stop(drain_timeout=5)
+    
+    assert time.time() - start < 5
+    assert pipeline.next_reply(timeout=0).response == "ARE YOU THERE"
+    assert pipeline.queue_depths()['coalesce'] == 0
+
+
+def test_burst_is_answered_once(database):
+    """Test that messages within the quiet period get a single reply"""
+    calls = []
+    
+    def generate(contact, burst):
+        calls.append(burst.texts)
+        return "one reply"
+    
+    pipeline = ReplyPipeline(database, generate, quiet_period=0.3)
+    pipeline.start()
+    try:
+        for text in ["hey", "u there?", "need help"]:
+            pipeline.submit(IncomingMessage("+100", text))
+            time.sleep(0.05)
+        
+        replies = _collect_replies(pipeline, 1)
+        assert [r.message for r in replies] == ["hey\nu there?\nneed help"]
+        assert pipeline.next_reply(timeout=0.5) is None
+    finally:
+        pipeline.stop()
+    
+    assert calls == [["hey", "u there?", "need help"]]
+    assert len(database.get_conversation("+100")) == 3
+
+
+def test_burst_max_wait(database):
+    """Test that a never-ending burst is still answered after max_burst_wait"""
+    pipeline = ReplyPipeline(database, lambda contact, burst: str(len(burst.messages)), quiet_period=0.3, max_burst_wait=0.4)
+    pipeline.start()
+    try:
+        start = time.time()
+        reply = None
+        while reply is None and time.time() - start < 3:
+            pipeline.submit(IncomingMessage("+100", "spam"))
+            reply = pipeline.next_reply(timeout=0.1)
+        
+        assert reply is not None
+        assert time.time() - start < 1.5
+    finally:
+        pipeline.stop()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
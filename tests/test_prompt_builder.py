@@ -0,0 +1,83 @@
+"""Tests for the token-budgeted prompt builder"""
+
+import pytest
+from src.ai.prompt_builder import MIN_MESSAGE_TOKENS, PromptBuilder, estimate_tokens, chars_to_tokens
+
+
+def _context(count, length=40):
+    return [{'message': f"{i:02d}" + "x" * (length - 2), 'is_me': i % 2 == 0} for i in range(count)]
+
+
+def test_everything_fits():
+    """Test that small prompts are passed through unchanged"""
+    examples = [{'context': "hi", 'my_response': "yo"}]
+    prompt = PromptBuilder(input_budget=1000).build("system", "hello", _context(3), examples)
+    
+    assert prompt.message == "hello"
+    assert len(prompt.context) == 3
+    assert prompt.examples == examples
+    assert prompt.tokens <= 1000
+
+
+def test_recent_context_kept_before_examples():
+    """Test that older turns and examples are dropped first"""
+    examples = [{'context': "e" * 40, 'my_response': "r" * 40}]
+    prompt = PromptBuilder(input_budget=80).build("s" * 40, "hello", _context(10), examples)
+    
+    assert [ctx['message'][:2] for ctx in prompt.context] == ["07", "08", "09"]
+    assert prompt.examples == []
+    assert prompt.tokens <= 80
+
+
+def test_summary_kept_before_context():
+    """Test that the conversation summary outranks raw context turns"""
+    summary = "They moved to Berlin in May and start a new job on Monday."
+    prompt = PromptBuilder(input_budget=80).build("s" * 40, "hello", _context(10), summary=summary)
+    
+    assert prompt.summary == summary
+    assert len(prompt.context) == 2
+    assert PromptBuilder(input_budget=20).build("s" * 40, "hello", summary=summary).summary == ""
+
+
+def test_small_examples_fill_leftover_budget():
+    """Test that an example that fits is used even after a larger one is skipped"""
+    examples = [{'context': "e" * 400, 'my_response': "r"}, {'context': "hi", 'my_response': "yo"}]
+    prompt = PromptBuilder(input_budget=100).build("system", "hello", [], examples)
+    
+    assert prompt.examples == [examples[1]]
+
+
+def test_oversized_message_is_truncated():
+    """Test that the end of a huge message is kept within budget"""
+    message = "a" * 4000 + "latest line"
+    prompt = PromptBuilder(input_budget=100).build("system", message, _context(5))
+    
+    assert prompt.message.endswith("latest line")
+    assert prompt.context == []
+    assert prompt.tokens <= 100
+
+
+def test_message_kept_when_system_prompt_fills_budget():
+    """Test that the current message is never dropped, even over budget"""
+    builder = PromptBuilder(input_budget=150)
+    system = "s" * 600
+    
+    prompt = builder.build(system, "are you free tonight?", _context(5), summary="old news")
+    assert prompt.message == "are you free tonight?"
+    assert (prompt.context, prompt.summary) == ([], "")
+    
+    long_message = "a" * 4000 + "latest line"
+    prompt = builder.build(system, long_message)
+    assert prompt.message.endswith("latest line")
+    assert estimate_tokens(prompt.message) <= MIN_MESSAGE_TOKENS
+
+
+def test_token_estimates():
+    """Test the character based token estimates"""
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("x" * 400) == 101
+    assert chars_to_tokens(500) == 125
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
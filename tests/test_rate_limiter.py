@@ -0,0 +1,56 @@
+"""Tests for the LLM request scheduler"""
+
+import asyncio
+import pytest
+from src.ai.rate_limiter import RequestScheduler, TokenBucket, backoff_delay, parse_retry_after
+
+
+def test_token_bucket_refills_at_rate():
+    """Test that a drained bucket waits for the missing units"""
+    bucket = TokenBucket(60, capacity=2)
+    bucket.consume(2, now=0)
+    
+    assert bucket.time_until(1, now=0) == pytest.approx(1.0)
+    assert bucket.time_until(1, now=1) == 0
+    # Requests larger than the bucket wait for a full bucket instead of forever
+    assert bucket.time_until(10, now=1) == pytest.approx(1.0)
+    assert TokenBucket(0).time_until(1000) == 0
+
+
+def test_backoff_and_retry_after():
+    """Test backoff bounds and Retry-After parsing"""
+    assert all(0 <= backoff_delay(attempt, 0.5, 4) <= min(4, 0.5 * 2 ** attempt) for attempt in range(8))
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def test_newest_requests_are_admitted_first():
+    """Test that waiting requests go out highest priority first"""
+    async def run():
+        scheduler = RequestScheduler({'openai': (0, 0)}, max_in_flight=1)
+        order = []
+        
+        async def request(priority):
+            await scheduler.acquire('openai', 10, priority)
+            order.append(priority)
+            await asyncio.sleep(0.01)
+            scheduler.release('openai')
+        
+        first = asyncio.ensure_future(request(0))
+        await asyncio.sleep(0)
+        await asyncio.gather(first, *(request(priority) for priority in (1, 3, 2)))
+        stats = scheduler.stats()['openai']
+        await scheduler.close()
+        return order, stats
+    
+    order, stats = asyncio.run(run())
+    
+    assert order == [0, 3, 2, 1]
+    assert stats['admitted'] == 4
+    assert stats['queued'] == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
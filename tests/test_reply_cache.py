@@ -0,0 +1,83 @@
+"""Tests for the reply cache"""
+
+import sqlite3
+import time
+import pytest
+from src.ai.reply_cache import ReplyCache, normalize_message
+from src.storage.database import ChatDatabase
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Encrypted database in a temporary directory"""
+    return ChatDatabase(tmp_path / "chat.db", b"test-key")
+
+
+def test_normalize_message():
+    """Test that trivial variations map to the same text"""
+    assert normalize_message("OK!!") == "ok"
+    assert normalize_message("  Thanks  a lot 🙏") == "thanks a lot"
+    assert normalize_message("lolll") == normalize_message("lollllll")
+    assert normalize_message("👍") == ""
+
+
+def test_long_messages_are_not_cached():
+    """Test that only short messages get a key"""
+    cache = ReplyCache(max_words=3)
+    
+    assert cache.key_for("good morning", None, "style", "+100") is not None
+    assert cache.key_for("can you pick me up at eight", None, "style", "+100") is None
+    assert cache.key_for("good morning", None, "style", "+100") != cache.key_for("good morning", None, "other", "+100")
+    assert cache.key_for("ok", [{'is_me': True}], "style", "+100") != cache.key_for("ok", [{'is_me': False}], "style", "+100")
+    assert cache.key_for("ok", None, "style", "+100") != cache.key_for("ok", None, "style", "+200")
+
+
+def test_candidates_collected_then_rotated():
+    """Test that a key is served only once it has all candidates, in rotation"""
+    cache = ReplyCache(candidates=2)
+    key = cache.key_for("thanks", None, "style", "+100")
+    
+    assert cache.get(key) is None
+    cache.put(key, "np!", 1.0)
+    assert cache.get(key) is None
+    cache.put(key, "anytime", 1.0)
+    
+    assert [cache.get(key) for _ in range(3)] == ["np!", "anytime", "np!"]
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (3, 2)
+    assert stats['saved_seconds'] == 3.0
+
+
+def test_lru_and_ttl_eviction():
+    """Test that old and least recently used entries are dropped"""
+    cache = ReplyCache(max_entries=2, candidates=1, ttl_seconds=60)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")
+    cache.put("c", "C")
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    
+    cache._entries["a"].created_at = time.time() - 120
+    assert cache.get("a") is None
+
+
+def test_persisted_encrypted_across_restarts(database):
+    """Test that entries survive a restart without storing plain text"""
+    cache = ReplyCache(database, candidates=2)
+    key = cache.key_for("lol", None, "style", "+100")
+    cache.put(key, "haha right")
+    cache.put(key, "lmao")
+    cache.get(key)
+    cache.flush()
+    
+    reloaded = ReplyCache(database, candidates=2)
+    assert reloaded.get(key) == "lmao"
+    
+    rows = sqlite3.connect(database.db_path).execute("SELECT candidates FROM reply_cache").fetchall()
+    assert "haha" not in rows[0][0]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,199 @@
+"""Tests for the async LLM client path, failover and hedging"""
+
+import asyncio
+import time
+import pytest
+from benchmarks.stub_llm_server import StubLLMServer
+from src.ai.chat_style import ChatStyle
+from src.ai.provider_health import ProviderHealth
+from src.ai.reply_cache import ReplyCache
+from src.ai.response_generator import ResponseGenerator
+from src.config import Config
+
+
+@pytest.fixture
+def servers():
+    """One stub API per provider, answering with the provider's name"""
+    servers = {
+        'openai': StubLLMServer(delay=0.2, reply="from openai").start(),
+        'cohere': StubLLMServer(delay=0.2, reply="from cohere").start(),
+    }
+    yield servers
+    for server in servers.values():
+        server.stop()
+
+
+@pytest.fixture
+def make_generator(servers, monkeypatch):
+    """Build ResponseGenerators for given providers, pointed at the stub servers"""
+    monkeypatch.setattr(Config, 'OPENAI_API_KEY', "stub")
+    monkeypatch.setattr(Config, 'COHERE_API_KEY', "stub")
+    monkeypatch.setattr(Config, 'OPENAI_BASE_URL', servers['openai'].openai_base_url)
+    monkeypatch.setattr(Config, 'COHERE_API_URL', servers['cohere'].url)
+    monkeypatch.setattr(Config, 'LLM_MAX_CONCURRENCY', 4)
+    monkeypatch.setattr(Config, 'LLM_HEDGE_DELAY_SECONDS', 0.5)
+    monkeypatch.setattr(Config, 'CIRCUIT_FAILURE_THRESHOLD', 2)
+    # One attempt per provider unless a test is about retries
+    monkeypatch.setattr(Config, 'LLM_MAX_RETRIES', 0)
+    monkeypatch.setattr(Config, 'LLM_BACKOFF_BASE_SECONDS', 0.05)
+    generators = []
+    
+    def make(*providers):
+        monkeypatch.setattr(Config, 'AI_PROVIDERS', list(providers))
+        generator = ResponseGenerator(ChatStyle(Config.CHAT_STYLE_PATH))
+        generators.append(generator)
+        return generator
+    
+    yield make
+    for generator in generators:
+        generator.close()
+
+
+@pytest.mark.parametrize("provider", ["openai", "cohere"])
+def test_generate_many_runs_concurrently(make_generator, servers, provider):
+    """Test that a batch is answered in order within the concurrency limit"""
+    generator = make_generator(provider)
+    
+    async def batch():
+        try:
+            return await generator.generate_many([{'message': f"hi {i}"} for i in range(8)])
+        finally:
+            await generator.aclose()
+    
+    responses = asyncio.run(batch())
+    
+    assert responses == [f"from {provider}"] * 8
+    assert servers[provider].stats() == {'requests': 8, 'errors': 0, 'max_in_flight': 4}
+
+
+def test_timeout_gives_no_reply(make_generator, servers):
+    """Test that a slow request gives up without a canned reply"""
+    generator = make_generator("openai")
+    servers['openai'].delay = 1.0
+    
+    async def slow():
+        try:
+            return await generator.generate_response_async("hi", timeout=0.1)
+        finally:
+            await generator.aclose()
+    
+    assert asyncio.run(slow()) is None
+
+
+def test_submit_from_threads(make_generator):
+    """Test that plain threads share the background loop"""
+    generator = make_generator("openai")
+    futures = [generator.submit(f"hi {i}", sender_name="+100") for i in range(3)]
+    
+    assert [future.result(timeout=10) for future in futures] == ["from openai"] * 3
+
+
+def test_reply_cache_skips_llm(make_generator, servers):
+    """Test that repeated short messages stop reaching the LLM"""
+    generator = make_generator("openai")
+    generator.reply_cache = ReplyCache(candidates=2)
+    
+    responses = [generator.generate_response("ok!") for _ in range(4)]
+    
+    assert responses == ["from openai"] * 4
+    assert servers['openai'].stats()['requests'] == 2
+    assert generator.reply_cache.stats()['hits'] == 2
+
+
+def test_failover_on_error(make_generator, servers):
+    """Test that a failing primary is answered by the secondary"""
+    generator = make_generator("openai", "cohere")
+    servers['openai'].error_rate = 1.0
+    
+    assert generator.generate_response("hi") == "from cohere"
+    assert servers['openai'].stats()['errors'] == 1
+
+
+@pytest.mark.parametrize("status", [429, 500])
+def test_failed_request_is_retried(make_generator, servers, monkeypatch, status):
+    """Test that rate limits and server errors are retried after Retry-After"""
+    monkeypatch.setattr(Config, 'LLM_MAX_RETRIES', 2)
+    generator = make_generator("openai")
+    servers['openai'].error_status = status
+    servers['openai'].retry_after = 0.3
+    servers['openai'].fail_next = 1
+    
+    start = time.perf_counter()
+    response = generator.generate_response("hi")
+    
+    assert response == "from openai"
+    assert time.perf_counter() - start >= 0.3
+    assert servers['openai'].stats()['requests'] == 2
+    stats = generator.get_scheduler_stats()['openai']
+    assert (stats['retries'], stats['rate_limited']) == (1, int(status == 429))
+    assert generator.get_provider_stats()['openai']['failures'] == 0
+
+
+def test_hedge_when_primary_is_slow(make_generator, servers):
+    """Test that the secondary is asked once the primary takes too long"""
+    generator = make_generator("openai", "cohere")
+    servers['openai'].delay = 3.0
+    
+    start = time.perf_counter()
+    response = generator.generate_response("hi")
+    
+    assert response == "from cohere"
+    assert time.perf_counter() - start < 2.0
+
+
+def test_no_hedge_while_queued(make_generator, servers, monkeypatch):
+    """Test that time spent waiting for a rate limit does not trigger a hedge"""
+    monkeypatch.setattr(Config, 'OPENAI_REQUESTS_PER_MINUTE', 20)
+    generator = make_generator("openai", "cohere")
+    
+    async def batch():
+        try:
+            # The bucket holds just over three requests, the fourth waits ~2s for it
+            return await generator.generate_many([{'message': f"hi {i}"} for i in range(4)])
+        finally:
+            await generator.aclose()
+    
+    assert asyncio.run(batch()) == ["from openai"] * 4
+    assert servers['cohere'].stats()['requests'] == 0
+
+
+def test_circuit_opens_after_repeated_failures(make_generator, servers):
+    """Test that a provider that keeps failing is skipped"""
+    generator = make_generator("openai", "cohere")
+    servers['openai'].error_rate = 1.0
+    
+    responses = [generator.generate_response(f"hi {i}") for i in range(4)]
+    
+    assert responses == ["from cohere"] * 4
+    assert servers['openai'].stats()['requests'] == 2
+    assert generator.get_provider_stats()['openai']['circuit'] == 'open'
+
+
+def test_no_reply_when_all_providers_fail(make_generator, servers):
+    """Test that total failure produces no reply instead of an apology"""
+    generator = make_generator("openai", "cohere")
+    for server in servers.values():
+        server.error_rate = 1.0
+    
+    assert generator.generate_response("hi") is None
+
+
+def test_circuit_half_open_recovery():
+    """Test that a provider is retried after the cooldown and recovers on success"""
+    health = ProviderHealth("openai", failure_threshold=2, cooldown=10, min_samples=1)
+    health.record_failure(now=100)
+    health.record_failure(now=100)
+    
+    assert not health.available(now=105)
+    assert health.available(now=111)
+    
+    health.record_failure(now=111)
+    assert not health.available(now=115)
+    
+    health.record_success(0.3)
+    assert health.available(now=115)
+    assert health.percentile(0.95) == 0.3
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,77 @@
+"""Tests for the adaptive polling scheduler"""
+
+import pytest
+from src.scheduler import PollScheduler
+
+
+def test_all_contacts_due_at_start():
+    """Test that every contact is checked on the first cycle"""
+    scheduler = PollScheduler(["+100", "+200"], min_interval=1, max_interval=60)
+    
+    assert sorted(scheduler.pop_due()) == ["+100", "+200"]
+    assert scheduler.pop_due() == []
+
+
+def test_idle_contacts_back_off_to_ceiling():
+    """Test exponential decay of the interval for quiet contacts"""
+    scheduler = PollScheduler(["+100"], min_interval=1, max_interval=10, backoff=2)
+    scheduler.pop_due(now=0)
+    
+    intervals = []
+    for _ in range(5):
+        scheduler.reschedule("+100", active=False, now=0)
+        intervals.append(scheduler.interval("+100"))
+    
+    assert intervals == [2, 4, 8, 10, 10]
+    
+    scheduler.reschedule("+100", active=True, now=0)
+    assert scheduler.interval("+100") == 1
+
+
+def test_active_contacts_come_first():
+    """Test that recently active contacts are due before quiet ones"""
+    scheduler = PollScheduler(["+quiet", "+busy"], min_interval=1, max_interval=60)
+    scheduler.pop_due(now=0)
+    scheduler.reschedule("+quiet", active=False, now=0)
+    scheduler.reschedule("+busy", active=True, now=0)
+    
+    assert scheduler.seconds_until_next(now=0) == 1
+    assert scheduler.pop_due(now=1.5) == ["+busy"]
+    assert scheduler.pop_due(now=2.5) == ["+quiet"]
+
+
+def test_mark_due_supersedes_schedule():
+    """Test that marking a contact due replaces its pending check"""
+    scheduler = PollScheduler(["+100"], min_interval=1, max_interval=60)
+    scheduler.pop_due(now=0)
+    scheduler.reschedule("+100", active=False, now=0)
+    
+    scheduler.mark_due("+100", now=0.5)
+    
+    assert scheduler.pop_due(now=0.5) == ["+100"]
+    assert scheduler.pop_due(now=100) == []
+
+
+def test_busiest_first_breaks_ties_by_last_activity():
+    """Test that contacts with the same interval are ordered by their latest activity"""
+    scheduler = PollScheduler(["+a", "+b", "+c", "+d"], min_interval=1, max_interval=60)
+    scheduler.reschedule("+a", active=True, now=10)
+    scheduler.reschedule("+b", active=True, now=20)
+    scheduler.reschedule("+c", active=False, now=30)
+    
+    assert scheduler.busiest_first({"+d", "+c", "+a", "+b"}) == ["+b", "+a", "+d", "+c"]
+
+
+def test_defer_keeps_interval():
+    """Test that a deferred contact is due later with its interval unchanged"""
+    scheduler = PollScheduler(["+100"], min_interval=1, max_interval=60)
+    scheduler.pop_due(now=0)
+    
+    scheduler.defer("+100", 3)
+    
+    assert scheduler.pop_due(now=2) == []
+    assert scheduler.pop_due(now=3) == ["+100"]
+    assert scheduler.interval("+100") == 1
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,96 @@
+"""Tests for rolling conversation summaries"""
+
+import pytest
+from benchmarks.stub_llm_server import StubLLMServer
+from src.ai.chat_style import ChatStyle
+from src.ai.response_generator import ResponseGenerator
+from src.ai.summarizer import ConversationSummarizer
+from src.config import Config
+from src.storage.database import ChatDatabase
+
+
+@pytest.fixture
+def server():
+    """Stub OpenAI API answering every request with the same summary"""
+    server = StubLLMServer(delay=0.05, reply="They are moving to Berlin in May.").start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def generator(server, monkeypatch):
+    monkeypatch.setattr(Config, 'AI_PROVIDERS', ["openai"])
+    monkeypatch.setattr(Config, 'OPENAI_API_KEY', "stub")
+    monkeypatch.setattr(Config, 'OPENAI_BASE_URL', server.openai_base_url)
+    generator = ResponseGenerator(ChatStyle(Config.CHAT_STYLE_PATH))
+    yield generator
+    generator.close()
+
+
+@pytest.fixture
+def database(tmp_path):
+    return ChatDatabase(tmp_path / "chat.db", b"test-key")
+
+
+def _wait(summarizer):
+    """Let queued refreshes finish"""
+    summarizer._executor.submit(lambda: None).result(timeout=10)
+
+
+def test_refreshes_only_after_enough_new_messages(database, generator, server):
+    """Test that the summary is updated every N messages, not on every reply"""
+    summarizer = ConversationSummarizer(database, generator, refresh_every=3)
+    
+    for text in ("we're moving!", "to Berlin"):
+        database.add_message("+100", text)
+        summarizer.schedule_refresh("+100")
+        _wait(summarizer)
+    assert summarizer.get("+100") is None
+    assert server.stats()['requests'] == 0
+    
+    database.add_message("+100", "in May", is_me=True)
+    summarizer.schedule_refresh("+100")
+    _wait(summarizer)
+    assert summarizer.get("+100") == "They are moving to Berlin in May."
+    
+    database.add_message("+100", "see you there")
+    summarizer.schedule_refresh("+100")
+    _wait(summarizer)
+    summarizer.close()
+    
+    assert server.stats()['requests'] == 1
+    assert summarizer.stats() == {'summaries': 1, 'refreshes': 1, 'failures': 0}
+    
+    # Stored encrypted and picked up again after a restart
+    stored = database.get_summary("+100")
+    assert stored['summary'] == "They are moving to Berlin in May."
+    with pytest.raises(Exception):
+        ChatDatabase(database.db_path, b"other-key").get_summary("+100")
+    assert ConversationSummarizer(database, generator).get("+100") == "They are moving to Berlin in May."
+
+
+def test_close_skips_queued_refreshes(database, generator, server):
+    """Test that refreshes still queued when the summarizer closes are not run"""
+    summarizer = ConversationSummarizer(database, generator, refresh_every=1)
+    database.add_message("+100", "we're moving!")
+    
+    summarizer.close()
+    summarizer._refresh("+100")
+    
+    assert server.stats()['requests'] == 0
+    assert summarizer.stats() == {'summaries': 0, 'refreshes': 0, 'failures': 0}
+
+
+def test_summary_is_sent_with_the_reply(generator):
+    """Test that the summary goes into the prompt of both providers"""
+    summary = "They are moving to Berlin in May."
+    
+    openai_request = generator._openai_request("hi", [], "+100", summary)
+    cohere_request = generator._cohere_request("hi", [], "+100", summary)
+    
+    assert any(summary in message['content'] for message in openai_request['messages'])
+    assert summary in cohere_request['preamble_override']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])